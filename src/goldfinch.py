@@ -22,30 +22,79 @@ try:
   import curses
   import curses.wrapper
   import goldfinchlib.config
-  import goldfinchlib.controllers.twitter
+  import goldfinchlib.controllers.multifetch
+  from goldfinchlib.controllers import replay
+  from goldfinchlib.outbox import Outbox, split_thread
   from goldfinchlib.customtextbox import CustomTextbox
-  from goldfinchlib.customtextbox import InputHandler 
+  from goldfinchlib.keymap import Keymap
+  from goldfinchlib.commands import Arg, Command, CommandError, \
+      CommandRegistry
+  from goldfinchlib.history import History
+  from goldfinchlib.config import ConfigError, parse_settings, \
+      restart_needed
+  from goldfinchlib.prefixindex import common_prefix
   from goldfinchlib.statusbar import StatusBar
+  from goldfinchlib.compositor import Compositor
+  from goldfinchlib.uichannel import UIChannel, ChannelQueue
+  from goldfinchlib.reactor import Reactor
   from goldfinchlib.pager import Pager
+  from goldfinchlib.scheduler import RefreshScheduler
+  from goldfinchlib.session import Session, SessionManager, account_sections
+  from goldfinchlib.snapshot import save_snapshot, load_snapshot
+  from goldfinchlib.status import format_status
 except ImportError as e:
   print(e)
   exit(1)
 
 import os
+import sys
 import logging
 import logging.handlers
-import Queue
-import threading
+import time
 import cPickle
 
 class MainWindow(object):
   '''Represents the interface on the screen (view)'''
+
+  # (mode, keys, action), see goldfinchlib.keymap.parse_keys for the keys
+  default_bindings = [
+    ('edit', '<Esc>', 'command_mode'),
+    ('command', 'i', 'edit_mode'),
+    ('command', 'j', 'scroll_down'),
+    ('command', 'k', 'scroll_up'),
+    ('command', '<Space>', 'page_down'),
+    ('command', 'gg', 'top'),
+    ('command', 'G', 'bottom'),
+    ('command', '/', 'search'),
+    ('command', 'n', 'next_match'),
+    ('command', 'N', 'previous_match'),
+    ('edit', '<PageUp>', 'page_up'),
+    ('command', '<PageUp>', 'page_up'),
+    ('edit', '<PageDown>', 'page_down'),
+    ('command', '<PageDown>', 'page_down'),
+    ('edit', '<Resize>', 'resize'),
+    ('command', '<Resize>', 'resize'),
+    ('edit', '<Tab>', 'complete'),
+    ('edit', '<Up>', 'history_previous'),
+    ('edit', '<Down>', 'history_next'),
+    ('edit', '<C-r>', 'history_search'),
+    ('isearch', '<C-r>', 'history_search'),
+    ('isearch', '<Enter>', 'accept_search'),
+    ('isearch', '<Esc>', 'cancel_search'),
+    ('isearch', '<C-g>', 'cancel_search'),
+    ('isearch', '<Resize>', 'resize'),
+  ]
   
-  def __init__(self, stdscr, config=None):
+  def __init__(self, stdscr, config=None, history=None, completer=None,
+      settings=None):
     '''Sets up a MainWindow.
 
-    stdscr  -- a curses WindowObject to draw to
-    config  -- a ConfigParser.Config object (see docs for possible values)
+    stdscr    -- a curses WindowObject to draw to
+    config    -- a ConfigParser.Config object (see docs for possible values)
+    history   -- optional goldfinchlib.history.History of lines entered
+    completer -- optional function (text before the cursor) -> (where the
+                 word being completed starts, [completion]) for <Tab>
+    settings  -- goldfinchlib.config.Settings, the defaults if not given
 
     '''
     self.logger = logging.getLogger('goldfinch' +
@@ -53,11 +102,24 @@ class MainWindow(object):
     self.stdscr = stdscr
     self.config = config
     self.mode = 'edit'
+    self.history = history
+    self.history_pos = None  # entry being shown, None when typing anew
+    self.history_draft = ''  # what was typed before looking back
+    self.history_match = None  # entry found by reverse-i-search
+    self.completer = completer
+    if settings is None:
+      settings = parse_settings(None)
     (self.term_height, self.term_width) = self.stdscr.getmaxyx()
+    self.compositor = Compositor(settings.framerate)
     self.statusbar_top = StatusBar(0, self.stdscr)
     self.statusbar_bottom = StatusBar(self.term_height-2, self.stdscr)
-    self.pager = Pager(200, self.stdscr, logging.getLogger(\
+    self.pager = Pager(settings.scrollback, self.stdscr, logging.getLogger(\
         'goldfinch' + '.' + Pager.__class__.__name__)) 
+    # the status bars draw onto stdscr, so they go underneath the pager
+    self.compositor.add(self.statusbar_top)
+    self.compositor.add(self.statusbar_bottom)
+    self.compositor.add(self.pager)
+    self.keymap = self.init_keymap()
 
   def draw(self):
     '''Draw the various interface components to the screen'''
@@ -67,8 +129,17 @@ class MainWindow(object):
     self.stdscr.move(self.term_height-1,\
         0)  # move the cursor to the input box
 
+  def set_bracketed_paste(self, on):
+    '''Ask the terminal to mark the start and end of pasted text, so the
+    input box can take it in one go rather than a key at a time.
+    Terminals which don't know the mode ignore it.
+
+    '''
+    sys.stdout.write(on and '\033[?2004h' or '\033[?2004l')
+    sys.stdout.flush()
+
   def set_mode(self, mode):
-    assert mode == 'edit' or mode == 'command'
+    assert mode in ('edit', 'command', 'isearch')
     self.input_box.mode = mode
     self.statusbar_bottom.add_text('['+mode+']', 'right')
     if mode == 'command':
@@ -83,74 +154,243 @@ class MainWindow(object):
 
     '''
     self.input_win = curses.newwin(1, self.term_width, self.term_height-1, 0)
-    # create a list of InputHandler objects to handle key press events on the
-    # input box
-    handlers = []
-
-    #TODO: resize event doesn't seem to get recognised when on a remote
-    #      terminal.
-    resize_handler = InputHandler(\
-        curses.KEY_RESIZE,
-        self.draw,
-        [],
-        ['edit', 'command'])
-    handlers.append(resize_handler)
-
-    command_mode = InputHandler(\
-        curses.ascii.ESC,
-        self.set_mode,
-        ['command'],
-        ['edit'])
-    handlers.append(command_mode)
-
-    edit_mode = InputHandler(\
-        ord('i'),
-        self.set_mode,
-        ['edit'],
-        ['command'])
-    handlers.append(edit_mode)
-
-    scroll_up = InputHandler(\
-        ord('k'),
-        self.pager.scroll,
-        [-1],
-        ['command'])
-    handlers.append(scroll_up)
-
-    scroll_down = InputHandler(\
-        ord('j'),
-        self.pager.scroll,
-        [1],
-        ['command'])
-    handlers.append(scroll_down)
-
-    page_down = InputHandler(\
-        curses.KEY_PPAGE,
-        self.pager.scroll,
-        [-self.term_height-3],  # -3 for 2 status bars + inputbox
-        ['edit', 'command'])
-    handlers.append(page_down)
-
-    page_up = InputHandler(\
-        curses.KEY_NPAGE,
-        self.pager.scroll,
-        [self.term_height-3], 
-        ['edit', 'command'])
-    handlers.append(page_up)
-
-    space_page_down = InputHandler(\
-        curses.ascii.SP,
-        self.pager.scroll,
-        [self.term_height-3],
-        ['command'])
-    handlers.append(space_page_down)
-
-    self.input_box = CustomTextbox(self.input_win,\
-         handlers)
+    self.input_box = CustomTextbox(self.input_win, self.keymap)
+    self.input_box.on_edit = self.edited
+    self.input_box.on_overflow = self.input_overflowed
+    self.compositor.focus = self.input_win
     self.input_win.overwrite(self.stdscr)
     self.input_win.refresh()
     self.stdscr.refresh()
-  
+
+  def init_keymap(self):
+    '''Creates the Keymap of what keys do in each mode: the defaults,
+    then any bindings from the [keys] (command mode) and [edit keys]
+    sections of the config.
+
+    '''
+    keymap = Keymap()
+    keymap.add_action('edit_mode', lambda count: self.set_mode('edit'))
+    keymap.add_action('command_mode',
+        lambda count: self.set_mode('command'))
+    #TODO: resize event doesn't seem to get recognised when on a remote
+    #      terminal.
+    keymap.add_action('resize', lambda count: self.resize())
+    keymap.add_action('scroll_down', self.pager.scroll, coalesce=True)
+    keymap.add_action('scroll_up', lambda count: self.pager.scroll(-count),
+        coalesce=True)
+    keymap.add_action('page_down', self.scroll_page, coalesce=True)
+    keymap.add_action('page_up', lambda count: self.scroll_page(-count),
+        coalesce=True)
+    keymap.add_action('top', lambda count: self.pager.scroll_home())
+    keymap.add_action('bottom', lambda count: self.pager.scroll_end())
+    keymap.add_action('search', lambda count: self.start_search())
+    keymap.add_action('next_match', self.next_match)
+    keymap.add_action('previous_match',
+        lambda count: self.next_match(-count))
+    keymap.add_action('complete', lambda count: self.complete())
+    keymap.add_action('history_previous',
+        lambda count: self.history_step(-count), coalesce=True)
+    keymap.add_action('history_next', self.history_step, coalesce=True)
+    keymap.add_action('history_search',
+        lambda count: self.history_search())
+    keymap.add_action('accept_search', lambda count: self.end_search(True))
+    keymap.add_action('cancel_search',
+        lambda count: self.end_search(False))
+    for (mode, keys, action) in self.default_bindings:
+      keymap.bind(mode, keys, action)
+    for (section, mode) in (('keys', 'command'), ('edit keys', 'edit')):
+      for problem in keymap.load(self.config, section, mode):
+        self.logger.warning(problem)
+    return keymap
+
+  def apply_settings(self, config, settings):
+    '''Pick up a reloaded config: frame rate, scrollback, history size and
+    key bindings.
+
+    '''
+    self.config = config
+    self.compositor.set_max_fps(settings.framerate)
+    if settings.scrollback != self.pager.scrollback:
+      self.pager.set_scrollback(settings.scrollback)
+    if self.history is not None:
+      self.history.max_entries = settings.historysize
+    self.keymap = self.init_keymap()
+    self.input_box.set_keymap(self.keymap)
+
+  def resize(self):
+    '''Lay the interface out again for a new terminal size.  The pager
+    keeps its contents and position, and the input box keeps whatever has
+    been typed.
+
+    '''
+    (self.term_height, self.term_width) = self.stdscr.getmaxyx()
+    self.logger.debug('resized to %dx%d' % (self.term_width,
+        self.term_height))
+    self.stdscr.clear()
+    self.statusbar_top.resize(0)
+    self.statusbar_bottom.resize(self.term_height-2)
+    self.pager.draw()
+    # shrink before moving, a window can't hang off the screen
+    self.input_win.resize(1, self.term_width)
+    self.input_win.mvwin(self.term_height-1, 0)
+    (self.input_box.maxy, self.input_box.maxx) = (0, self.term_width-1)
+    self.input_win.touchwin()
+
+  def scroll_page(self, pages):
+    self.pager.scroll(pages * self.pager.view_height)
+
+  def start_search(self):
+    '''Begin a /pattern search, typed into the input box.'''
+    self.set_mode('edit')
+    self.input_box.insert_printable_str('/')
+
+  def search(self, pattern):
+    '''Search the pager for pattern and report which match it jumped to.
+    If any do, go back to command mode so n/N step through them.
+
+    '''
+    found = self.pager.search(pattern)
+    if not pattern.strip():
+      self.statusbar_bottom.add_text('', 'left')
+    elif found is not None:
+      self.statusbar_bottom.add_text('/%s: match %d of %d' % ((pattern,) +
+          found), 'left')
+      self.set_mode('command')
+    else:
+      self.statusbar_bottom.add_text('Pattern not found: %s' % pattern,
+          'left')
+
+  def next_match(self, count=1):
+    '''Jump count matches on, or back if count is negative.'''
+    direction = count < 0 and -1 or 1
+    for i in range(abs(count)):
+      found = self.pager.next_match(direction)
+    if found is None:
+      if self.pager.search_words:
+        self.statusbar_bottom.add_text('Pattern not found', 'left')
+      else:
+        self.statusbar_bottom.add_text('No previous search', 'left')
+    else:
+      self.statusbar_bottom.add_text('match %d of %d' % found, 'left')
+
+  def set_input(self, text, cursor=None):
+    '''Replace what's in the input box with text, the cursor at cursor or
+    the end.
+
+    '''
+    self.input_box.insert_printable_str(text)
+    if cursor is not None:
+      self.input_win.move(0, cursor)
+
+  def remember(self, line):
+    '''Add a line entered to the history, and start looking back from
+    the newest entry again.
+
+    '''
+    self.history_pos = None
+    if self.history is not None:
+      self.history.add(line)
+
+  def history_step(self, count):
+    '''Show the history entry count lines newer than the one shown, or
+    older if count is negative.  Going past the newest brings back what
+    was being typed.
+
+    '''
+    if not self.history:
+      return
+    if self.history_pos is None:
+      if count > 0:
+        return
+      self.history_draft = self.input_box.text()
+      self.history_pos = len(self.history)
+    self.history_pos = max(self.history_pos + count, 0)
+    if self.history_pos >= len(self.history):
+      self.history_pos = None
+      self.set_input(self.history_draft)
+    else:
+      self.set_input(self.history[self.history_pos])
+
+  def history_search(self):
+    '''Start a reverse-i-search of the history, or look further back for
+    the same text if one is under way.  What's typed is searched for as
+    it's typed.
+
+    '''
+    if self.history is None:
+      return
+    if self.input_box.mode != 'isearch':
+      self.history_draft = self.input_box.text()
+      self.history_match = None
+      self.set_mode('isearch')
+      self.input_box.clear()
+    elif self.history_match is not None:
+      self._isearch(self.history_match)
+      return
+    self._isearch()
+
+  def edited(self):
+    if self.input_box.mode == 'isearch':
+      self._isearch()
+
+  def input_overflowed(self, message):
+    self.statusbar_bottom.add_text(message, 'left')
+
+  def _isearch(self, before=None):
+    query = self.input_box.text()
+    if not query:
+      self.history_match = None
+      self.statusbar_bottom.add_text('(reverse-i-search)', 'left')
+      return
+    match = self.history.search(query, before)
+    if match is None:
+      self.statusbar_bottom.add_text("(failing reverse-i-search)`%s'" % query,
+          'left')
+      return
+    self.history_match = match
+    self.statusbar_bottom.add_text("(reverse-i-search)`%s': %s" % (query,
+        self.history[match]), 'left')
+
+  def end_search(self, accept):
+    '''Leave reverse-i-search, putting the entry found in the input box if
+    accept is set, otherwise what was there before.
+
+    '''
+    self.set_mode('edit')
+    self.statusbar_bottom.add_text('', 'left')
+    if accept and self.history_match is not None:
+      self.history_pos = self.history_match
+      self.set_input(self.history[self.history_match])
+    else:
+      self.set_input(self.history_draft)
+
+  def complete(self):
+    '''Complete the word before the cursor as far as it's the same in
+    every completion.  If there's more than one they're listed in the
+    status bar.
+
+    '''
+    if self.completer is None:
+      return
+    (y, x) = self.input_win.getyx()
+    typed = self.input_box.text()
+    text = typed[:x].ljust(x)
+    (start, completions) = self.completer(text)
+    if not completions:
+      self.statusbar_bottom.add_text('No completions', 'left')
+      return
+    word = common_prefix(completions)
+    if len(completions) == 1:
+      word = word + ' '
+    else:
+      self.statusbar_bottom.add_text(' '.join(completions), 'left')
+    if len(word) > len(text) - start:
+      before = text[:start] + word
+      self.set_input(before + typed[x:], len(before))
+
+  def clear_pager(self):
+    self.pager.erase()
+
   def _draw_pager(self):
     '''Draws the main pager area to the screen'''
     self.pager.draw()
@@ -171,80 +411,217 @@ class GoldFinch(object):
   config_dir = os.path.join(os.environ['HOME'], '.goldfinch')
   config_file = os.path.join(config_dir, 'goldfinchrc')
   log_file = os.path.join(config_dir, 'logs', 'goldfinch.log')
+  snapshot_file = os.path.join(config_dir, 'timeline.snapshot')
+  history_file = os.path.join(config_dir, 'history')
+  max_completions = 50  # most @names offered at once
+  metrics_interval = 1.0  # seconds between updates of the api metrics
+  config_check_interval = 2.0  # seconds between looks at goldfinchrc
 
   def __init__(self, stdscr=None):
     self.init_logger()
     self.logger.info('Starting goldfinch')
-    self.config = self.init_config()
-    self.controller = self.init_twitter_api()
+    self.config_source = self.init_config()
+    self.config = self.config_source.get_config()
+    self.settings = self.init_settings()
     self.stdscr = stdscr
+    self.reactor = Reactor()
+    self.ui = self.init_ui_channel()
+    self.commands = self.init_commands()
+    self.metrics_due = 0
     if stdscr is not None:
+      # show the timeline as it was when we last exited before doing
+      # anything slow
       self.main_window = self.init_main_window()
+      snapshot = load_snapshot(self.snapshot_file)
+      self.show_snapshot(snapshot)
+      self.main_window.compositor.flush()
+    self.sessions = self.init_sessions()
+    if stdscr is not None:
+      self.restore_snapshot(snapshot)
       self.main_window.statusbar_bottom.add_text('Getting timeline..', 'left')
-      self.init_refresh_thread()
-      self.main_window.statusbar_bottom.add_text('Done.', 'left')
-      while True:
-        self.parse_input()
+      for session in self.sessions.sessions:
+        session.outbox.start()
+        self.schedule_refresh(session, 0)
+        if self.settings.streaming:
+          self.init_stream(session)
+      # everything from here on happens in callbacks from the loop
+      self.reactor.call_later(self.config_check_interval, self.check_config)
+      self.reactor.add_reader(sys.stdin.fileno(), self.read_input)
+      self.reactor.add_hook(self.process_ui)
+      self.reactor.run()
+
+  @property
+  def controller(self):
+    '''The controller of the account currently on screen'''
+    return self.sessions.current.controller
 
-  def parse_input(self):
-    input_str = self.main_window.input_box.edit().strip()
-    input_valid = True
-    command = input_str.split()[0].strip()
-    arg_line = input_str[len(command):].strip()
+  def read_input(self):
+    '''Called by the loop when there are keys to read.'''
+    for line in self.main_window.input_box.read_keys():
+      self.parse_input(line)
 
+  def parse_input(self, input_str):
+    '''Act on a line entered in the input box.'''
+    input_str = input_str.strip()
+    self.main_window.input_box.clear()
+    if not input_str:
+      return
     self.logger.debug('Got input: ' + input_str)
+    self.main_window.remember(input_str)
 
-    if len(command) > 1:
-      if command == ':quit' or command == ':q':
-        self.cleanup()
-      elif command == ':clear' or command == ':c':
-        #TODO: add ctrl-L for this
-        self.main_window.clear_pager()
-      elif command == ':post' or command == ':p':
-        if len(arg_line) <= self.controller.max_msg_length:
-          self.main_window.statusbar_bottom.add_text('Posting message..', 'left')
-          self.logger.info('posting msg (' + str(len(arg_line)) + ')')
-          self.controller.api.update_status(arg_line)
-          self.main_window.statusbar_bottom.add_text('Done!', 'left')
-        else:
-          warn_msg = 'msg length too long, must be < '+\
-              str(self.controller.max_msg_length)
-          self.main_window.statusbar_bottom.add_text(warn_msg, 'left')
-          self.logger.info(warn_msg)
-          pass
-      elif command == ':list' or command == ':l':
-        # must be one arg to this command
-        if arg_line == 'friends':
-          ret = self.controller.get_friends()
-          self.main_window.pager.erase()
-          self.main_window.pager.add_text(ret)
-          #TODO: ensure these threads are not already running
-          #ret_queue = Queue.Queue()
-          #consumer_thread = threading.Thread(target=self.main_window.pager.\
-          #    add_text, args=(ret_queue,))
-          #self.logger.debug('starting consumer thread')
-          #consumer_thread.start()
-          #producer_thread = threading.Thread(target=self.controller.get_friends)
-          #self.logger.debug('starting producer thread')
-          #producer_thread.start()
-      elif command == ':refresh' or command == ':r':
-        #TODO: add these lines to a function
-        self.main_window.statusbar_bottom.add_text('Refreshing timeline..', 'left')
-        self.main_window.pager_pad.erase()
-        self.main_window.pager_ypos = 0
-        for screen_name, status in self.controller.get_home_timeline(30):
-          self.main_window.pager.add_text(self.format_status_line(\
-              screen_name, status))
-        self.main_window.statusbar_bottom.add_text('Done.', 'left')
-      else:
-        input_valid = False
+    if input_str.startswith('/'):
+      # leaves its own message in the status bar
+      self.main_window.search(input_str[1:])
+      return
+
+    # commands leave their own message in the status bar, if any
+    self.main_window.statusbar_bottom.add_text('', 'left')
+    try:
+      self.commands.run(input_str)
+    except CommandError as e:
+      self.main_window.statusbar_bottom.add_text(str(e), 'left')
+
+  def init_commands(self):
+    '''Creates the CommandRegistry of what can be typed into the input
+    box.
+
+    '''
+    commands = CommandRegistry()
+    commands.add(Command(':quit', lambda: self.cleanup(), aliases=[':q'],
+        help='exit goldfinch'))
+    #TODO: add ctrl-L for this
+    commands.add(Command(':clear', lambda: self.main_window.clear_pager(),
+        aliases=[':c'], help='empty the pager'))
+    commands.add(Command(':post', self.post, [Arg('text', rest=True)],
+        aliases=[':p'], help='post a status'))
+    commands.add(Command(':list', self.show_list, [Arg('what',
+        choices=['lists', 'friends'])], aliases=[':l'],
+        help='show your lists or who you follow'))
+    commands.add(Command(':account', self.choose_account, [Arg('name',
+        choices=lambda: self.sessions.names(), optional=True)],
+        aliases=[':a'], help='switch account, or list them'))
+    commands.add(Command(':search', self.search_twitter, [Arg('query', rest=True)],
+        aliases=[':s'], help='search twitter, e.g. since:2010-01-01 term'))
+    commands.add(Command(':refresh', lambda: self.refresh(), aliases=[':r'],
+        help='fetch new statuses now'))
+    commands.add(Command(':help', self.show_help, [Arg('command',
+        choices=commands.names, optional=True)], aliases=[':h'],
+        help='list the commands, or how to use one'))
+    return commands
+
+  def init_history(self):
+    return History(self.history_file, self.settings.historysize)
+
+  def complete(self, text):
+    '''Completions for the word at the end of text: @names from the
+    friend store, otherwise commands and their arguments.
+
+    '''
+    start = text.rfind(' ') + 1
+    if text[start:].startswith('@'):
+      names = self.controller.complete_friend(text[start + 1:],
+          self.max_completions)
+      return (start, ['@' + name for name in names])
+    return self.commands.complete(text)
 
-    if input_valid:
-      self.main_window.statusbar_bottom.add_text('', 'left')
-      self.main_window.input_box.clear()
+  def show_list(self, what):
+    self.main_window.pager.erase()
+    if what == 'lists':
+      self.controller.poll(['lists'],
+          ret_queue=ChannelQueue(self.ui, 'lists'))
     else:
-      self.main_window.statusbar_bottom.add_text('Unknown command.  Try :help', 'left')
-      self.main_window.input_box.clear()
+      # names are drawn as each lookup batch arrives rather than once
+      # the whole list has been resolved
+      self.sessions.pool.submit(self.list_friends,
+          (ChannelQueue(self.ui, 'friends'),))
+
+  def choose_account(self, name=None):
+    if name:
+      self.switch_account(name)
+    else:
+      self.main_window.pager.erase()
+      self.main_window.pager.add_text(self.sessions.names())
+
+  def search_twitter(self, query):
+    self.main_window.pager.erase()
+    try:
+      results = self.controller.search(query)
+    except ValueError as e:
+      self.logger.info(e)
+      results = []
+      self.main_window.pager.add_text('since: and until: dates must ' +\
+          'be YYYY-MM-DD')
+    self.main_window.pager.add_text(results)
+
+  def show_help(self, name=None):
+    if name:
+      if not name.startswith(':'):
+        name = ':' + name
+      command = self.commands.find(name)
+      self.main_window.statusbar_bottom.add_text('usage: ' +
+          command.usage(), 'left')
+      return
+    self.main_window.pager.erase()
+    for name in self.commands.names():
+      command = self.commands.find(name)
+      self.main_window.pager.add_text('%-30s%s' % (command.usage(),
+          command.help))
+
+  def post(self, text):
+    '''Queue text in the current account's outbox.  Text longer than
+    max_msg_length is refused unless SplitLongPosts is on, in which case it
+    is sent as a thread of numbered replies.
+
+    '''
+    max_length = self.controller.max_msg_length
+    if len(text) > max_length and not self.split_long_posts():
+      warn_msg = 'msg length too long, must be < ' + str(max_length)
+      self.main_window.statusbar_bottom.add_text(warn_msg, 'left')
+      self.logger.info(warn_msg)
+      return
+    parts = split_thread(text, max_length)
+    queued = self.sessions.current.outbox.post(parts)
+    self.logger.info('queued msg (%d parts, %d queued)' % (len(parts), queued))
+
+  def show_metrics(self):
+    return self.settings.showmetrics
+
+  def metrics_text(self, controller):
+    '''Summarise what the controller's account is costing: mean api
+    latency and requests over the last minute, rate limit quota left and
+    how often a pooled connection was reused.
+
+    '''
+    metrics = controller.metrics
+    latency = metrics.latency()
+    text = ['api:%s' % (latency is None and '-' or
+        '%dms' % (latency * 1000)),
+        '%d/min' % metrics.requests_per_minute()]
+    quotas = controller.quotas.values()
+    if quotas:
+      text.append('quota:%d' % min([remaining for (remaining, reset_at)
+          in quotas]))
+    pool = controller.connection_pool
+    if pool.created + pool.reused:
+      text.append('reuse:%d%%' % (pool.hit_rate() * 100))
+    return ' '.join(text)
+
+  def draw_metrics(self):
+    self.main_window.statusbar_bottom.set_metrics(
+        self.metrics_text(self.controller))
+
+  def split_long_posts(self):
+    return self.settings.splitlongposts
+
+  def list_friends(self, ret_queue):
+    '''Puts the user's friends into ret_queue, followed by None once
+    they have all been fetched.
+
+    '''
+    try:
+      self.controller.get_friends(ret_queue)
+    finally:
+      ret_queue.put(None)
 
   def init_logger(self, log_file=None):
     '''Sets up a logging object which can be accessed from other classes.
@@ -272,18 +649,92 @@ class GoldFinch(object):
     handler.setFormatter(formatter)
     self.logger.addHandler(handler)
 
-  def init_twitter_api(self):
-    api = goldfinchlib.controllers.twitter.TwitterController(GoldFinch.config_dir)
+  def init_sessions(self):
+    '''Creates a Session for each account in the config file.  The
+    [account] section uses ~/.goldfinch/access_token, any further
+    [account NAME] sections use ~/.goldfinch/access_token.NAME and keep
+    their caches under ~/.goldfinch/accounts/NAME.
+
+    '''
+    sessions = SessionManager(timeout=self.settings.timeout)
+    scrollback = self.settings.scrollback
+    for section in account_sections(self.config):
+      if section == 'account':
+        name = self.config.get(section, 'accountname')
+        cache_dir = GoldFinch.config_dir
+        token_file = os.path.join(self.config_dir, 'access_token')
+      else:
+        name = section[len('account '):].strip()
+        cache_dir = os.path.join(GoldFinch.config_dir, 'accounts', name)
+        token_file = os.path.join(self.config_dir, 'access_token.' + name)
+      if not os.path.isdir(cache_dir):
+        os.makedirs(cache_dir)
+      backend = 'twitter'
+      if self.config.has_option(section, 'backend'):
+        backend = self.config.get(section, 'backend')
+      controller = self.init_twitter_api(token_file, cache_dir,
+          sessions.pool, sessions.connection_pool, backend)
+      scheduler = RefreshScheduler(self.settings.refresh,
+          requests_per_refresh=len(Session.refresh_endpoints))
+      outbox = Outbox(os.path.join(cache_dir, 'outbox'),
+          controller.post_status, self.outbox_notifier(name))
+      sessions.add(Session(name, controller, scheduler, scrollback, outbox))
+    return sessions
+
+  def outbox_notifier(self, name):
+    '''Returns a function which shows an account's outbox progress in the
+    bottom status bar.
+
+    '''
+    def notify(message):
+      if name != self.sessions.current.name:
+        message = ''.join(['[', name, '] ', message])
+      self.ui.put('status', message)
+    return notify
+
+  def init_twitter_api(self, token_file=None, cache_dir=None, pool=None,
+      connection_pool=None, backend='twitter'):
+    '''Creates and authenticates a controller.
+
+    backend -- where api calls go.  One of
+               twitter               the real api (default)
+               record FILE           the real api, recording calls to FILE
+               replay FILE [SPEEDUP] replay FILE, SPEEDUP times faster
+               synthetic RATE        a fake timeline of RATE tweets/sec
+
+    '''
+    if token_file is None:
+      token_file = os.path.join(self.config_dir, 'access_token')
+    api = goldfinchlib.controllers.multifetch.MultiFetchController(
+        cache_dir or GoldFinch.config_dir, self.settings.timeout, pool=pool,
+        connection_pool=connection_pool)
+    backend = backend.split()
+    if backend[0] == 'replay':
+      self.logger.info('replaying api calls from ' + backend[1])
+      speedup = len(backend) > 2 and float(backend[2]) or 1.0
+      api.api = replay.ReplayAPI(os.path.expanduser(backend[1]), speedup)
+      api.meter_api()
+      return api
+    if backend[0] == 'synthetic':
+      self.logger.info('using a synthetic timeline')
+      api.api = replay.SyntheticAPI(float(backend[1]))
+      api.meter_api()
+      return api
     if hasattr(self, 'main_window'):
       self.main_window.statusbar_bottom.add_text('Authenticating..', 'left')
+      self.main_window.compositor.flush()
     self.logger.info('Authenticating twitter api')
     try:
-      api.perform_auth(os.path.join(self.config_dir, 'access_token'))
+      api.perform_auth(token_file)
     except IOError as e:
       self.logger.error(e)
       if hasattr(self, 'main_window'):
         self.main_window.statusbar_bottom.add_text('Authentication error, see log for\
             info', 'left')
+    if backend[0] == 'record' and api.api is not None:
+      self.logger.info('recording api calls to ' + backend[1])
+      api.api = replay.RecordingAPI(api.api, os.path.expanduser(backend[1]))
+    api.meter_api()
     if hasattr(self, 'main_window'):
       self.main_window.statusbar_bottom.add_text('Ready', 'left')
     self.logger.info('Done')
@@ -309,27 +760,304 @@ class GoldFinch(object):
     (config_ok, reason) = config.ensure_config(mandatory_values)
     if not config_ok:
       self.cleanup(reason + ' is missing from config file.')
-    config = config.get_config()
     self.logger.info('Done')
     return config
 
+  def init_settings(self):
+    try:
+      return self.config_source.get_settings()
+    except ConfigError as e:
+      self.cleanup('Error in config file: %s' % e)
+
+  def check_config(self):
+    '''Called regularly by the loop: if goldfinchrc has been edited, load
+    it again and apply what changed.
+
+    '''
+    self.reactor.call_later(self.config_check_interval, self.check_config)
+    if not self.config_source.changed():
+      return
+    try:
+      settings = self.config_source.reload()
+    except ConfigError as e:
+      self.logger.error('not reloading config: %s' % e)
+      self.main_window.statusbar_bottom.add_text('Error in config file: %s' %
+          e, 'left')
+      return
+    old_settings = self.settings
+    self.config = self.config_source.get_config()
+    self.settings = settings
+    self.apply_settings(old_settings, settings)
+
+  def apply_settings(self, old, new):
+    '''Put reloaded settings into effect.'''
+    self.main_window.apply_settings(self.config, new)
+    for session in self.sessions.sessions:
+      if new.scrollback != session.scrollback:
+        session.set_scrollback(new.scrollback)
+      if new.refresh != old.refresh:
+        session.scheduler.set_base_interval(new.refresh)
+        if not session.refresh_pending:
+          self.schedule_refresh(session, session.scheduler.next_interval())
+    message = 'Reloaded config'
+    restart = restart_needed(old, new)
+    if restart:
+      message = '%s, restart for %s' % (message, ', '.join(restart))
+    self.main_window.statusbar_bottom.add_text(message, 'left')
+
   def init_main_window(self):
     self.logger.info('Initialising main window')
-    main_window = MainWindow(self.stdscr, self.config)
+    main_window = MainWindow(self.stdscr, self.config, self.init_history(),
+        self.complete, self.settings)
     main_window.draw()
+    main_window.set_bracketed_paste(True)
+    main_window.compositor.flush()
     self.logger.info('Done')
     return main_window
 
-  def init_refresh_thread(self):
-    # TODO: may need to add synchcronisation to pager view
-    # TODO: (related to above) only update screen if pager contents have changed
+  def schedule_refresh(self, session, interval):
+    '''Refresh session in interval seconds, instead of whenever it was
+    going to be.
+
+    '''
+    if session.next_refresh is not None:
+      session.next_refresh.cancel()
+    self.logger.debug('next refresh in %.0fs' % interval)
+    session.next_refresh = self.reactor.call_later(interval, self.refresh,
+        session)
+
+  def refresh(self, session=None):
+    '''Start fetching statuses newer than the last refresh, along with
+    mentions and direct messages.  Returns straight away: the results are
+    applied by fetched() as they arrive, and finish_refresh() schedules
+    the next one.  UI thread only.
+
+    session -- the account to refresh, defaults to the current one
+
+    '''
+    if session is None:
+      session = self.sessions.current
+    if session.refresh_pending:
+      self.logger.debug('refresh of %s already running' % session.name)
+      return
+    if session is self.sessions.current:
+      self.main_window.statusbar_bottom.add_text('Refreshing timeline..',
+          'left')
+    if not session.scheduler.start_refresh():
+      self.logger.info('rate limit budget used up, skipping refresh')
+      self.finish_refresh(session)
+      return
+    controller = session.controller
+    session.refresh_found = 0
+    session.refresh_pending = controller.poll(session.refresh_endpoints,
+        ret_queue=ChannelQueue(self.ui, 'fetched', session))
+    if not session.refresh_pending:
+      self.finish_refresh(session)
+      return
+    session.refresh_timeout = self.reactor.call_later(controller.timeout,
+        self.refresh_timed_out, session)
+
+  def fetched(self, results):
+    '''Apply a run of 'fetched' records, each a (session, (endpoint,
+    items, error)) result from a refresh.
+
+    '''
+    updates = []
+    finished = []
+    for session, (endpoint, items, error) in results:
+      if error is None:
+        if endpoint == 'home_timeline':
+          updates.append((session, tuple(items), ()))
+          session.refresh_found = session.refresh_found + len(items)
+        else:
+          updates.append((session, (), ((endpoint, len(items)),)))
+      # results arriving after the timeout are still shown, but that
+      # refresh has already been finished
+      if session.refresh_pending:
+        session.refresh_pending = session.refresh_pending - 1
+        if not session.refresh_pending:
+          finished.append(session)
+    self.apply_timeline_updates(updates)
+    for session in finished:
+      self.finish_refresh(session)
+
+  def refresh_timed_out(self, session):
+    session.refresh_timeout = None
+    if session.refresh_pending:
+      self.logger.info('%d requests timed out' % session.refresh_pending)
+      session.refresh_pending = 0
+      self.finish_refresh(session)
+
+  def finish_refresh(self, session):
+    '''Record how the refresh went and schedule the next one.'''
+    if session.refresh_timeout is not None:
+      session.refresh_timeout.cancel()
+      session.refresh_timeout = None
+    session.scheduler.record_activity(session.refresh_found)
+    if session.controller.quotas:
+      session.scheduler.update_quotas(session.controller.quotas)
+    if session is self.sessions.current:
+      self.main_window.statusbar_bottom.add_text('Done.', 'left')
+    self.schedule_refresh(session, session.scheduler.next_interval())
+
+  def init_ui_channel(self):
+    '''Creates the UIChannel background threads use to send what they
+    fetch to the UI thread.
+
+    '''
+    ui = UIChannel(wake=self.reactor.wake)
+    ui.register('timeline', self.apply_timeline_updates, batch=True)
+    ui.register('status', self.apply_status_messages, batch=True)
+    ui.register('fetched', self.fetched, batch=True)
+    ui.register('friends', self.add_listed, batch=True)
+    ui.register('lists', self.add_lists, batch=True)
+    return ui
+
+  def process_ui(self):
+    '''Called by the loop each time round: apply whatever the background
+    threads have sent and draw a frame if one is due.
+
+    Returns the longest the loop may wait before calling again, or None
+    if it can wait for the next input or timer.
+
+    '''
+    max_records = 500
+    drained = self.ui.drain(max_records)
+    wait = None
+    if self.show_metrics():
+      now = time.time()
+      if now >= self.metrics_due:
+        self.metrics_due = now + self.metrics_interval
+        self.draw_metrics()
+      wait = self.metrics_due - now
+    compositor = self.main_window.compositor
+    compositor.tick()
+    frame = compositor.wait_time()
+    if frame is not None and (wait is None or frame < wait):
+      wait = frame
+    if drained == max_records:
+      # there's more waiting
+      wait = 0
+    return wait
+
+  def add_listed(self, names):
+    '''Apply a run of 'friends' records, a None marks the end.'''
+    names = [name for (name,) in names if name is not None]
+    if names:
+      self.main_window.pager.add_text(names)
+
+  def add_lists(self, results):
+    '''Apply a run of 'lists' records, each an (endpoint, items, error)
+    result.
+
+    '''
+    for ((endpoint, items, error),) in results:
+      if error is None:
+        self.main_window.pager.add_text(items)
+
+  def apply_timeline_updates(self, updates):
+    '''Apply a run of 'timeline' records.
+
+    updates -- list of (session, statuses, unread) in the order they were
+               sent, statuses newest first and unread a tuple of
+               (endpoint, new items)
+
+    '''
+    new_statuses = {}  # {session:[status]}
+    for session, statuses, unread in updates:
+      for endpoint, count in unread:
+        session.unread[endpoint] = session.unread.get(endpoint, 0) + count
+      # later updates are newer, so they go on top
+      new_statuses[session] = list(statuses) + \
+          new_statuses.get(session, [])
+    for session in self.sessions.sessions:
+      self.add_session_statuses(session, new_statuses.get(session, []))
+
+  def apply_status_messages(self, messages):
+    # only the latest message would be visible anyway
+    self.main_window.statusbar_bottom.add_text(messages[-1][0], 'left')
+
+  def add_session_statuses(self, session, statuses):
+    '''Add new statuses to the top of a session's view, and to the pager
+    if that session is the one on screen.  UI thread only.
+
+    '''
+    statuses = session.add_statuses(statuses)
+    if statuses:
+      if session is self.sessions.current:
+        self.main_window.pager.prepend_text(statuses)
+      else:
+        session.new_statuses = session.new_statuses + len(statuses)
+    self.draw_account_status()
+
+  def show_snapshot(self, snapshot):
+    '''Draw the timeline saved by the last run into the pager.'''
+    if not snapshot:
+      return
+    account = snapshot['accounts'].get(snapshot['current'])
+    if account and account['statuses']:
+      self.main_window.pager.add_text(list(account['statuses']))
+      (status_id, offset) = snapshot['position']
+      if status_id is not None:
+        self.main_window.pager.scroll_to(status_id, offset)
+
+  def restore_snapshot(self, snapshot):
+    '''Seed each session with its statuses, and the newest ids it had
+    seen on each endpoint, from the last run, so the first refresh only
+    fetches what is newer.
+
+    '''
+    if not snapshot:
+      return
+    for session in self.sessions.sessions:
+      account = snapshot['accounts'].get(session.name)
+      if account:
+        session.add_statuses(account['statuses'])
+        session.controller.newest_id = account['newest_id']
+        if hasattr(session.controller, 'newest_ids'):
+          session.controller.newest_ids.update(account['newest_ids'])
+    if self.sessions.switch(snapshot['current']) is None:
+      # the account shown by show_snapshot has gone from goldfinchrc
+      self.main_window.pager.erase()
+      self.main_window.pager.add_text(self.sessions.current.view())
+
+  def draw_account_status(self):
+    '''Show unread counts for the current account, and how many new
+    statuses the others have, in the top status bar.
+
+    '''
+    current = self.sessions.current
+    text = ['@%d dm:%d' % (current.unread.get('mentions', 0),
+        current.unread.get('direct_messages', 0))]
+    for session in self.sessions.sessions:
+      if session is not current and session.new_statuses:
+        text.append('%s:+%d' % (session.name, session.new_statuses))
+    self.main_window.statusbar_top.add_text(' '.join(text), 'right')
+
+  def switch_account(self, name):
+    session = self.sessions.switch(name)
+    if session is None:
+      self.main_window.statusbar_bottom.add_text('No account ' + name, 'left')
+      return
     self.main_window.pager.erase()
-    self.main_window.pager_ypos = 0
-    for screen_name, status, created_at in self.controller.get_home_timeline(30):
-      self.main_window.pager.add_text(\
-          self.format_status_line(screen_name, status, created_at))
-    interval = int(self.config.get('preferences', 'refresh'))
-    threading.Timer(interval, self.init_refresh_thread).start()
+    self.main_window.pager.add_text(session.view())
+    self.main_window.statusbar_top.add_text(''.join(['goldfinch ',
+        GoldFinch.__version__, ' [', session.name, ']']), 'left')
+    self.draw_account_status()
+
+  def init_stream(self, session):
+    '''Switch an account's home timeline from polling to the streaming
+    api.  The refresh thread carries on polling the other endpoints.
+
+    '''
+    self.logger.info('starting timeline stream for ' + session.name)
+    session.refresh_endpoints = tuple([endpoint for endpoint in
+        session.refresh_endpoints if endpoint != 'home_timeline'])
+    session.scheduler.set_requests_per_refresh(
+        len(session.refresh_endpoints))
+    def add_streamed_status(status):
+      self.ui.put('timeline', session, (status,), ())
+    session.controller.start_stream(add_streamed_status)
 
   def format_status_line(self, screen_name, message, timestamp):
     '''Formats a status line for the pager, so everything aligns nicely.  A status line
@@ -339,26 +1067,7 @@ class GoldFinch(object):
     message -- message content
     timestamp -- time the message was posted
     '''
-    screen_name_padding = 20
-    the_content = []
-    max_chunk_size = self.main_window.term_width - screen_name_padding
-
-    # add the first chunk of content, right justified
-    the_content.append(''.join([screen_name.ljust(screen_name_padding), 
-        message[0:max_chunk_size]]))
-
-    # if there are more chunks, break onto subsequent lines
-    # chunk_size*2 to start at the second chunk in line
-    if max_chunk_size < len(message):
-      for i in range(max_chunk_size*2, len(message)+max_chunk_size, max_chunk_size):
-        this_chunk_size = len(message[i-max_chunk_size:i])
-        the_content.append(message[i-max_chunk_size:i]\
-            .rjust(screen_name_padding+this_chunk_size))
-
-    # add a new line 
-    the_content.append('')
-
-    return the_content
+    return format_status(screen_name, message, self.main_window.term_width)
 
   def cleanup(self, error_msg=None):
     '''Clean up, write out an optional error message and exit.  (No error
@@ -366,17 +1075,26 @@ class GoldFinch(object):
     
     '''
     ret = 0
+    if hasattr(self, 'sessions') and hasattr(self, 'main_window'):
+      try:
+        save_snapshot(self.snapshot_file, self.sessions,
+            self.main_window.pager.position())
+      except (IOError, OSError) as e:
+        self.logger.error('could not save timeline snapshot: %s' % e)
+    if hasattr(self, 'main_window'):
+      self.main_window.set_bracketed_paste(False)
     if hasattr(self, 'stdscr'):
       curses.endwin() 
     if error_msg:
       ret = 1
       print(error_msg)
     self.logger.info('exiting..')
-    # kill off any remaining Timer threads 
-    # this seems necessary on my ubuntu x86 system but not openbsd (?)
-    for t in threading.enumerate():
-      if type(t) is threading._Timer:
-        t.cancel() 
+    if hasattr(self, 'sessions'):
+      for session in self.sessions.sessions:
+        session.controller.stop_stream()
+        session.outbox.stop()
+    if hasattr(self, 'reactor'):
+      self.reactor.stop()
     exit(ret)
 
 def main():
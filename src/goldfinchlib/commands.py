@@ -0,0 +1,234 @@
+#!/usr/bin/env python
+
+# Copyright (C) 2010 Paul Bourke <pauldbourke@gmail.com>
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+# $Id$
+# ex: expandtab tabstop=2 shiftwidth=2:
+
+
+class CommandError(Exception):
+  '''A command line which can't be run.  The message says why, for the
+  status bar.
+
+  '''
+  pass
+
+class Arg(object):
+  '''One argument of a Command.'''
+
+  def __init__(self, name, convert=str, choices=None, optional=False,
+      rest=False):
+    '''Initialises an Arg.
+
+    name -- shown in the usage message
+    convert -- function turning the word typed into the value passed to the
+               command, raising ValueError if it can't
+    choices -- list of the words allowed, or a function returning the
+               words to offer when completing (these aren't enforced)
+    optional -- None is passed if the argument is left out
+    rest -- the argument is the rest of the line, spaces and all
+
+    '''
+    self.name = name
+    self.convert = convert
+    self.choices = choices
+    self.optional = optional
+    self.rest = rest
+
+  def words(self):
+    '''The words to complete the argument from.'''
+    if self.choices is None:
+      return []
+    if callable(self.choices):
+      return self.choices()
+    return self.choices
+
+  def parse(self, word):
+    if isinstance(self.choices, (list, tuple)):
+      matches = [choice for choice in self.choices
+          if choice.lower() == word.lower()]
+      if not matches:
+        raise CommandError('%s must be one of %s' % (self.name,
+            ', '.join(self.choices)))
+      word = matches[0]
+    try:
+      return self.convert(word)
+    except ValueError as e:
+      raise CommandError('bad %s: %s' % (self.name, e))
+
+  def usage(self):
+    if isinstance(self.choices, (list, tuple)):
+      text = '|'.join(self.choices)
+    else:
+      text = self.name.upper()
+    if self.rest:
+      text = text + '...'
+    if self.optional:
+      text = ''.join(['[', text, ']'])
+    return text
+
+class Command(object):
+  '''A command typed into the input box, e.g. ':list friends'.'''
+
+  def __init__(self, name, func, args=(), aliases=(), help=''):
+    '''Initialises a Command.
+
+    name -- what's typed to run it, e.g. ':list'
+    func -- called with the value of each of args
+    args -- list of Args, in order.  Only the last may be rest
+    aliases -- other names for it, e.g. ':l'
+    help -- one line description
+
+    '''
+    self.name = name
+    self.func = func
+    self.args = list(args)
+    self.aliases = list(aliases)
+    self.help = help
+
+  def usage(self):
+    return ' '.join([self.name] + [arg.usage() for arg in self.args])
+
+class _Node(object):
+  __slots__ = ('command', 'children')
+
+  def __init__(self):
+    self.command = None
+    self.children = {}  # {char:_Node}
+
+class CommandRegistry(object):
+  '''The commands which can be typed, found by name or alias and parsed
+  into typed arguments.
+
+  Command names are kept in a trie, a character per level, so completing
+  a prefix only visits the names which start with it.  A unique prefix
+  of a name runs that command, as in vi.
+
+  '''
+
+  def __init__(self):
+    self.root = _Node()
+    self.commands = {}  # {name or alias:Command}
+
+  def add(self, command):
+    for name in [command.name] + command.aliases:
+      assert name not in self.commands, 'duplicate command ' + name
+      self.commands[name] = command
+    node = self.root
+    for char in command.name:
+      node = node.children.setdefault(char, _Node())
+    node.command = command
+
+  def names(self):
+    '''Every command's name, in order.'''
+    return self.complete_name('')
+
+  def complete_name(self, prefix):
+    '''Returns the names of the commands starting with prefix, in order.'''
+    node = self.root
+    for char in prefix:
+      node = node.children.get(char)
+      if node is None:
+        return []
+    names = []
+    stack = [node]
+    while stack:
+      node = stack.pop()
+      if node.command is not None:
+        names.append(node.command.name)
+      stack.extend(node.children.values())
+    names.sort()
+    return names
+
+  def find(self, name):
+    '''Returns the command called name, or which is the only one starting
+    with name.  Raises CommandError if there isn't exactly one.
+
+    '''
+    command = self.commands.get(name)
+    if command is not None:
+      return command
+    names = self.complete_name(name)
+    if len(names) == 1:
+      return self.commands[names[0]]
+    if names:
+      raise CommandError('Ambiguous command %s: %s' % (name,
+          ' '.join(names)))
+    raise CommandError('Unknown command.  Try :help')
+
+  def parse(self, line):
+    '''Split line into a command and the values of its arguments.
+
+    Returns a tuple of (Command, [value]).  Raises CommandError if line
+    isn't a valid command.
+
+    '''
+    parts = line.strip().split(None, 1)
+    if not parts:
+      raise CommandError('Unknown command.  Try :help')
+    command = self.find(parts[0])
+    rest = len(parts) > 1 and parts[1] or ''
+    values = []
+    for arg in command.args:
+      rest = rest.strip()
+      if arg.rest:
+        (word, rest) = (rest, '')
+      else:
+        parts = rest.split(None, 1)
+        word = parts and parts[0] or ''
+        rest = len(parts) > 1 and parts[1] or ''
+      if not word:
+        if not arg.optional:
+          raise CommandError('usage: ' + command.usage())
+        values.append(None)
+      else:
+        values.append(arg.parse(word))
+    if rest.strip():
+      raise CommandError('usage: ' + command.usage())
+    return (command, values)
+
+  def run(self, line):
+    '''Parse line and run the command.  Returns what the command returns.'''
+    (command, values) = self.parse(line)
+    return command.func(*values)
+
+  def complete(self, text):
+    '''Find what the last word of text, a command line up to the cursor,
+    could be completed to: a command name, or one of the words allowed
+    for the argument being typed.
+
+    Returns a tuple of (where the word starts in text, [completion]).
+
+    '''
+    start = max(text.rfind(' '), text.rfind('\t')) + 1
+    word = text[start:]
+    words = text[:start].split()
+    if not words:
+      return (start, self.complete_name(word))
+    try:
+      command = self.find(words[0])
+    except CommandError as e:
+      return (start, [])
+    i = len(words) - 1  # the argument being typed
+    for (n, arg) in enumerate(command.args):
+      if arg.rest and n <= i:
+        i = n
+        break
+    if i >= len(command.args):
+      return (start, [])
+    word = word.lower()
+    return (start, sorted([choice for choice in command.args[i].words()
+        if choice.lower().startswith(word)]))
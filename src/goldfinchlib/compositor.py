@@ -0,0 +1,119 @@
+#!/usr/bin/env python
+
+# Copyright (C) 2010 Paul Bourke <pauldbourke@gmail.com>
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+# $Id$
+# ex: expandtab tabstop=2 shiftwidth=2:
+
+import curses
+import logging
+import threading
+import time
+
+class Compositor(object):
+  '''Coalesces redraws.  Widgets call mark_dirty() instead of refreshing
+  the screen themselves, and each frame the compositor has every dirty
+  widget render into its window, copies those windows to curses' virtual
+  screen with noutrefresh() and then writes the lot to the terminal with a
+  single doupdate().  curses only sends the cells which changed, so a burst
+  of new statuses costs one terminal write per frame, and frames are at
+  most max_fps per second.  Only the thread which owns the screen may call
+  flush() or tick(); mark_dirty() is safe from any thread.
+
+  A widget has a render() method which draws into its window attribute
+  without refreshing it.
+
+  '''
+
+  def __init__(self, max_fps=30, update=None, clock=time.time):
+    '''Initialises a Compositor.
+
+    max_fps -- most frames to write per second
+    update -- function writing the virtual screen to the terminal,
+              defaults to curses.doupdate
+    clock -- function returning the current time in seconds
+
+    '''
+    self.logger = logging.getLogger(''.join(
+        ['goldfinch', '.', self.__class__.__name__]))
+    self.set_max_fps(max_fps)
+    self.update = update or curses.doupdate
+    self.clock = clock
+    self.widgets = []  # in drawing order, bottom first
+    self.dirty = set()
+    self.focus = None  # window which gets the cursor after each frame
+    self.lock = threading.Lock()
+    self.last_frame = 0
+    self.frames = 0
+
+  def set_max_fps(self, max_fps):
+    self.frame_interval = 1.0 / max_fps
+
+  def add(self, widget):
+    '''Add a widget, drawn above those added before it.'''
+    self.widgets.append(widget)
+    widget.compositor = self
+    self.mark_dirty(widget)
+
+  def mark_dirty(self, widget):
+    '''Schedule widget to be rendered in the next frame.'''
+    with self.lock:
+      self.dirty.add(widget)
+
+  def flush(self):
+    '''Render and write out whatever is dirty, now.  Returns False if
+    there was nothing to do.
+
+    '''
+    with self.lock:
+      dirty = self.dirty
+      self.dirty = set()
+    if not dirty:
+      return False
+    for widget in self.widgets:
+      if widget in dirty:
+        widget.render()
+        widget.window.noutrefresh()
+    if self.focus is not None:
+      self.focus.noutrefresh()
+    self.update()
+    self.frames = self.frames + 1
+    self.last_frame = self.clock()
+    return True
+
+  def wait_time(self):
+    '''Seconds until the next frame should be drawn, None if nothing is
+    dirty.
+
+    '''
+    with self.lock:
+      if not self.dirty:
+        return None
+    return max(self.last_frame + self.frame_interval - self.clock(), 0)
+
+  def tick(self):
+    '''Flush if anything is dirty and a frame is due.  Meant to be called
+    regularly by the thread which owns the screen, e.g. whenever it is
+    waiting for input.
+
+    '''
+    if self.clock() - self.last_frame < self.frame_interval:
+      return False
+    try:
+      return self.flush()
+    except curses.error as e:
+      self.logger.error(e)
+      return False
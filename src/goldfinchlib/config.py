@@ -18,19 +18,111 @@
 # $Id$
 # ex: expandtab tabstop=2 shiftwidth=2:
 
+import collections
 import logging
+import os
 import ConfigParser
 
+class ConfigError(Exception):
+  '''A config file which can't be used.  The message says why.'''
+  pass
+
+def integer(minimum=None):
+  '''Returns a converter for whole numbers of at least minimum.'''
+  def convert(value):
+    try:
+      number = int(value)
+    except ValueError:
+      raise ValueError('must be a whole number')
+    if minimum is not None and number < minimum:
+      raise ValueError('must be at least %d' % minimum)
+    return number
+  return convert
+
+def boolean(value):
+  '''yes/no, on/off, true/false or 1/0, as ConfigParser.getboolean'''
+  if value.lower() not in ConfigParser.RawConfigParser._boolean_states:
+    raise ValueError('must be yes or no')
+  return ConfigParser.RawConfigParser._boolean_states[value.lower()]
+
+class Option(object):
+  '''An option in the [preferences] section.'''
+
+  def __init__(self, name, convert, default, live=True):
+    '''Initialises an Option.
+
+    name -- the option's name, in lower case
+    convert -- function turning the text in the file into the value,
+               raising ValueError if it isn't valid
+    default -- value if the option isn't given
+    live -- whether a change can be applied without restarting
+
+    '''
+    self.name = name
+    self.convert = convert
+    self.default = default
+    self.live = live
+
+  def parse(self, cp, section='preferences'):
+    if cp is None or not cp.has_option(section, self.name):
+      return self.default
+    value = cp.get(section, self.name).strip()
+    try:
+      return self.convert(value)
+    except ValueError as e:
+      raise ConfigError('%s = %s in [%s]: %s' % (self.name, value, section,
+          e))
+
+schema = [
+  Option('refresh', integer(1), 120),
+  Option('timeout', integer(1), 60, live=False),  # set on the sockets
+  Option('scrollback', integer(1), 10000),
+  Option('framerate', integer(1), 30),
+  Option('historysize', integer(0), 1000),
+  Option('streaming', boolean, False, live=False),
+  Option('splitlongposts', boolean, False),
+  Option('showmetrics', boolean, True),
+]
+
+# the [preferences] typed and checked against schema.  A tuple, so it can
+# be handed around and compared without anyone changing it underneath
+Settings = collections.namedtuple('Settings',
+    [option.name for option in schema])
+
+def parse_settings(cp):
+  '''Returns the Settings in a ConfigParser, defaults for those not
+  given.  Raises ConfigError if any are invalid.
+
+  cp -- the ConfigParser, or None for all defaults
+
+  '''
+  return Settings(*[option.parse(cp) for option in schema])
+
+def restart_needed(old, new):
+  '''Returns the names of the options which differ between two Settings
+  but can't be changed without a restart.
+
+  '''
+  return [option.name for option in schema if not option.live and
+      getattr(old, option.name) != getattr(new, option.name)]
+
 class Config:
   '''Provides convenience methods for loading a config file and validating
   it's contents.
 
+  The [preferences] are parsed once, into Settings, by get_settings().
+  changed() says whether the file has been edited since it was loaded,
+  and reload() loads it again.
+
   '''
   
   def __init__(self):
     self.logger = logging.getLogger(''.join(\
         ['goldfinch', '.', self.__class__.__name__]))
     self.cp = None
+    self.filename = None
+    self.stamp = None  # (mtime, size) of the file when it was read
+    self.settings = None
 
   def load_config(self, filename):
     '''Loads a config file using the ConfigParser module.
@@ -39,7 +131,10 @@ class Config:
     
     '''
     assert filename, 'filename is empty in call to Config.load_config'
+    self.filename = filename
+    self.stamp = self._stamp()
     self.cp = ConfigParser.SafeConfigParser()
+    self.settings = None
     ret = self.cp.read(filename)
     return ret
 
@@ -58,3 +153,43 @@ class Config:
     assert self.cp, 'Config.cp is None, try Config.load_config first'
     return self.cp
 
+  def get_settings(self):
+    '''Returns the Settings from the loaded config, parsing them the first
+    time.  Raises ConfigError if they aren't valid.
+
+    '''
+    if self.settings is None:
+      self.settings = parse_settings(self.cp)
+    return self.settings
+
+  def changed(self):
+    '''Whether the file has changed since it was loaded.'''
+    return self.filename is not None and self._stamp() != self.stamp
+
+  def reload(self):
+    '''Load the file again.  If it can't be parsed, or its settings aren't
+    valid, the config already loaded is kept and ConfigError is raised.
+    Either way it isn't tried again until the file next changes.
+
+    Returns the new Settings.
+
+    '''
+    self.stamp = self._stamp()
+    cp = ConfigParser.SafeConfigParser()
+    try:
+      if not cp.read(self.filename):
+        raise ConfigError('could not read ' + self.filename)
+      settings = parse_settings(cp)
+    except ConfigParser.Error as e:
+      raise ConfigError(str(e).replace('\n', ' '))
+    self.cp = cp
+    self.settings = settings
+    self.logger.info('reloaded ' + self.filename)
+    return settings
+
+  def _stamp(self):
+    try:
+      info = os.stat(self.filename)
+    except OSError as e:
+      return None
+    return (info.st_mtime, info.st_size)
@@ -0,0 +1,250 @@
+#!/usr/bin/env python
+
+# Copyright (C) 2010 Paul Bourke <pauldbourke@gmail.com>
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+# $Id$
+# ex: expandtab tabstop=2 shiftwidth=2:
+
+import gzip
+import httplib
+import logging
+import socket
+import threading
+import StringIO
+
+# requests which can safely be sent twice
+IDEMPOTENT_METHODS = ('GET', 'HEAD')
+
+class ConnectionPool(object):
+  '''A thread safe pool of keep-alive httplib connections, keyed by host.
+
+  Connections are checked out by one thread at a time and go back into the
+  pool when closed, so a refresh doesn't pay for a new TCP and TLS handshake
+  each time.  Responses are requested gzip compressed and decompressed
+  transparently.
+
+  '''
+
+  def __init__(self, max_idle_per_host=4, timeout=60):
+    '''Initialises a ConnectionPool.
+
+    max_idle_per_host -- idle connections kept open for each host, any more
+                         are closed when returned
+    timeout -- socket timeout for new connections, in seconds
+
+    '''
+    self.logger = logging.getLogger(''.join(
+        ['goldfinch', '.', self.__class__.__name__]))
+    self.max_idle_per_host = max_idle_per_host
+    self.timeout = timeout
+    self.idle = {}  # {(secure, host):[httplib connection]}
+    self.lock = threading.Lock()
+    self.created = 0
+    self.reused = 0
+    self.local = threading.local()  # .response, the last on each thread
+
+  def connection(self, host, secure=True, timeout=None):
+    '''Check out a PooledConnection to host, reusing an idle one if
+    possible.
+
+    '''
+    key = (secure, host)
+    conn = None
+    with self.lock:
+      if self.idle.get(key):
+        conn = self.idle[key].pop()
+        self.reused = self.reused + 1
+      else:
+        self.created = self.created + 1
+    if conn is None:
+      conn = self._new_connection(key, timeout)
+      return PooledConnection(self, key, conn, False)
+    return PooledConnection(self, key, conn, True)
+
+  def hit_rate(self):
+    '''Fraction of checkouts which reused an open connection.'''
+    total = self.created + self.reused
+    if not total:
+      return 0.0
+    return self.reused / float(total)
+
+  def last_response(self):
+    '''Returns the last PooledResponse received on the calling thread, or
+    None.  Unlike tweepy's API.last_response, calls on other threads don't
+    overwrite it.
+
+    '''
+    return getattr(self.local, 'response', None)
+
+  def forget_response(self):
+    '''Drop the calling thread's last response, so an api call which is
+    answered without a request (e.g. from a cache) isn't taken to have
+    received it.
+
+    '''
+    self.local.response = None
+
+  def release(self, key, conn):
+    '''Return a connection to the pool, or close it if the pool is full.'''
+    with self.lock:
+      idle = self.idle.setdefault(key, [])
+      if len(idle) < self.max_idle_per_host:
+        idle.append(conn)
+        return
+    conn.close()
+
+  def close_all(self):
+    with self.lock:
+      idle = self.idle
+      self.idle = {}
+    for conns in idle.values():
+      for conn in conns:
+        conn.close()
+
+  def httplib_shim(self):
+    '''Returns an object which can stand in for the httplib module in code
+    which creates its own connections, e.g. tweepy.binder, so that those
+    connections come from this pool.
+
+    '''
+    return HttplibShim(self)
+
+  def _new_connection(self, key, timeout):
+    (secure, host) = key
+    if timeout is None:
+      timeout = self.timeout
+    if secure:
+      return httplib.HTTPSConnection(host, timeout=timeout)
+    return httplib.HTTPConnection(host, timeout=timeout)
+
+class PooledConnection(object):
+  '''Wraps an httplib connection checked out of a ConnectionPool.  Has the
+  request/getresponse/close interface of httplib.HTTPConnection, but close()
+  hands the connection back to the pool.
+
+  '''
+
+  def __init__(self, pool, key, conn, reused):
+    self.pool = pool
+    self.key = key
+    self.conn = conn
+    self.reused = reused
+    self.reusable = False
+    self.last_request = None
+
+  def request(self, method, url, body=None, headers={}):
+    headers = dict(headers)
+    headers.setdefault('Accept-Encoding', 'gzip')
+    self.last_request = (method, url, body, headers)
+    try:
+      self.conn.request(method, url, body, headers)
+    except (socket.error, httplib.HTTPException) as e:
+      if not self._can_retry():
+        raise
+      self._reconnect()
+      self.conn.request(method, url, body, headers)
+
+  def getresponse(self):
+    try:
+      response = self.conn.getresponse()
+    except (socket.error, httplib.BadStatusLine) as e:
+      # most likely the server dropped an idle keep-alive connection before
+      # we sent the request, but it may have been seen, so only try again on
+      # a fresh one if that's harmless.  A failed POST goes back to the
+      # caller, e.g. for the outbox to retry or not as it sees fit
+      if not self._can_retry():
+        raise
+      self._reconnect()
+      self.conn.request(*self.last_request)
+      response = self.conn.getresponse()
+    response = PooledResponse(response)
+    self.pool.local.response = response
+    self.reusable = not response.will_close
+    return response
+
+  def close(self):
+    if self.conn is None:
+      return
+    if self.reusable:
+      self.pool.release(self.key, self.conn)
+    else:
+      self.conn.close()
+    self.conn = None
+
+  def _can_retry(self):
+    return self.reused and self.last_request[0] in IDEMPOTENT_METHODS
+
+  def _reconnect(self):
+    self.pool.logger.debug('stale connection to %s, reconnecting' %
+        self.key[1])
+    self.conn.close()
+    self.conn = self.pool._new_connection(self.key, None)
+    self.reused = False
+
+class PooledResponse(object):
+  '''An httplib.HTTPResponse whose body has been read up front (freeing the
+  connection for the next request) and gunzipped if necessary.
+
+  '''
+
+  def __init__(self, response):
+    self.status = response.status
+    self.reason = response.reason
+    self.msg = response.msg
+    self.version = response.version
+    self.will_close = response.will_close
+    self._headers = response
+    body = response.read()
+    if response.getheader('content-encoding', '').lower() == 'gzip':
+      body = gzip.GzipFile(fileobj=StringIO.StringIO(body)).read()
+    self.body = StringIO.StringIO(body)
+
+  def read(self, amt=None):
+    if amt is None:
+      return self.body.read()
+    return self.body.read(amt)
+
+  def getheader(self, name, default=None):
+    if name.lower() == 'content-encoding':
+      return default
+    return self._headers.getheader(name, default)
+
+  def getheaders(self):
+    return [(name, value) for (name, value) in self._headers.getheaders()
+        if name.lower() != 'content-encoding']
+
+class HttplibShim(object):
+  '''Looks enough like the httplib module for tweepy.binder, but hands out
+  pooled connections.  Anything else is looked up in the real httplib.
+
+  '''
+
+  def __init__(self, pool):
+    self.pool = pool
+
+  def HTTPConnection(self, host, port=None, strict=None, timeout=None):
+    if port:
+      host = '%s:%s' % (host, port)
+    return self.pool.connection(host, False, timeout)
+
+  def HTTPSConnection(self, host, port=None, key_file=None, cert_file=None,
+      strict=None, timeout=None):
+    if port:
+      host = '%s:%s' % (host, port)
+    return self.pool.connection(host, True, timeout)
+
+  def __getattr__(self, name):
+    return getattr(httplib, name)
@@ -42,10 +42,10 @@ class Controller:
     '''
     raise NotImplementedError
 
-  def get_friends(self, ret_queue):
+  def get_friends(self, ret_queue=None):
     '''Query the api for the user's list of friends.
 
-    ret_queue -- Queue.Queue to put the result into
+    ret_queue -- optional Queue.Queue to put each result into as it arrives
     
     '''
     raise NotImplementedError
@@ -0,0 +1,217 @@
+#!/usr/bin/env python
+
+# Copyright (C) 2010 Paul Bourke <pauldbourke@gmail.com>
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+# $Id$
+# ex: expandtab tabstop=2 shiftwidth=2:
+
+import datetime
+import threading
+import time
+
+class FakeUser(object):
+  '''Stands in for a tweepy.models.User'''
+
+  def __init__(self, user_id, screen_name):
+    self.id = user_id
+    self.screen_name = screen_name
+
+class FakeStatus(object):
+  '''Stands in for a tweepy.models.Status'''
+
+  def __init__(self, status_id, user, text, created_at):
+    self.id = status_id
+    self.user = user
+    self.text = text
+    self.created_at = created_at
+
+class FakeDirectMessage(object):
+  '''Stands in for a tweepy.models.DirectMessage'''
+
+  def __init__(self, message_id, sender_screen_name, text, created_at):
+    self.id = message_id
+    self.sender_screen_name = sender_screen_name
+    self.text = text
+    self.created_at = created_at
+
+class FakeList(object):
+  '''Stands in for a tweepy.models.List'''
+
+  def __init__(self, list_id, name):
+    self.id = list_id
+    self.name = name
+
+class FakeResponse(object):
+  '''Stands in for the httplib.HTTPResponse tweepy keeps as
+  API.last_response.  FakeTwitterAPI keeps one per thread, as goldfinch
+  gets them from its connection pool for the real api.
+
+  '''
+
+  def __init__(self, headers):
+    self.headers = headers
+
+  def getheader(self, name, default=None):
+    return self.headers.get(name, default)
+
+class FakeRateLimitError(Exception):
+  '''Raised when a FakeTwitterAPI's rate limit is used up (http 429)'''
+  pass
+
+class FakeTwitterAPI(object):
+  '''A local, in-memory imitation of the parts of tweepy.API goldfinch uses.
+  Every call sleeps for latency seconds to mimic a network round trip, so it
+  can be used to measure how many round trips a piece of code makes without
+  touching the real api.
+
+  '''
+
+  def __init__(self, num_friends=0, latency=0.0):
+    '''Initialises a FakeTwitterAPI.
+
+    num_friends -- number of friends the fake user follows
+    latency -- seconds each call takes, see also latencies
+
+    '''
+    self.screen_name = 'me'
+    self.latency = latency
+    self.latencies = {}  # {method name:seconds}, overrides latency
+    self.users = {}
+    self.friend_ids = []
+    self.statuses = []  # newest first
+    self.mention_statuses = []
+    self.messages = []
+    self.user_lists = []
+    self.calls = {}
+    self.lock = threading.Lock()
+    self.responses = threading.local()  # .last, the last on each thread
+    self.quota_limit = None  # set to rate limit the api, see set_rate_limit
+    for i in range(1, num_friends+1):
+      self.add_friend(i, 'friend%d' % i)
+
+  @property
+  def last_response(self):
+    return getattr(self.responses, 'last', None)
+
+  def add_friend(self, user_id, screen_name):
+    self.users[user_id] = FakeUser(user_id, screen_name)
+    self.friend_ids.append(user_id)
+
+  def remove_friend(self, user_id):
+    self.friend_ids.remove(user_id)
+
+  def add_status(self, screen_name, text, created_at=None):
+    '''Puts a new status at the top of the home timeline.'''
+    if created_at is None:
+      created_at = datetime.datetime.utcnow()
+    status_id = self.statuses and self.statuses[0].id + 1 or 1
+    status = FakeStatus(status_id, FakeUser(0, screen_name), text, created_at)
+    self.statuses.insert(0, status)
+    return status
+
+  def add_mention(self, screen_name, text, created_at=None):
+    '''Adds a status which mentions the user.'''
+    status = self.add_status(screen_name, text, created_at)
+    self.mention_statuses.insert(0, status)
+    return status
+
+  def add_direct_message(self, screen_name, text, created_at=None):
+    if created_at is None:
+      created_at = datetime.datetime.utcnow()
+    message_id = self.messages and self.messages[0].id + 1 or 1
+    message = FakeDirectMessage(message_id, screen_name, text, created_at)
+    self.messages.insert(0, message)
+    return message
+
+  def add_list(self, name):
+    self.user_lists.append(FakeList(len(self.user_lists) + 1, name))
+
+  def set_rate_limit(self, limit, window=900):
+    '''Allow only limit calls per window seconds.'''
+    self.quota_limit = limit
+    self.quota_window = window
+    self.quota_remaining = limit
+    self.quota_reset = int(time.time()) + window
+
+  def call_count(self, name=None):
+    '''Number of calls made to method name, or to all methods if None.'''
+    if name is None:
+      return sum(self.calls.values())
+    return self.calls.get(name, 0)
+
+  def friends_ids(self):
+    self._call('friends_ids')
+    return list(self.friend_ids)
+
+  def get_user(self, user_id):
+    self._call('get_user')
+    return self.users[user_id]
+
+  def lookup_users(self, user_ids):
+    assert len(user_ids) <= 100, 'users/lookup takes at most 100 ids'
+    self._call('lookup_users')
+    return [self.users[i] for i in user_ids if i in self.users]
+
+  def home_timeline(self, count=20, since_id=None, max_id=None):
+    self._call('home_timeline')
+    return self._page(self.statuses, count, since_id, max_id)
+
+  def mentions(self, count=20, since_id=None, max_id=None):
+    self._call('mentions')
+    return self._page(self.mention_statuses, count, since_id, max_id)
+
+  def direct_messages(self, count=20, since_id=None, max_id=None):
+    self._call('direct_messages')
+    return self._page(self.messages, count, since_id, max_id)
+
+  def lists(self):
+    self._call('lists')
+    return list(self.user_lists)
+
+  def update_status(self, status, in_reply_to_status_id=None):
+    self._call('update_status')
+    posted = self.add_status(self.screen_name, status)
+    posted.in_reply_to_status_id = in_reply_to_status_id
+    return posted
+
+  def _page(self, items, count, since_id, max_id):
+    page = []
+    for item in items:
+      if max_id is not None and item.id > max_id:
+        continue
+      if since_id is not None and item.id <= since_id:
+        break
+      page.append(item)
+      if len(page) == count:
+        break
+    return page
+
+  def _call(self, name):
+    with self.lock:
+      self.calls[name] = self.calls.get(name, 0) + 1
+      if self.quota_limit is not None:
+        if time.time() >= self.quota_reset:
+          self.quota_remaining = self.quota_limit
+          self.quota_reset = int(time.time()) + self.quota_window
+        if self.quota_remaining <= 0:
+          raise FakeRateLimitError('rate limit exceeded')
+        self.quota_remaining = self.quota_remaining - 1
+        self.responses.last = FakeResponse({
+            'x-rate-limit-remaining': str(self.quota_remaining),
+            'x-rate-limit-reset': str(self.quota_reset)})
+    latency = self.latencies.get(name, self.latency)
+    if latency:
+      time.sleep(latency)
@@ -0,0 +1,99 @@
+#!/usr/bin/env python
+
+# Copyright (C) 2010 Paul Bourke <pauldbourke@gmail.com>
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+# $Id$
+# ex: expandtab tabstop=2 shiftwidth=2:
+
+import collections
+import threading
+import time
+
+class ApiMetrics(object):
+  '''Counts the api calls made over the last minute and how long they
+  took, for showing what the client is costing in requests.
+
+  '''
+
+  def __init__(self, window=60.0, clock=time.time):
+    '''Initialises an ApiMetrics.
+
+    window -- seconds of calls to keep, requests_per_minute and latency
+              are worked out over these
+    clock -- function returning the current time in seconds
+
+    '''
+    self.window = window
+    self.clock = clock
+    self.calls = collections.deque()  # (finished at, seconds taken)
+    self.total = 0
+    self.errors = 0
+    self.lock = threading.Lock()
+
+  def record(self, elapsed, error=False):
+    '''Note a call which took elapsed seconds.'''
+    with self.lock:
+      self.calls.append((self.clock(), elapsed))
+      self.total = self.total + 1
+      if error:
+        self.errors = self.errors + 1
+      self._expire()
+
+  def requests_per_minute(self):
+    with self.lock:
+      self._expire()
+      return len(self.calls) * 60.0 / self.window
+
+  def latency(self):
+    '''Mean seconds per call over the window, or None if there were
+    none.
+
+    '''
+    with self.lock:
+      self._expire()
+      if not self.calls:
+        return None
+      return sum([elapsed for (end, elapsed) in self.calls]) / len(self.calls)
+
+  def _expire(self):
+    oldest = self.clock() - self.window
+    while self.calls and self.calls[0][0] < oldest:
+      self.calls.popleft()
+
+class MeteredAPI(object):
+  '''Wraps an api and records every call made through it in an
+  ApiMetrics.  Other attributes are passed straight through.
+
+  '''
+
+  def __init__(self, api, metrics):
+    self.api = api
+    self.metrics = metrics
+
+  def __getattr__(self, name):
+    attr = getattr(self.api, name)
+    if not callable(attr):
+      return attr
+    def meter(*args, **kwargs):
+      start = time.time()
+      error = True
+      try:
+        result = attr(*args, **kwargs)
+        error = False
+        return result
+      finally:
+        self.metrics.record(time.time() - start, error)
+    return meter
@@ -0,0 +1,144 @@
+#!/usr/bin/env python
+
+# Copyright (C) 2010 Paul Bourke <pauldbourke@gmail.com>
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+# $Id$
+# ex: expandtab tabstop=2 shiftwidth=2:
+
+from goldfinchlib.controllers import twitter
+from goldfinchlib.status import Status
+from goldfinchlib.workerpool import WorkerPool
+
+import threading
+import time
+import Queue
+
+class MultiFetchController(twitter.TwitterController):
+  '''TwitterController which fetches several endpoints at the same time on a
+  WorkerPool, so polling N endpoints takes about as long as the slowest one
+  rather than the sum of them all.
+
+  Results are put on the thread safe MultiFetchController.results queue as
+  (endpoint, items, error) tuples, where items is a list of
+  (screen_name, text, created_at) or, for 'lists', of list names.  error is
+  None unless the request failed.  Each request is bounded by the Timeout
+  preference, which is passed to tweepy as the socket timeout.
+
+  '''
+
+  endpoints = ('home_timeline', 'mentions', 'direct_messages', 'lists')
+
+  def __init__(self, cache_dir, timeout=60, api=None, pool=None,
+      connection_pool=None):
+    '''Initialises a MultiFetchController.  See TwitterController for the
+    other arguments.
+
+    pool -- optional WorkerPool to share, one with a thread per endpoint is
+            created otherwise
+
+    '''
+    if pool is None:
+      pool = WorkerPool(len(self.endpoints), 'fetch')
+    twitter.TwitterController.__init__(self, cache_dir, timeout, api,
+        connection_pool, pool)
+    self.results = Queue.Queue()
+    self.newest_ids = {}  # {endpoint:newest id seen}
+    self.in_flight = set()
+    self.lock = threading.Lock()
+
+  def poll(self, endpoints=None, count=30, ret_queue=None):
+    '''Start fetching each of endpoints at once and return straight away.
+    Endpoints whose previous request hasn't finished are skipped.
+
+    ret_queue -- Queue.Queue for the results, defaults to self.results
+
+    Returns the number of requests started.
+    '''
+    started = 0
+    for endpoint in endpoints or self.endpoints:
+      assert endpoint in self.endpoints, 'unknown endpoint ' + endpoint
+      with self.lock:
+        if endpoint in self.in_flight:
+          self.logger.debug(endpoint + ' still in flight, skipping')
+          continue
+        self.in_flight.add(endpoint)
+      self.pool.submit(self._fetch_into_results,
+          (endpoint, count, ret_queue or self.results))
+      started = started + 1
+    return started
+
+  def collect(self, pending, timeout=None, ret_queue=None):
+    '''Take results off the results queue, waiting for up to pending of
+    them for at most timeout seconds (the Timeout preference by default).
+    Anything which arrives later stays queued for the next call.
+
+    Returns a list of (endpoint, items, error) tuples.
+    '''
+    if timeout is None:
+      timeout = self.timeout
+    deadline = time.time() + timeout
+    collected = []
+    while len(collected) < pending:
+      remaining = deadline - time.time()
+      if remaining <= 0:
+        break
+      try:
+        collected.append((ret_queue or self.results).get(True, remaining))
+      except Queue.Empty:
+        break
+    if len(collected) < pending:
+      self.logger.info('%d requests timed out' % (pending - len(collected)))
+    return collected
+
+  def fetch_all(self, endpoints=None, count=30, timeout=None):
+    '''Blocking convenience wrapper around poll and collect.  Uses its own
+    queue, so results which miss the timeout are dropped rather than left
+    on self.results.
+
+    '''
+    ret_queue = Queue.Queue()
+    return self.collect(self.poll(endpoints, count, ret_queue), timeout,
+        ret_queue)
+
+  def fetch_endpoint(self, endpoint, count):
+    '''Fetch whatever is new on one endpoint since the last call.'''
+    if endpoint == 'home_timeline':
+      return self.get_home_timeline_updates(count)
+    self.connection_pool.forget_response()
+    if endpoint == 'lists':
+      items = list(self.api.lists())
+      self.note_rate_limit(endpoint)
+      return [item.name for item in items]
+    kwargs = {'count': count}
+    if endpoint in self.newest_ids:
+      kwargs['since_id'] = self.newest_ids[endpoint]
+    items = list(getattr(self.api, endpoint)(**kwargs))
+    self.note_rate_limit(endpoint)
+    if items:
+      self.newest_ids[endpoint] = items[0].id
+    return [Status.from_api(item) for item in items]
+
+  def _fetch_into_results(self, endpoint, count, ret_queue):
+    items = None
+    error = None
+    try:
+      items = self.fetch_endpoint(endpoint, count)
+    except Exception as e:
+      self.logger.error('fetching %s failed: %s' % (endpoint, e))
+      error = e
+    with self.lock:
+      self.in_flight.discard(endpoint)
+    ret_queue.put((endpoint, items, error))
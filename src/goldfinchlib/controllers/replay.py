@@ -0,0 +1,216 @@
+#!/usr/bin/env python
+
+# Copyright (C) 2010 Paul Bourke <pauldbourke@gmail.com>
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+# $Id$
+# ex: expandtab tabstop=2 shiftwidth=2:
+
+from goldfinchlib.controllers.fakeapi import FakeTwitterAPI
+
+import datetime
+import logging
+import threading
+import time
+import cPickle
+
+def to_plain(value):
+  '''Turn an api result into plain python data which can be pickled
+  without tweepy.  Model objects become {'__model__': {attr:value}}, keeping
+  only their public, non callable attributes.
+
+  '''
+  if value is None or isinstance(value, (bool, int, long, float, basestring,
+      datetime.datetime)):
+    return value
+  if isinstance(value, (list, tuple)):
+    return [to_plain(item) for item in value]
+  if isinstance(value, dict):
+    return dict((key, to_plain(item)) for key, item in value.items())
+  attrs = {}
+  for name, item in vars(value).items():
+    if not name.startswith('_') and not callable(item):
+      attrs[name] = to_plain(item)
+  return {'__model__': attrs}
+
+def from_plain(value):
+  '''Inverse of to_plain, models come back as ReplayModel objects.'''
+  if isinstance(value, list):
+    return [from_plain(item) for item in value]
+  if isinstance(value, dict):
+    if '__model__' in value:
+      return ReplayModel(from_plain(value['__model__']))
+    return dict((key, from_plain(item)) for key, item in value.items())
+  return value
+
+class ReplayModel(object):
+  '''Attribute access to a recorded model object'''
+
+  def __init__(self, attrs):
+    self.__dict__.update(attrs)
+
+class ReplayError(Exception):
+  '''A recorded call failed, or there is no recording left for a call'''
+  pass
+
+class RecordingAPI(object):
+  '''Wraps an api and appends every call made through it, with its
+  arguments, result and how long it took, to a recording file which
+  ReplayAPI can play back later.
+
+  '''
+
+  def __init__(self, api, filename):
+    '''Initialises a RecordingAPI.
+
+    api -- the api to record, e.g. a tweepy.API
+    filename -- recording to append to
+
+    '''
+    self.logger = logging.getLogger(''.join(
+        ['goldfinch', '.', self.__class__.__name__]))
+    self.api = api
+    self.filename = filename
+    self.lock = threading.Lock()
+
+  def __getattr__(self, name):
+    attr = getattr(self.api, name)
+    if not callable(attr):
+      return attr
+    def record(*args, **kwargs):
+      start = time.time()
+      result = None
+      error = None
+      try:
+        result = attr(*args, **kwargs)
+        return result
+      except Exception as e:
+        error = '%s: %s' % (e.__class__.__name__, e)
+        raise
+      finally:
+        self._write({'method': name, 'args': to_plain(args),
+            'kwargs': to_plain(kwargs), 'start': start,
+            'elapsed': time.time() - start, 'result': to_plain(result),
+            'error': error})
+    return record
+
+  def _write(self, call):
+    with self.lock:
+      with open(self.filename, 'ab') as f:
+        cPickle.dump(call, f, cPickle.HIGHEST_PROTOCOL)
+
+def load_recording(filename):
+  '''Returns the list of calls in a recording file.'''
+  calls = []
+  with open(filename, 'rb') as f:
+    while True:
+      try:
+        calls.append(cPickle.load(f))
+      except EOFError:
+        break
+  return calls
+
+class ReplayAPI(object):
+  '''Plays back a recording made by RecordingAPI.  Each method returns the
+  recorded results for that method in the order they were recorded.  The
+  gaps between calls are kept too: a call isn't answered before it was
+  made in the recording, counting from the first call replayed, and then
+  takes as long as the original did.  Both are divided by speedup, and a
+  speedup of 0 means no delay at all.
+
+  '''
+
+  def __init__(self, filename, speedup=1.0, sleep=time.sleep,
+      clock=time.time):
+    '''Initialises a ReplayAPI.
+
+    filename -- recording to play back
+    speedup -- how many times faster than the original to reply
+    clock -- function returning the current time in seconds
+
+    '''
+    self.logger = logging.getLogger(''.join(
+        ['goldfinch', '.', self.__class__.__name__]))
+    self.speedup = float(speedup)
+    self.sleep = sleep
+    self.clock = clock
+    self.lock = threading.Lock()
+    self.pending = {}  # {method:[recorded calls]}
+    self.last_response = None  # response headers aren't recorded
+    self.first_start = None  # when the recording's first call was made
+    self.began = None  # when the replay's first call was made
+    for call in load_recording(filename):
+      self.pending.setdefault(call['method'], []).append(call)
+      if self.first_start is None or call['start'] < self.first_start:
+        self.first_start = call['start']
+
+  def remaining(self, name=None):
+    '''Number of recorded calls not yet replayed.'''
+    if name is not None:
+      return len(self.pending.get(name, []))
+    return sum([len(calls) for calls in self.pending.values()])
+
+  def __getattr__(self, name):
+    if name.startswith('_'):
+      raise AttributeError(name)
+    def replay(*args, **kwargs):
+      with self.lock:
+        calls = self.pending.get(name)
+        if not calls:
+          raise ReplayError('no recorded call left for ' + name)
+        call = calls.pop(0)
+        now = self.clock()
+        if self.began is None:
+          self.began = now
+      if self.speedup:
+        due = self.began + (call['start'] - self.first_start) / self.speedup
+        self.sleep(max(due - now, 0) + call['elapsed'] / self.speedup)
+      if call['error']:
+        raise ReplayError(call['error'])
+      return from_plain(call['result'])
+    return replay
+
+class SyntheticAPI(FakeTwitterAPI):
+  '''A FakeTwitterAPI whose home timeline fills up on its own at
+  tweets_per_sec, for benchmarking refreshes against a known load.
+
+  '''
+
+  def __init__(self, tweets_per_sec, num_friends=0, latency=0.0,
+      clock=time.time):
+    '''Initialises a SyntheticAPI.
+
+    tweets_per_sec -- rate new statuses appear on the home timeline
+    clock -- function returning the current time in seconds
+
+    '''
+    FakeTwitterAPI.__init__(self, num_friends, latency)
+    self.tweets_per_sec = float(tweets_per_sec)
+    self.clock = clock
+    self.generated = 0
+    self.started = clock()
+
+  def home_timeline(self, count=20, since_id=None, max_id=None):
+    self.generate()
+    return FakeTwitterAPI.home_timeline(self, count, since_id, max_id)
+
+  def generate(self):
+    '''Add whichever statuses should have appeared by now.'''
+    due = int((self.clock() - self.started) * self.tweets_per_sec)
+    with self.lock:
+      while self.generated < due:
+        self.generated = self.generated + 1
+        self.add_status('user%d' % (self.generated % 50),
+            'synthetic status number %d' % self.generated)
@@ -0,0 +1,76 @@
+#!/usr/bin/env python
+
+# Copyright (C) 2010 Paul Bourke <pauldbourke@gmail.com>
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+# $Id$
+# ex: expandtab tabstop=2 shiftwidth=2:
+
+from goldfinchlib.workerpool import WorkerPool
+
+import logging
+
+class FriendResolver(object):
+  '''Turns user ids into screen names using the bulk users/lookup call,
+  which takes up to 100 ids per request, instead of one get_user() call per
+  id.  Batches are spread over a WorkerPool so several requests are in
+  flight at once.
+
+  '''
+
+  max_batch_size = 100  # limit imposed by users/lookup
+
+  def __init__(self, api, batch_size=100, pool=None, workers=4):
+    '''Initialises a FriendResolver.
+
+    api -- a tweepy.API (or anything with lookup_users/get_user)
+    batch_size -- ids per lookup request, at most 100
+    pool -- optional WorkerPool to share, one of size workers is created
+            otherwise
+
+    '''
+    assert 0 < batch_size <= self.max_batch_size, \
+        'batch_size must be between 1 and %d' % self.max_batch_size
+    self.logger = logging.getLogger(''.join(
+        ['goldfinch', '.', self.__class__.__name__]))
+    self.api = api
+    self.batch_size = batch_size
+    if pool is None:
+      pool = WorkerPool(workers, 'resolver')
+    self.pool = pool
+
+  def batches(self, ids):
+    '''Split ids into lists of at most batch_size.'''
+    ids = list(ids)
+    return [ids[i:i+self.batch_size]
+        for i in range(0, len(ids), self.batch_size)]
+
+  def resolve(self, ids):
+    '''Generator yielding (id, screen_name) pairs as each batch arrives.
+    Ids the api doesn't return (suspended or deleted users) are skipped.
+
+    ids -- iterable of user ids
+
+    '''
+    for users in self.pool.imap_unordered(self._lookup, self.batches(ids)):
+      for user in users:
+        yield (user.id, user.screen_name)
+
+  def _lookup(self, batch):
+    self.logger.debug('looking up %d users' % len(batch))
+    if hasattr(self.api, 'lookup_users'):
+      return self.api.lookup_users(user_ids=batch)
+    # fall back to the slow path for apis without users/lookup
+    return [self.api.get_user(f_id) for f_id in batch]
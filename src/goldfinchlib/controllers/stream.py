@@ -0,0 +1,275 @@
+#!/usr/bin/env python
+
+# Copyright (C) 2010 Paul Bourke <pauldbourke@gmail.com>
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+# $Id$
+# ex: expandtab tabstop=2 shiftwidth=2:
+
+import datetime
+import httplib
+import json
+import logging
+import socket
+import threading
+import time
+import traceback
+import BaseHTTPServer
+import Queue
+
+def read_pieces(response):
+  '''Yield data from an httplib response as soon as it arrives, undoing
+  chunked transfer encoding ourselves since HTTPResponse.read(amt) would
+  block until amt bytes had been read.
+
+  '''
+  fp = response.fp
+  if (response.getheader('transfer-encoding') or '').lower() == 'chunked':
+    while True:
+      size_line = fp.readline()
+      if not size_line:
+        return
+      size = int(size_line.split(';')[0].strip() or '0', 16)
+      if size == 0:
+        return
+      data = fp.read(size)
+      fp.read(2)  # CRLF after each chunk
+      if not data:
+        return
+      yield data
+  else:
+    while True:
+      line = fp.readline()
+      if not line:
+        return
+      yield line
+
+def split_lines(pieces):
+  '''Reassemble arbitrary pieces of data into complete lines.'''
+  buf = ''
+  for piece in pieces:
+    buf = buf + piece
+    while '\n' in buf:
+      (line, buf) = buf.split('\n', 1)
+      yield line.strip()
+
+def decode(lines, logger=None):
+  '''json decode each line, skipping blank keep-alive lines and anything
+  which doesn't parse.
+
+  '''
+  for line in lines:
+    if not line:
+      continue
+    try:
+      yield json.loads(line)
+    except ValueError as e:
+      if logger:
+        logger.info('undecodable stream message: ' + line[:80])
+
+def statuses(messages):
+  '''Keep only status messages, dropping deletes, friends lists, limit
+  notices and other events.
+
+  '''
+  for message in messages:
+    if isinstance(message, dict) and 'text' in message and 'user' in message:
+      yield message
+
+def parse_created_at(created_at):
+  '''Twitter's 'Wed Aug 27 13:08:45 +0000 2008' -> UTC datetime'''
+  return datetime.datetime.strptime(created_at.replace('+0000 ', ''),
+      '%a %b %d %H:%M:%S %Y')
+
+def to_status(message):
+  '''Streaming api status message -> (id, screen_name, text, created_at)'''
+  return (message['id'], message['user']['screen_name'], message['text'],
+      parse_created_at(message['created_at']))
+
+class TimelineStream(object):
+  '''Keeps a connection to a streaming endpoint open, passing each status
+  to a sink as it arrives, and reconnects with exponential backoff when the
+  connection drops.  What arrives runs through a chain of generators,
+
+    read_pieces -> split_lines -> decode -> statuses -> to_status -> sink
+
+  so each status is handed on as soon as its line is complete.
+
+  '''
+
+  min_backoff = 0.25
+  max_backoff = 60.0
+
+  def __init__(self, host, path, sink, secure=True, auth=None,
+      timeout=90, sleep=time.sleep):
+    '''Initialises a TimelineStream.  Call start() to connect.
+
+    host -- streaming api host, e.g. 'userstream.twitter.com'
+    path -- endpoint path
+    sink -- function called with (id, screen_name, text, created_at) for
+            every status received
+    secure -- use https
+    auth -- optional tweepy auth handler used to sign the request
+    timeout -- seconds without any data (including keep-alive newlines)
+               before the connection is considered dead
+
+    '''
+    self.logger = logging.getLogger(''.join(
+        ['goldfinch', '.', self.__class__.__name__]))
+    self.host = host
+    self.path = path
+    self.sink = sink
+    self.secure = secure
+    self.auth = auth
+    self.timeout = timeout
+    self.sleep = sleep
+    self.stopped = threading.Event()
+    self.connections = 0
+    self.conn = None
+    self.thread = None
+
+  def start(self):
+    self.stopped.clear()
+    self.thread = threading.Thread(target=self.run, name='stream')
+    self.thread.setDaemon(True)
+    self.thread.start()
+
+  def stop(self):
+    self.stopped.set()
+    conn = self.conn
+    if conn is not None and conn.sock is not None:
+      # unblock the reading thread
+      try:
+        conn.sock.shutdown(socket.SHUT_RDWR)
+      except socket.error as e:
+        pass
+
+  def run(self):
+    backoff = self.min_backoff
+    while not self.stopped.isSet():
+      try:
+        for status in self.connect():
+          backoff = self.min_backoff  # connection is healthy again
+          self.sink(status)
+        self.logger.info('stream closed by server')
+      except (socket.error, httplib.HTTPException, StreamError) as e:
+        self.logger.info('stream error: %s' % e)
+      except Exception as e:
+        self.logger.error(traceback.format_exc())
+      if self.stopped.isSet():
+        break
+      self.logger.info('reconnecting stream in %.2fs' % backoff)
+      self.sleep(backoff)
+      backoff = min(backoff * 2, self.max_backoff)
+
+  def connect(self):
+    '''Open the stream and return the status generator pipeline.'''
+    headers = {}
+    url = (self.secure and 'https://' or 'http://') + self.host + self.path
+    if self.auth is not None:
+      self.auth.apply_auth(url, 'GET', headers, {})
+    if self.secure:
+      self.conn = httplib.HTTPSConnection(self.host, timeout=self.timeout)
+    else:
+      self.conn = httplib.HTTPConnection(self.host, timeout=self.timeout)
+    self.conn.request('GET', self.path, headers=headers)
+    response = self.conn.getresponse()
+    if response.status != 200:
+      raise StreamError('stream returned %d %s' %
+          (response.status, response.reason))
+    self.connections = self.connections + 1
+    self.logger.info('stream connected')
+    return (to_status(message) for message in
+        statuses(decode(split_lines(read_pieces(response)), self.logger)))
+
+class StreamError(Exception):
+  pass
+
+class FakeStreamServer(BaseHTTPServer.HTTPServer):
+  '''Local stand in for the streaming api.  Status messages pushed with
+  push() are sent, one json object per line using chunked encoding, to
+  whichever client is connected.  disconnect() drops the client so
+  reconnection can be tested.
+
+  '''
+
+  keep_alive_interval = 0.5
+
+  def __init__(self, port=0):
+    BaseHTTPServer.HTTPServer.__init__(self, ('127.0.0.1', port),
+        FakeStreamHandler)
+    self.host = '127.0.0.1:%d' % self.server_address[1]
+    self.messages = Queue.Queue()
+    self.next_id = 1
+    self.thread = None
+
+  def start(self):
+    self.thread = threading.Thread(target=self.serve_forever)
+    self.thread.setDaemon(True)
+    self.thread.start()
+
+  def stop(self):
+    self.disconnect()
+    self.shutdown()
+    self.server_close()
+
+  def push(self, message):
+    '''Send any json-able message to the client.'''
+    self.messages.put(message)
+
+  def push_status(self, screen_name, text, created_at=None):
+    if created_at is None:
+      created_at = datetime.datetime.utcnow()
+    message = {'id': self.next_id, 'text': text,
+        'user': {'screen_name': screen_name},
+        'created_at': created_at.strftime('%a %b %d %H:%M:%S +0000 %Y')}
+    self.next_id = self.next_id + 1
+    self.push(message)
+    return message
+
+  def disconnect(self):
+    self.messages.put(None)
+
+class FakeStreamHandler(BaseHTTPServer.BaseHTTPRequestHandler):
+  protocol_version = 'HTTP/1.1'
+
+  def do_GET(self):
+    self.send_response(200)
+    self.send_header('Content-Type', 'application/json')
+    self.send_header('Transfer-Encoding', 'chunked')
+    self.send_header('Connection', 'close')
+    self.end_headers()
+    while True:
+      try:
+        message = self.server.messages.get(True,
+            self.server.keep_alive_interval)
+      except Queue.Empty:
+        message = ''
+      if message is None:
+        break
+      if message != '':
+        message = json.dumps(message)
+      try:
+        self._write_chunk(message + '\r\n')
+      except socket.error as e:
+        return
+    self.close_connection = 1
+
+  def _write_chunk(self, data):
+    self.wfile.write('%x\r\n%s\r\n' % (len(data), data))
+    self.wfile.flush()
+
+  def log_message(self, *args):
+    pass
@@ -19,12 +19,23 @@
 # ex: expandtab tabstop=2 shiftwidth=2:
 
 from goldfinchlib.controllers import controller
+from goldfinchlib.controllers.resolver import FriendResolver
+from goldfinchlib.controllers.connpool import ConnectionPool
+from goldfinchlib.controllers.metrics import ApiMetrics, MeteredAPI
+from goldfinchlib.controllers.stream import TimelineStream
+from goldfinchlib.friendstore import FriendStore
+from goldfinchlib.status import Status
+from goldfinchlib.tweetstore import TweetStore, parse_query
 
-import tweepy
+try:
+  import tweepy
+except ImportError:
+  tweepy = None  # only needed by perform_auth
 
 import logging
 import traceback
 import os
+import sqlite3
 import cPickle
 
 class TwitterController(controller.Controller):
@@ -33,15 +44,42 @@ class TwitterController(controller.Controller):
   
   '''
 
-  def __init__(self, cache_dir, config=None):
+  max_gap_pages = 5  # most pages get_home_timeline_updates will backfill
+  stream_host = 'userstream.twitter.com'
+  stream_path = '/2/user.json'
+
+  def __init__(self, cache_dir, timeout=60, api=None, connection_pool=None,
+      pool=None):
+    '''Initialises a TwitterController.
+
+    cache_dir -- directory for this account's friend and tweet stores
+    timeout -- socket timeout in seconds for api requests, the Timeout
+               preference
+    api -- optional ready made api, e.g. a FakeTwitterAPI
+    connection_pool -- optional ConnectionPool to share with other
+                       controllers
+    pool -- optional WorkerPool to share for friend lookups, the
+            FriendResolver creates one of its own otherwise
+
+    '''
     controller.Controller.__init__(self, 140)
     self.logger = logging.getLogger(''.join(
         ['goldfinch', '.', self.__class__.__name__]))
-    if config:
-      timeout = int(config.get('preferences', 'Timeout'))
-    else:
-      timeout = 60  # default
-    self.cachefile = os.path.join(cache_dir, 'twitter.cache')
+    self.timeout = timeout
+    if connection_pool is None:
+      connection_pool = ConnectionPool(timeout=self.timeout)
+    self.connection_pool = connection_pool
+    self.pooled = False  # whether self.api makes its requests through it
+    self.cachefile = os.path.join(cache_dir, 'twitter.cache')  # pre-journal
+    self.friend_store = FriendStore(os.path.join(cache_dir, 'friends'))
+    self.tweet_store = TweetStore(os.path.join(cache_dir, 'tweets.db'))
+    self.api = api
+    self.pool = pool
+    self.resolver = None
+    self.newest_id = None  # newest status seen by get_home_timeline_updates
+    self.quotas = {}  # {endpoint:(remaining, reset time)} from the api
+    self.stream = None
+    self.metrics = ApiMetrics()
   
   def perform_auth(self, access_token_file):
     access_token = {}
@@ -50,60 +88,243 @@ class TwitterController(controller.Controller):
       access_token['secret'] = f.readline().strip()
     consumer_key = 'BRqDtHfWWNjNm4tLKj3g'
     consumer_secret = 'RzyFiyYutvxnKBzEUG2utiCejYgkPoDLAqMNNx3o'
+    assert tweepy, 'tweepy is required for TwitterController.perform_auth'
     auth = tweepy.OAuthHandler(consumer_key, consumer_secret)
     auth.set_access_token(access_token['key'], access_token['secret'])
-    self.api = tweepy.API(auth)
+    self.api = tweepy.API(auth, timeout=self.timeout)
+    self.install_connection_pool()
+
+  def install_connection_pool(self):
+    '''Make tweepy take its connections from self.connection_pool instead
+    of opening a new one for every request.  tweepy.binder creates them
+    through its module level reference to httplib, which is swapped for a
+    shim backed by the pool.
+
+    '''
+    binder = getattr(tweepy, 'binder', None)
+    if binder is not None and hasattr(binder, 'httplib'):
+      binder.httplib = self.connection_pool.httplib_shim()
+      self.pooled = True
+    else:
+      self.logger.info('this tweepy does not use httplib, not pooling')
+
+  def meter_api(self):
+    '''Count the calls made through self.api in self.metrics.'''
+    if self.api is not None and not isinstance(self.api, MeteredAPI):
+      self.api = MeteredAPI(self.api, self.metrics)
+
+  def get_friends(self, ret_queue=None):
+    '''Returns the screen names of everyone the user follows.  Unknown ids
+    are resolved in bulk by a FriendResolver.
 
-  def get_friends(self):
+    ret_queue -- optional Queue.Queue which each screen name is put into as
+                 soon as it is known, so callers can display them while the
+                 rest are still being fetched
+
+    '''
     assert self.api, 'TwitterController.api is not initialised, call\
       TwitterController.perform_auth first'
     self.logger.debug('fetching friend ids')
-    friend_dict = {} # {id:screen_name}
+    store = self.friend_store
+    if store.is_empty():
+      self._import_legacy_cache()
+    self.logger.debug('fetching latest friend ids')
+    latest_friend_ids = self.api.friends_ids()
+    self.logger.debug('got latest friend ids')
+    (ids_added, ids_removed) = store.diff(latest_friend_ids)
+    if ids_removed:
+      self.logger.debug('found %d deleted friends, removing' %
+          len(ids_removed))
+      store.remove(ids_removed)
+    if ret_queue is not None:
+      for screen_name in store.friends.values():
+        ret_queue.put(screen_name)
+    if ids_added:
+      self.logger.debug('resolving %d new friends' % len(ids_added))
+      friend_dict = {} # {id:screen_name}
+      for f_id, screen_name in self._get_resolver().resolve(ids_added):
+        friend_dict[f_id] = screen_name
+        if ret_queue is not None:
+          ret_queue.put(screen_name)
+      store.add(friend_dict)
+    self.logger.debug('returning from get_friends()')
+    return store.friends.values()
+
+  def complete_friend(self, prefix, limit=None):
+    '''Returns the screen names of friends starting with prefix, from the
+    friend store alone.  Friends are only as up to date as the last
+    get_friends.
+
+    '''
+    return self.friend_store.complete(prefix, limit)
+
+  def _import_legacy_cache(self):
+    '''Seed the friend store from the old whole-file pickle cache, if one
+    exists.
+
+    '''
     try:
-      with open(self.cachefile, 'r') as f:
+      with open(self.cachefile, 'rb') as f:
         try:
           friend_dict = cPickle.load(f)
-          self.logger.debug('found cache file')
         except (cPickle.PickleError, EOFError), e:
           self.logger.debug(traceback.format_exc())
-          self.logger.info('could not unpickle friend_dict, fetching a new one')
+          self.logger.info('could not unpickle old cache file, ignoring it')
+          return
     except IOError as e:
-      self.logger.info('no cachefile present, will create one')
-    self.logger.debug('fetching latest friend ids')
-    latest_friend_ids = self.api.friends_ids()
-    self.logger.debug('got latest friend ids')
-    if friend_dict:
-      # see whats changed
-      current_friend_ids = friend_dict.keys()
-      ids_added = set(latest_friend_ids) - set(current_friend_ids)
-      ids_removed = set(current_friend_ids) - set(latest_friend_ids)
-      for f_id in ids_added:
-        self.logger.debug('found new friend, fetching details')
-        friend_dict[f_id] = self.api.get_user(f_id).screen_name
-      for f_id in ids_removed:
-        self.logger.debug('found deleted friend, removing')
-        del(friend_dict[f_id])
-    else:
-      # we have to fetch all ids:screen_names
-      for f_id in latest_friend_ids:
-        friend_dict[f_id] = self.api.get_user(f_id).screen_name
-    with open(self.cachefile, 'w') as f:
-      try:
-        cPickle.dump(friend_dict, f)
-        self.logger.debug('(re)wrote cache file')
-      except cPickle.PickleError as e:
-        self.logger.debug(traceback.format_exc())
-        self.logger.info('error pickling friend_dict to cache file')
-    self.logger.debug('returning from get_friends()')
-    return friend_dict.values()
+      return
+    self.logger.info('importing %d friends from old cache file' %
+        len(friend_dict))
+    self.friend_store.replace(friend_dict)
 
-  def get_home_timeline(self, count):
+  def _get_resolver(self):
+    if self.resolver is None:
+      self.resolver = FriendResolver(self.api, pool=self.pool)
+    # self.api is replaced by meter_api and the like, the pool can stay
+    self.resolver.api = self.api
+    return self.resolver
+
+  def get_home_timeline(self, count, since_id=None, max_id=None):
     '''Gets the users 'home timeline which is their tweets along with each of
     their friends.  Screen names are padded to 20 chars for formatting.
     
     count -- Specifies the number of statuses to retrieve.
+    since_id -- only return statuses newer than this id
+    max_id -- only return statuses with an id up to and including this one
+
+    Returns a list of goldfinchlib.status.Status, newest first.
     '''
     self.logger.info('fetching user home timeline')
-    home_timeline = self.api.home_timeline(count=count)
-    return [(item.user.screen_name, item.text, item.created_at)\
-        for item in home_timeline]
+    home_timeline = self._fetch_home_timeline(count, since_id, max_id)
+    return [Status.from_api(item) for item in home_timeline]
+
+  def get_home_timeline_updates(self, count):
+    '''Like get_home_timeline, but only returns statuses newer than the
+    newest one returned by a previous call.  If a whole page of new statuses
+    arrives, older pages are fetched with max_id until the gap back to the
+    last seen status is filled (up to max_gap_pages).
+
+    count -- page size for each request
+    '''
+    self.logger.info('fetching home timeline since ' + str(self.newest_id))
+    statuses = self._fetch_home_timeline(count, self.newest_id)
+    if self.newest_id is not None:
+      page = statuses
+      pages = 1
+      while len(page) == count and pages < self.max_gap_pages:
+        self.logger.debug('timeline gap, fetching older page')
+        page = self._fetch_home_timeline(count, self.newest_id,
+            page[-1].id - 1)
+        statuses.extend(page)
+        pages = pages + 1
+    if statuses:
+      self.newest_id = statuses[0].id
+    return [Status.from_api(item) for item in statuses]
+
+  def _fetch_home_timeline(self, count, since_id=None, max_id=None):
+    kwargs = {'count': count}
+    if since_id is not None:
+      kwargs['since_id'] = since_id
+    if max_id is not None:
+      kwargs['max_id'] = max_id
+    self.connection_pool.forget_response()
+    home_timeline = list(self.api.home_timeline(**kwargs))
+    self.note_rate_limit('home_timeline')
+    self.tweet_store.add([(item.id, item.user.screen_name, item.text,
+        item.created_at) for item in home_timeline])
+    return home_timeline
+
+  def start_stream(self, sink, host=None, secure=True):
+    '''Start receiving the home timeline from the streaming api instead of
+    polling for it.  Runs on its own thread until stop_stream is called.
+
+    sink -- function called with a Status for each new status as soon as
+            it arrives
+    host -- streaming host to use instead of stream_host
+    '''
+    def store_and_sink(status):
+      (status_id, screen_name, text, created_at) = status
+      self.tweet_store.add([status])
+      if status_id > self.newest_id:
+        self.newest_id = status_id
+      sink(Status(status_id, screen_name, text, created_at))
+    auth = getattr(self.api, 'auth', None)
+    self.stream = TimelineStream(host or self.stream_host, self.stream_path,
+        store_and_sink, secure, auth)
+    self.stream.start()
+
+  def stop_stream(self):
+    if self.stream is not None:
+      self.stream.stop()
+      self.stream = None
+
+  def rate_limit(self, response):
+    '''Returns (remaining requests, reset time) from the rate limit
+    headers of an api response, or None if there weren't any.
+
+    '''
+    if response is None:
+      return None
+    for prefix in ('x-rate-limit-', 'x-ratelimit-'):
+      remaining = self._header(response, prefix + 'remaining')
+      reset = self._header(response, prefix + 'reset')
+      if remaining is not None and reset is not None:
+        return (int(remaining), int(reset))
+    return None
+
+  def note_rate_limit(self, endpoint):
+    '''Remember the rate limit for endpoint reported by the response to
+    the api call just made on this thread, which should have been preceded
+    by connection_pool.forget_response().  The api limits each endpoint
+    separately.
+
+    '''
+    quota = self.rate_limit(self._last_response())
+    if quota is not None:
+      self.quotas[endpoint] = quota
+
+  def _last_response(self):
+    # tweepy keeps a single API.last_response for all threads, so with
+    # several calls in flight it may be another call's.  Ask the connection
+    # pool for this thread's, and only fall back when tweepy isn't using it
+    response = self.connection_pool.last_response()
+    if response is None and not self.pooled:
+      response = getattr(self.api, 'last_response', None)
+    return response
+
+  def _header(self, response, name):
+    if hasattr(response, 'getheader'):  # httplib
+      return response.getheader(name)
+    return response.headers.get(name)  # requests
+
+  def post_status(self, text, in_reply_to=None):
+    '''Post a status update.
+
+    text -- the status text
+    in_reply_to -- optional id of the status this one replies to
+
+    Returns the new status's id.
+    '''
+    self.logger.info('posting msg (' + str(len(text)) + ')')
+    if in_reply_to is None:
+      status = self.api.update_status(text)
+    else:
+      status = self.api.update_status(text, in_reply_to_status_id=in_reply_to)
+    # the status is out, so a failure to store it must not look like a
+    # failed post or the outbox would send it again
+    try:
+      self.tweet_store.add([(status.id, status.user.screen_name, status.text,
+          status.created_at)])
+    except sqlite3.Error:
+      self.logger.error('could not store status %s: %s' %
+          (status.id, traceback.format_exc()))
+    return status.id
+
+  def search(self, query, limit=100):
+    '''Search the statuses seen so far, without using the api.  See
+    goldfinchlib.tweetstore.parse_query for the query syntax.
+
+    Returns a list of Status, newest first.
+    '''
+    self.logger.info('searching tweet store for ' + query)
+    return self.tweet_store.search(limit=limit, **parse_query(query))
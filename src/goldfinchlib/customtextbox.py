@@ -18,128 +18,347 @@
 # $Id: CustomTextbox.py 39 2010-08-06 19:52:19Z bourke $
 # ex: expandtab tabstop=2 shiftwidth=2:
 
+import curses
+import curses.ascii
 import curses.textpad
 import logging
 
+from goldfinchlib.keymap import KeyReader
+
 class CustomTextbox(curses.textpad.Textbox):
-  def __init__(self, win, handlers):
-    '''Initialises a CustomTextbox.
+  # modes in which keys without a binding edit the text
+  editing_modes = ('edit', 'isearch')
+  # what a terminal in bracketed paste mode sends around pasted text
+  paste_start = [ord(c) for c in '\x1b[200~']
+  paste_end = [ord(c) for c in '\x1b[201~']
+  paste_timeout = 100  # ms to wait for the rest of a paste
+
+  def __init__(self, win, keymap):
+    '''Initialises a CustomTextbox.  Its window doesn't wait for keys, so
+    an event loop can call read_keys() whenever stdin is readable.
 
     win      -- curses.stdscr to attach the Textbox to
-    handlers -- dict of various handlers to attatch, e.g.
-                {curses.ascii.ESC:esc_handler}
+    keymap   -- goldfinchlib.keymap.Keymap of the keys to act on, in the
+                textbox's current mode
 
     '''
     curses.textpad.Textbox.__init__(self, win)
-    self.handlers = handlers
+    self.set_keymap(keymap)
+    self.key_timeout = 0
+    self.win.timeout(self.key_timeout)
     self.mode = 'edit'
+    self.on_edit = None  # called after each key which edits the text
+    self.on_overflow = None  # called with a message when a paste won't fit
+    self.pending = []  # keys read ahead and put back, oldest first
     self.logger = logging.getLogger('goldfinch' +
         "." + self.__class__.__name__)
 
+  def set_keymap(self, keymap):
+    '''Start using another Keymap.  A key sequence part way through being
+    typed is forgotten.
+
+    '''
+    self.keymap = keymap
+    self.reader = KeyReader(keymap)
+
+  def read_keys(self):
+    '''Handle every key waiting, without blocking.
+
+    Returns a list of the lines entered, usually empty.
+
+    '''
+    lines = []
+    handled = False
+    while True:
+      ch = self._getch()
+      if ch == -1:
+        break
+      handled = True
+      if ch == self.paste_start[0] and self._starts_paste():
+        self.paste(self._read_paste())
+        continue
+      if not self.do_command(ch):
+        lines.append(self.gather())
+    # one refresh for the lot, however many keys there were
+    if handled:
+      self.win.refresh()
+    return lines
+
+  def paste(self, text):
+    '''Put pasted text in at the cursor in one go.  The box is one line,
+    so line breaks become spaces and anything else unprintable is
+    dropped.  Pastes are ignored outside the editing modes rather than
+    being taken as commands, and refused if they won't fit rather than
+    cut short, with on_overflow told why.
+
+    '''
+    if self.mode not in self.editing_modes:
+      self.logger.debug('ignoring paste in %s mode' % self.mode)
+      return
+    text = text.replace('\r\n', ' ').replace('\n', ' ').replace('\r', ' ')
+    text = text.replace('\t', ' ')
+    text = filter(curses.ascii.isprint, text)
+    room = self._room()
+    if len(text) > room:
+      message = 'Paste too long: %d characters, room for %d' % (len(text),
+          room)
+      self.logger.info(message)
+      if self.on_overflow is not None:
+        self.on_overflow(message)
+      return
+    self.insert_str(text)
+    if self.on_edit is not None:
+      self.on_edit()
+
+  def insert_str(self, text):
+    '''Write text at the cursor with a single call, as typing each
+    character would, and leave the cursor after it.  Whatever doesn't fit
+    in the box is dropped.
+
+    Returns the number of characters written.
+
+    '''
+    (y, x) = self.win.getyx()
+    room = self._room()
+    if len(text) > room:
+      self.logger.info('input box full, dropped %d characters' %
+          (len(text) - room))
+      text = text[:room]
+    if not text:
+      return 0
+    if self.insert_mode:
+      self.win.insstr(text)
+    else:
+      self.win.addstr(text)
+    end = x + len(text)
+    self.win.move(y + end // (self.maxx + 1), end % (self.maxx + 1))
+    return len(text)
+
+  def _room(self):
+    '''How many more characters fit in the box.'''
+    self._update_max_yx()
+    (y, x) = self.win.getyx()
+    if self.insert_mode:
+      # what's already there moves up to make way
+      return max(self.maxy * (self.maxx + 1) + self.maxx - len(self.text()), 0)
+    # as in Textbox, the bottom right cell is never written
+    return max((self.maxy - y) * (self.maxx + 1) + self.maxx - x, 0)
+
+  def _getch(self):
+    if self.pending:
+      return self.pending.pop(0)
+    return self.win.getch()
+
+  def _starts_paste(self):
+    '''Having read the first key of paste_start, read the rest of it if
+    it's there.  Anything else read is put back.
+
+    '''
+    read = []
+    for expected in self.paste_start[1:]:
+      ch = self._getch()
+      if ch == -1:
+        break
+      read.append(ch)
+      if ch != expected:
+        break
+    if read == self.paste_start[1:]:
+      return True
+    self.pending = read + self.pending
+    return False
+
+  def _read_paste(self):
+    '''Read keys up to paste_end, or until the terminal stops sending
+    them.  Returns the text pasted.
+
+    '''
+    keys = []
+    end = self.paste_end
+    self.win.timeout(self.paste_timeout)
+    try:
+      while keys[-len(end):] != end:
+        ch = self._getch()
+        if ch == -1:
+          self.logger.info('paste ended without an end marker')
+          return ''.join([chr(key) for key in keys if key < 256])
+        keys.append(ch)
+    finally:
+      self.win.timeout(self.key_timeout)
+    return ''.join([chr(key) for key in keys[:-len(end)] if key < 256])
+
+  def edit(self, validate=None):
+    '''Overrides curses.textpad.Textbox.edit() to wait for keys while
+    editing, whatever read_keys() needs the window to do.
+
+    '''
+    self.win.timeout(-1)
+    try:
+      return curses.textpad.Textbox.edit(self, validate)
+    finally:
+      self.win.timeout(self.key_timeout)
+
   def do_command(self, ch):
-    '''Overrides curses.textpad.Textbox.do_command() in order to hook 
-    KEY_RESIZE and other keys.
-    The code is mostly copy-pasted with modifications.
+    '''Overrides curses.textpad.Textbox.do_command().  Keys bound in the
+    keymap for the current mode run their action; in the editing modes
+    anything else edits the text as Textbox would.
 
-    ''' 
+    Returns 0 when the input is finished.
+
+    '''
+    for (action, count, key) in self.reader.feed(self.mode, ch):
+      if action is not None:
+        if self.keymap.coalesces(action):
+          count = count + self._take_repeats(ch)
+        self.keymap.run(action, count)
+      elif self.mode in self.editing_modes:
+        if not self._edit(key):
+          return 0
+        if self.on_edit is not None:
+          self.on_edit()
+    return 1
+
+  def _take_repeats(self, ch):
+    '''Consume further presses of ch which are already waiting, e.g.
+    from a held down key.  Returns how many there were.
+
+    '''
+    repeats = 0
+    self.win.timeout(0)
+    try:
+      while True:
+        next_ch = self._getch()
+        if next_ch != ch:
+          if next_ch != -1:
+            self.pending.insert(0, next_ch)
+          return repeats
+        repeats = repeats + 1
+    finally:
+      self.win.timeout(self.key_timeout)
+
+  def _edit(self, ch):
+    '''Edit the text as curses.textpad.Textbox.do_command() does.
+    Returns False when the input is finished.
+
+    '''
     (y, x) = self.win.getyx()
     self.lastcmd = ch
     if curses.ascii.isprint(ch):
       if y < self.maxy or x < self.maxx:
-        if self.mode == 'edit':
-          self._insert_printable_char(ch)
-    elif ch == curses.ascii.NAK:                           # ^u
-      self.clear()
-    elif ch == curses.ascii.SOH:                           # ^a
-      self.win.move(y, 0)
-    elif ch in (curses.ascii.STX,curses.KEY_LEFT, curses.ascii.BS,curses.KEY_BACKSPACE):
-      if x > 0:
-        self.win.move(y, x-1)
-      elif y == 0:
-        pass
-      elif self.stripspaces:
+        self._insert_printable_char(ch)
+      return True
+    command = self.editing_keys.get(ch)
+    if command is None:
+      return True
+    return command(self, y, x) is not False
+
+  def _clear_line(self, y, x):                              # ^u
+    self.clear()
+
+  def _start_of_line(self, y, x):                           # ^a
+    self.win.move(y, 0)
+
+  def _backward(self, y, x):                                # ^b, ^h
+    if x > 0:
+      self.win.move(y, x-1)
+    elif y == 0:
+      pass
+    elif self.stripspaces:
+      self.win.move(y-1, self._end_of_line(y-1))
+    else:
+      self.win.move(y-1, self.maxx)
+
+  def _backspace(self, y, x):
+    self._backward(y, x)
+    self.win.delch()
+
+  def _delete(self, y, x):                                  # ^d
+    self.win.delch()
+
+  def _end(self, y, x):                                     # ^e
+    if self.stripspaces:
+      self.win.move(y, self._end_of_line(y))
+    else:
+      self.win.move(y, self.maxx)
+
+  def _forward(self, y, x):                                 # ^f
+    if x < self.maxx:
+      self.win.move(y, x+1)
+    elif y == self.maxy:
+      pass
+    else:
+      self.win.move(y+1, 0)
+
+  def _finish(self, y, x):                                  # ^g
+    return False
+
+  def _newline(self, y, x):                                 # ^j
+    if self.maxy == 0:
+      return False
+    elif y < self.maxy:
+      self.win.move(y+1, 0)
+
+  def _kill(self, y, x):                                    # ^k
+    if x == 0 and self._end_of_line(y) == 0:
+      self.win.deleteln()
+    else:
+      # first undo the effect of self._end_of_line
+      self.win.move(y, x)
+      self.win.clrtoeol()
+
+  def _redraw(self, y, x):                                  # ^l
+    self.win.refresh()
+
+  def _down(self, y, x):                                    # ^n
+    if y < self.maxy:
+      self.win.move(y+1, x)
+    if x > self._end_of_line(y+1):
+      self.win.move(y+1, self._end_of_line(y+1))
+
+  def _open_line(self, y, x):                               # ^o
+    self.win.insertln()
+
+  def _up(self, y, x):                                      # ^p
+    if y > 0:
+      self.win.move(y-1, x)
+      if x > self._end_of_line(y-1):
         self.win.move(y-1, self._end_of_line(y-1))
-      else:
-        self.win.move(y-1, self.maxx)
-      if ch in (curses.ascii.BS, curses.KEY_BACKSPACE):
-        self.win.delch()
-    elif ch == curses.ascii.EOT:                           # ^d
-      self.win.delch()
-    elif ch == curses.ascii.ENQ:                           # ^e
-      if self.stripspaces:
-        self.win.move(y, self._end_of_line(y))
-      else:
-        self.win.move(y, self.maxx)
-    elif ch in (curses.ascii.ACK, curses.KEY_RIGHT):       # ^f
-      if x < self.maxx:
-        self.win.move(y, x+1)
-      elif y == self.maxy:
-        pass
-      else:
-        self.win.move(y+1, 0)
-    elif ch == curses.ascii.BEL:                           # ^g
-      if self.mode == 'edit':
-        return 0
-    elif ch == curses.ascii.NL:                            # ^j
-      if self.mode == 'edit':
-        if self.maxy == 0:
-          return 0
-        elif y < self.maxy:
-          self.win.move(y+1, 0)
-    elif ch == curses.ascii.VT:                            # ^k
-      if x == 0 and self._end_of_line(y) == 0:
-        self.win.deleteln()
-      else:
-        # first undo the effect of self._end_of_line
-        self.win.move(y, x)
-        self.win.clrtoeol()
-    elif ch == curses.ascii.FF:                            # ^l
-      self.win.refresh()
-    elif ch in (curses.ascii.SO, curses.KEY_DOWN):         # ^n
-      if y < self.maxy:
-        self.win.move(y+1, x)
-      if x > self._end_of_line(y+1):
-        self.win.move(y+1, self._end_of_line(y+1))
-    elif ch == curses.ascii.SI:                            # ^o
-      self.win.insertln()
-    elif ch in (curses.ascii.DLE, curses.KEY_UP):          # ^p
-      if y > 0:
-        self.win.move(y-1, x)
-        if x > self._end_of_line(y-1):
-          self.win.move(y-1, self._end_of_line(y-1))
-    for handler in self.handlers:
-      if ch == handler.event_id:
-        if self.mode in handler.modes:
-          handler.cb_func(*handler.cb_args)
-    return 1
+
+  editing_keys = {
+    curses.ascii.NAK: _clear_line,
+    curses.ascii.SOH: _start_of_line,
+    curses.ascii.STX: _backward,
+    curses.KEY_LEFT: _backward,
+    curses.ascii.BS: _backspace,
+    curses.KEY_BACKSPACE: _backspace,
+    curses.ascii.EOT: _delete,
+    curses.ascii.ENQ: _end,
+    curses.ascii.ACK: _forward,
+    curses.KEY_RIGHT: _forward,
+    curses.ascii.BEL: _finish,
+    curses.ascii.NL: _newline,
+    curses.ascii.VT: _kill,
+    curses.ascii.FF: _redraw,
+    curses.ascii.SO: _down,
+    curses.KEY_DOWN: _down,
+    curses.ascii.SI: _open_line,
+    curses.ascii.DLE: _up,
+    curses.KEY_UP: _up,
+  }
 
   def insert_printable_str(self, msg):
-    '''Adds a string to the Textbox''' 
-    assert len(msg) < 256, "len(msg) must be < 256"
+    '''Replaces what's in the Textbox with a string'''
     self.clear()
-    for i in range(0, len(msg)):
-      self._insert_printable_char(msg[i])
+    self.insert_str(msg)
+
+  def text(self):
+    '''Returns what has been typed, leaving the cursor where it is.'''
+    (y, x) = self.win.getyx()
+    # gather() takes in the blank after the last character
+    text = self.gather().rstrip(' ')
+    self.win.move(y, x)
+    return text
 
   def clear(self):
     (y, x) = self.win.getyx()
     self.win.deleteln()
     self.win.move(y, 0)
-
-class InputHandler():
-  '''Container class for an input event.  To be used in conjunction with
-  CustomTextbox.'''
-
-  def __init__(self, event_id, cb_func, cb_args, modes):
-    '''Initialises an InputHandler.
-
-    event_id -- the key which triggers the event (e.g. ord('i'))
-    cb_func -- callback function to fire on event
-    cb_args -- list of arguments to pass to cb_func
-    modes -- list of modes the event can take place in.
-            values are edit, command
-
-    '''
-    self.event_id = event_id
-    self.cb_func = cb_func
-    self.cb_args = cb_args
-    self.modes = modes
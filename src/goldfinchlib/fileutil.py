@@ -0,0 +1,55 @@
+#!/usr/bin/env python
+
+# Copyright (C) 2010 Paul Bourke <pauldbourke@gmail.com>
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+# $Id$
+# ex: expandtab tabstop=2 shiftwidth=2:
+
+import os
+import tempfile
+
+def atomic_write(filename, data):
+  '''Replace the contents of filename with data so that a crash part way
+  through leaves either the old file or the new one, never a mix.  The data
+  goes to a temporary file in the same directory which is fsync'd and then
+  renamed over filename.
+
+  filename -- file to (re)write
+  data -- string to write
+
+  '''
+  dirname = os.path.dirname(os.path.abspath(filename))
+  (fd, tmp_name) = tempfile.mkstemp(prefix='.tmp-', dir=dirname)
+  try:
+    f = os.fdopen(fd, 'wb')
+    try:
+      f.write(data)
+      f.flush()
+      os.fsync(f.fileno())
+    finally:
+      f.close()
+    os.rename(tmp_name, filename)
+  except:
+    if os.path.exists(tmp_name):
+      os.remove(tmp_name)
+    raise
+
+def append_sync(filename, data):
+  '''Append data to filename and fsync it before returning.'''
+  with open(filename, 'ab') as f:
+    f.write(data)
+    f.flush()
+    os.fsync(f.fileno())
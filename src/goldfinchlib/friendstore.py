@@ -0,0 +1,212 @@
+#!/usr/bin/env python
+
+# Copyright (C) 2010 Paul Bourke <pauldbourke@gmail.com>
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+# $Id$
+# ex: expandtab tabstop=2 shiftwidth=2:
+
+from goldfinchlib.fileutil import atomic_write, append_sync
+from goldfinchlib.prefixindex import PrefixIndex
+
+import logging
+import os
+import traceback
+import cPickle
+
+class FriendStore(object):
+  '''On disk store of the user's friends as {id:screen_name}.
+
+  The store is a snapshot file plus an append-only journal of changes made
+  since the snapshot.  A sync that finds nothing new writes nothing, and one
+  that does only appends the changed ids.  Once the journal grows past
+  compact_threshold entries it is folded into a new snapshot.
+
+  Each snapshot carries a generation number which prefixes every journal
+  line written against it, so journal lines left over from an interrupted
+  compaction are recognised as stale and ignored.  A torn trailing line from
+  an interrupted append is dropped on load.
+
+  Screen names are also kept in a PrefixIndex, built the first time a name
+  is completed, so completing @names never has to go to the api or look
+  through every friend.
+
+  '''
+
+  format_version = 1
+
+  def __init__(self, path, compact_threshold=500):
+    '''Initialises a FriendStore.  Nothing is read until the friends are
+    first needed.
+
+    path -- file name prefix, '.snapshot' and '.journal' are appended
+    compact_threshold -- number of journal entries which triggers a
+                         compaction
+
+    '''
+    self.logger = logging.getLogger(''.join(
+        ['goldfinch', '.', self.__class__.__name__]))
+    self.snapshot_file = path + '.snapshot'
+    self.journal_file = path + '.journal'
+    self.compact_threshold = compact_threshold
+    self.generation = 0
+    self.journal_entries = 0
+    self._friends = None
+    self._names = None  # PrefixIndex of screen names
+
+  @property
+  def friends(self):
+    '''dict of {id:screen_name}, loaded on first access'''
+    if self._friends is None:
+      self._load()
+    return self._friends
+
+  def is_empty(self):
+    return not self.friends
+
+  def complete(self, prefix, limit=None):
+    '''Returns the screen names starting with prefix, ignoring case, in
+    order.
+
+    limit -- most names to return, all of them if None
+
+    '''
+    if self._names is None:
+      self._names = PrefixIndex(self.friends.values())
+    return self._names.complete(prefix, limit)
+
+  def diff(self, latest_ids):
+    '''Compare the store against a fresh list of friend ids.
+
+    Returns a tuple of (ids_added, ids_removed).
+
+    '''
+    latest_ids = set(latest_ids)
+    current_ids = set(self.friends)
+    return (latest_ids - current_ids, current_ids - latest_ids)
+
+  def add(self, friend_dict):
+    '''Record new friends.
+
+    friend_dict -- {id:screen_name}
+
+    '''
+    lines = [self._journal_line('+', f_id, screen_name)
+        for f_id, screen_name in friend_dict.items()]
+    if self._names is not None:
+      for f_id, screen_name in friend_dict.items():
+        if f_id in self.friends:
+          self._names.remove(self.friends[f_id])
+        self._names.add(screen_name)
+    self.friends.update(friend_dict)
+    self._append(lines)
+
+  def remove(self, ids):
+    '''Forget the friends with the given ids.'''
+    lines = []
+    for f_id in ids:
+      if f_id in self.friends:
+        if self._names is not None:
+          self._names.remove(self.friends[f_id])
+        del(self.friends[f_id])
+        lines.append(self._journal_line('-', f_id))
+    self._append(lines)
+
+  def replace(self, friend_dict):
+    '''Throw away the current contents and store friend_dict instead.'''
+    self._friends = dict(friend_dict)
+    self._names = None
+    self.compact()
+
+  def compact(self):
+    '''Write the current friends out as a new snapshot and empty the
+    journal.
+
+    '''
+    generation = self.generation + 1
+    data = cPickle.dumps({'version': self.format_version,
+        'generation': generation, 'friends': self.friends},
+        cPickle.HIGHEST_PROTOCOL)
+    atomic_write(self.snapshot_file, data)
+    # if we crash here the journal is still tagged with the old generation,
+    # so it will be ignored against the new snapshot
+    self.generation = generation
+    atomic_write(self.journal_file, '')
+    self.journal_entries = 0
+    self.logger.debug('compacted friend store (generation %d, %d friends)' %
+        (generation, len(self.friends)))
+
+  def _journal_line(self, op, f_id, screen_name=None):
+    fields = [str(self.generation), op, str(f_id)]
+    if screen_name is not None:
+      if isinstance(screen_name, unicode):
+        screen_name = screen_name.encode('utf-8')
+      fields.append(screen_name)
+    return '\t'.join(fields) + '\n'
+
+  def _append(self, lines):
+    if not lines:
+      return
+    append_sync(self.journal_file, ''.join(lines))
+    self.journal_entries = self.journal_entries + len(lines)
+    if self.journal_entries > self.compact_threshold:
+      self.compact()
+
+  def _load(self):
+    self._friends = {}
+    self._names = None
+    self.generation = 0
+    self.journal_entries = 0
+    try:
+      with open(self.snapshot_file, 'rb') as f:
+        snapshot = cPickle.load(f)
+      if snapshot.get('version') != self.format_version:
+        self.logger.info('unknown friend store version %s, ignoring' %
+            snapshot.get('version'))
+      else:
+        self.generation = snapshot['generation']
+        self._friends = snapshot['friends']
+    except IOError as e:
+      self.logger.info('no friend store snapshot present')
+    except (cPickle.PickleError, EOFError, AttributeError, KeyError), e:
+      self.logger.debug(traceback.format_exc())
+      self.logger.info('could not read friend store snapshot')
+    self._replay_journal()
+
+  def _replay_journal(self):
+    try:
+      with open(self.journal_file, 'rb') as f:
+        data = f.read()
+    except IOError as e:
+      return
+    good_length = data.rfind('\n') + 1
+    if good_length < len(data):
+      self.logger.info('dropping torn entry at end of friend journal')
+      with open(self.journal_file, 'r+b') as f:
+        f.truncate(good_length)
+    generation = str(self.generation)
+    for line in data[:good_length].splitlines():
+      fields = line.split('\t')
+      if len(fields) < 3 or fields[0] != generation:
+        continue
+      try:
+        f_id = int(fields[2])
+      except ValueError:
+        continue
+      if fields[1] == '+' and len(fields) == 4:
+        self._friends[f_id] = fields[3].decode('utf-8')
+      elif fields[1] == '-':
+        self._friends.pop(f_id, None)
+      self.journal_entries = self.journal_entries + 1
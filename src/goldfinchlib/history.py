@@ -0,0 +1,105 @@
+#!/usr/bin/env python
+
+# Copyright (C) 2010 Paul Bourke <pauldbourke@gmail.com>
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+# $Id$
+# ex: expandtab tabstop=2 shiftwidth=2:
+
+
+from goldfinchlib.fileutil import atomic_write, append_sync
+
+import logging
+
+class History(object):
+  '''Lines entered in the input box, oldest first, kept in a file so they
+  survive a restart.
+
+  Each line is appended to the file as it's added.  The file is allowed to
+  grow to twice max_entries lines before it is rewritten with just the
+  newest max_entries, so it's rarely rewritten and never grows without
+  bound.
+
+  '''
+
+  def __init__(self, filename, max_entries=1000):
+    '''Initialises a History, loading any lines saved last time.
+
+    filename -- file the lines are kept in, or None to keep them in memory
+    max_entries -- most lines to keep
+
+    '''
+    self.logger = logging.getLogger(''.join(
+        ['goldfinch', '.', self.__class__.__name__]))
+    self.filename = filename
+    self.max_entries = max_entries
+    self.entries = []
+    self.file_entries = 0  # lines in the file, maybe more than entries
+    self._load()
+
+  def __len__(self):
+    return len(self.entries)
+
+  def __getitem__(self, index):
+    return self.entries[index]
+
+  def add(self, line):
+    '''Remember line, unless it's blank or the same as the last one.'''
+    if isinstance(line, unicode):
+      line = line.encode('utf-8')
+    line = line.replace('\n', ' ').strip()
+    if not line or (self.entries and self.entries[-1] == line):
+      return
+    self.entries.append(line)
+    if len(self.entries) > self.max_entries:
+      del(self.entries[:len(self.entries) - self.max_entries])
+    if self.filename is None:
+      return
+    try:
+      if self.file_entries >= 2 * self.max_entries:
+        atomic_write(self.filename, ''.join([entry + '\n'
+            for entry in self.entries]))
+        self.file_entries = len(self.entries)
+      else:
+        append_sync(self.filename, line + '\n')
+        self.file_entries = self.file_entries + 1
+    except (IOError, OSError) as e:
+      self.logger.error('could not save history: %s' % e)
+
+  def search(self, text, before=None):
+    '''Reverse search: the index of the newest line before index before
+    which contains text, ignoring case, or None if there isn't one.
+
+    before -- where to start searching back from, the end if None
+
+    '''
+    if before is None:
+      before = len(self.entries)
+    text = text.lower()
+    for i in xrange(min(before, len(self.entries)) - 1, -1, -1):
+      if text in self.entries[i].lower():
+        return i
+    return None
+
+  def _load(self):
+    if self.filename is None:
+      return
+    try:
+      with open(self.filename, 'rb') as f:
+        lines = f.read().splitlines()
+    except IOError as e:
+      return
+    self.file_entries = len(lines)
+    self.entries = [line for line in lines if line][-self.max_entries:]
@@ -0,0 +1,237 @@
+#!/usr/bin/env python
+
+# Copyright (C) 2010 Paul Bourke <pauldbourke@gmail.com>
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+# $Id$
+# ex: expandtab tabstop=2 shiftwidth=2:
+
+import curses
+import curses.ascii
+
+# names for keys which can't be typed into goldfinchrc as themselves
+key_names = {
+  'space': curses.ascii.SP,
+  'esc': curses.ascii.ESC,
+  'tab': curses.ascii.TAB,
+  'enter': curses.ascii.NL,
+  'bs': curses.KEY_BACKSPACE,
+  'up': curses.KEY_UP,
+  'down': curses.KEY_DOWN,
+  'left': curses.KEY_LEFT,
+  'right': curses.KEY_RIGHT,
+  'pageup': curses.KEY_PPAGE,
+  'pagedown': curses.KEY_NPAGE,
+  'home': curses.KEY_HOME,
+  'end': curses.KEY_END,
+  'resize': curses.KEY_RESIZE,
+  'lt': ord('<'),
+}
+
+def parse_keys(text):
+  '''Turn a key sequence written like 'gg', '<PageDown>' or '<C-d>' into a
+  list of key codes.
+
+  '''
+  keys = []
+  i = 0
+  while i < len(text):
+    if text[i] == '<' and '>' in text[i:]:
+      end = text.index('>', i)
+      name = text[i + 1:end].lower()
+      if name.startswith('c-') and len(name) == 3:
+        keys.append(curses.ascii.ctrl(ord(name[2])))
+      elif name in key_names:
+        keys.append(key_names[name])
+      else:
+        raise ValueError('unknown key <%s>' % text[i + 1:end])
+      i = end + 1
+    else:
+      keys.append(ord(text[i]))
+      i = i + 1
+  return keys
+
+class _Node(object):
+  __slots__ = ('action', 'children')
+
+  def __init__(self):
+    self.action = None
+    self.children = {}  # {key:_Node}
+
+class Keymap(object):
+  '''Named actions and the key sequences bound to them in each mode.
+
+  Bindings are a trie: the first key of a sequence is looked up by
+  (mode, key) and each following key in the children of the node before,
+  so finding the binding for a key is a dict lookup however many there
+  are.
+
+  '''
+
+  def __init__(self):
+    self.actions = {}  # {name:(func, coalesce)}
+    self.trie = {}  # {(mode, first key):_Node}
+
+  def add_action(self, name, func, coalesce=False):
+    '''Define an action which keys can be bound to.
+
+    name -- what goldfinchrc calls it
+    func -- called with a repeat count, 1 unless a count was typed
+    coalesce -- if the key is held down, presses already waiting are taken
+                together as one call with a larger count
+
+    '''
+    self.actions[name] = (func, coalesce)
+
+  def bind(self, mode, keys, action):
+    '''Bind a key sequence to an action in mode, replacing any binding
+    it had.
+
+    keys -- a sequence as parse_keys() takes, or a list of key codes
+
+    '''
+    assert action in self.actions, 'no such action: %s' % action
+    if isinstance(keys, basestring):
+      keys = parse_keys(keys)
+    node = self.trie.setdefault((mode, keys[0]), _Node())
+    for key in keys[1:]:
+      node = node.children.setdefault(key, _Node())
+    node.action = action
+
+  def unbind_action(self, mode, action):
+    '''Remove every binding of action in mode.'''
+    def prune(node):
+      if node.action == action:
+        node.action = None
+      for (key, child) in node.children.items():
+        if prune(child):
+          del node.children[key]
+      return node.action is None and not node.children
+    for (key, node) in self.trie.items():
+      if key[0] == mode and prune(node):
+        del self.trie[key]
+
+  def lookup(self, mode, keys):
+    '''The action keys are bound to in mode, or None.'''
+    node = self.trie.get((mode, keys[0]))
+    for key in keys[1:]:
+      if node is None:
+        break
+      node = node.children.get(key)
+    return node and node.action
+
+  def load(self, config, section, mode):
+    '''Replace bindings with those in a goldfinchrc section, which has
+    lines like 'scroll_down = j <Down>': an action and the key sequences
+    for it.
+
+    Returns a list of problems found, e.g. unknown actions.
+
+    '''
+    problems = []
+    if config is None or not config.has_section(section):
+      return problems
+    for (action, value) in config.items(section):
+      if action not in self.actions:
+        problems.append('[%s] unknown action %s' % (section, action))
+        continue
+      try:
+        sequences = [parse_keys(keys) for keys in value.split()]
+      except ValueError as e:
+        problems.append('[%s] %s: %s' % (section, action, e))
+        continue
+      self.unbind_action(mode, action)
+      for keys in sequences:
+        self.bind(mode, keys, action)
+    return problems
+
+  def run(self, action, count=1):
+    self.actions[action][0](count)
+
+  def coalesces(self, action):
+    return self.actions[action][1]
+
+class KeyReader(object):
+  '''Follows keys through a Keymap one at a time, collecting a repeat
+  count typed before a sequence (e.g. 10j) and waiting while the keys so
+  far are the start of a longer binding (e.g. the first g of gg).
+
+  '''
+
+  def __init__(self, keymap, count_modes=('command',)):
+    '''Initialises a KeyReader.
+
+    keymap -- the Keymap to follow
+    count_modes -- modes in which digits are a repeat count rather than
+                   keys in their own right
+
+    '''
+    self.keymap = keymap
+    self.count_modes = count_modes
+    self.reset()
+
+  def reset(self):
+    self.mode = None
+    self.node = None  # where in the trie the keys so far lead
+    self.keys = []
+    self.count = 0
+
+  def feed(self, mode, key):
+    '''Take the next key.  Returns a list, empty while more keys are
+    needed, of:
+
+      (action, count, None) -- run action count times
+      (None, 1, key) -- key isn't bound, so is left to the caller
+
+    '''
+    if mode != self.mode:
+      self.reset()
+      self.mode = mode
+    if self.node is None:
+      if mode in self.count_modes and curses.ascii.isdigit(key) and \
+          (key != ord('0') or self.count):
+        self.count = self.count * 10 + key - ord('0')
+        return []
+      node = self.keymap.trie.get((mode, key))
+    else:
+      node = self.node.children.get(key)
+    if node is None:
+      return self._unmatched(mode, key)
+    self.keys.append(key)
+    if node.children:
+      self.node = node  # wait for the rest
+      return []
+    return self._matched(node.action)
+
+  def _matched(self, action):
+    count = max(self.count, 1)
+    self.reset()
+    return [(action, count, None)]
+
+  def _unmatched(self, mode, key):
+    node = self.node
+    keys = self.keys
+    count = max(self.count, 1)
+    self.reset()
+    if node is None:
+      return [(None, 1, key)]
+    # the keys so far weren't the start of anything after all: run the
+    # shorter binding if they were one, otherwise hand them back, and
+    # start again from this key
+    if node.action is not None:
+      events = [(node.action, count, None)]
+    else:
+      events = [(None, 1, k) for k in keys]
+    return events + self.feed(mode, key)
@@ -0,0 +1,238 @@
+#!/usr/bin/env python
+
+# Copyright (C) 2010 Paul Bourke <pauldbourke@gmail.com>
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+# $Id$
+# ex: expandtab tabstop=2 shiftwidth=2:
+
+from goldfinchlib.fileutil import atomic_write
+
+import logging
+import threading
+import time
+import traceback
+import cPickle
+
+def split_thread(text, max_length):
+  '''Split text into parts of at most max_length characters, breaking
+  between words where possible and numbering each part ' 1/3' etc.
+
+  Returns a list of strings, just [text] if it already fits.
+
+  '''
+  if len(text) <= max_length:
+    return [text]
+  # the numbering can't be known until the split is done, so allow for the
+  # widest it could be and retry if there turn out to be more parts
+  digits = 1
+  while True:
+    room = max_length - len(' %s/%s' % ('9' * digits, '9' * digits))
+    parts = []
+    rest = text.strip()
+    while rest:
+      if len(rest) <= room:
+        parts.append(rest)
+        break
+      cut = rest.rfind(' ', 0, room + 1)
+      if cut <= 0:
+        cut = room
+      parts.append(rest[:cut].rstrip())
+      rest = rest[cut:].lstrip()
+    if len(str(len(parts))) <= digits:
+      break
+    digits = digits + 1
+  return ['%s %d/%d' % (part, i + 1, len(parts))
+      for (i, part) in enumerate(parts)]
+
+class Outbox(object):
+  '''Queue of posts waiting to be sent.  Posts are saved to disk as soon as
+  they are queued, and a background thread sends them in order, spacing
+  the requests out and retrying failures with exponential backoff.  A post
+  made of several parts is sent as a thread, each part in reply to the one
+  before it.
+
+  '''
+
+  min_interval = 1.0  # seconds between requests
+  min_backoff = 2.0
+  max_backoff = 300.0
+  max_attempts = 8  # failures before a post is given up on
+
+  def __init__(self, filename, send, notify=None, clock=time.time):
+    '''Initialises an Outbox, loading any posts left over from last time.
+    Call start() to begin sending.
+
+    filename -- file the queue is saved in
+    send -- function called with (text, in_reply_to) which posts text,
+            optionally in reply to a status id, and returns the new status id
+    notify -- optional function called with a short progress message
+    clock -- function returning the current time in seconds
+
+    '''
+    self.logger = logging.getLogger(''.join(
+        ['goldfinch', '.', self.__class__.__name__]))
+    self.filename = filename
+    self.send = send
+    self.notify = notify
+    self.clock = clock
+    self.cond = threading.Condition()
+    self.stopped = False
+    self.thread = None
+    self.next_id = 1
+    self.queue = []  # [post dict], oldest first
+    self.failed = []  # posts given up on, kept so they aren't lost
+    self._load()
+
+  def post(self, parts):
+    '''Queue a post.
+
+    parts -- list of strings to send as one thread, see split_thread
+
+    Returns the number of posts now waiting.
+
+    '''
+    with self.cond:
+      self.queue.append({'id': self.next_id, 'parts': list(parts),
+          'sent': [], 'attempts': 0, 'next_try': 0})
+      self.next_id = self.next_id + 1
+      self._save()
+      self.cond.notify()
+      return len(self.queue)
+
+  def pending(self):
+    with self.cond:
+      return len(self.queue)
+
+  def start(self):
+    self.stopped = False
+    self.thread = threading.Thread(target=self.run, name='outbox')
+    self.thread.setDaemon(True)
+    self.thread.start()
+
+  def stop(self, timeout=1.0):
+    '''Stop sending, waiting up to timeout seconds for a post in progress.
+    Anything still queued is sent next time.
+
+    '''
+    with self.cond:
+      self.stopped = True
+      self.cond.notify()
+    if self.thread is not None:
+      self.thread.join(timeout)
+
+  def run(self):
+    while True:
+      with self.cond:
+        post = self._next_due()
+        if post is None:
+          return
+      self.send_next(post)
+      with self.cond:
+        if not self.stopped:
+          self.cond.wait(self.min_interval)
+
+  def _next_due(self):
+    '''Wait until the post at the head of the queue is due.  Returns it,
+    or None once stopped.  Must be called holding self.cond.
+
+    '''
+    while not self.stopped:
+      if self.queue:
+        wait = self.queue[0]['next_try'] - self.clock()
+        if wait <= 0:
+          return self.queue[0]
+        self.cond.wait(wait)
+      else:
+        self.cond.wait()
+    return None
+
+  def send_next(self, post):
+    '''Send the next unsent part of post, updating the queue to match.
+    Returns True if the part was sent.
+
+    '''
+    index = len(post['sent'])
+    in_reply_to = None
+    if post['sent']:
+      in_reply_to = post['sent'][-1]
+    try:
+      status_id = self.send(post['parts'][index], in_reply_to)
+    except Exception as e:
+      self.logger.debug(traceback.format_exc())
+      self._failed(post, e)
+      return False
+    with self.cond:
+      post['sent'].append(status_id)
+      post['attempts'] = 0
+      if len(post['sent']) == len(post['parts']):
+        self.queue.remove(post)
+        self._report(len(post['parts']) == 1 and 'Posted' or
+            'Posted thread of %d' % len(post['parts']))
+      else:
+        self._report('Posted %d/%d' % (len(post['sent']),
+            len(post['parts'])))
+      self._save()
+    return True
+
+  def _failed(self, post, error):
+    with self.cond:
+      post['attempts'] = post['attempts'] + 1
+      if post['attempts'] >= self.max_attempts:
+        self.queue.remove(post)
+        self.failed.append(post)
+        self.logger.error('giving up on post %d: %s' % (post['id'], error))
+        self._report('Post failed, giving up: %s' % error)
+      else:
+        backoff = min(self.min_backoff * 2 ** (post['attempts'] - 1),
+            self.max_backoff)
+        post['next_try'] = self.clock() + backoff
+        self.logger.info('post %d failed (%s), retrying in %ds' %
+            (post['id'], error, backoff))
+        self._report('Post failed, retrying in %ds' % backoff)
+      self._save()
+
+  def _report(self, message):
+    if self.queue:
+      message = '%s (%d queued)' % (message, len(self.queue))
+    if self.notify is not None:
+      self.notify(message)
+
+  def _save(self):
+    data = cPickle.dumps({'next_id': self.next_id, 'queue': self.queue,
+        'failed': self.failed}, cPickle.HIGHEST_PROTOCOL)
+    try:
+      atomic_write(self.filename, data)
+    except (IOError, OSError) as e:
+      self.logger.error('could not save outbox: %s' % e)
+
+  def _load(self):
+    try:
+      with open(self.filename, 'rb') as f:
+        saved = cPickle.load(f)
+    except IOError as e:
+      return
+    except (cPickle.PickleError, EOFError, AttributeError, ImportError), e:
+      self.logger.debug(traceback.format_exc())
+      self.logger.error('could not read outbox %s, ignoring it' %
+          self.filename)
+      return
+    self.next_id = saved['next_id']
+    self.queue = saved['queue']
+    self.failed = saved['failed']
+    for post in self.queue:
+      post['next_try'] = 0
+    if self.queue:
+      self.logger.info('%d posts left in outbox' % len(self.queue))
@@ -20,81 +20,397 @@
 
 import curses
 
-import Queue
+import bisect
 import locale
+import re
+import threading
+
+from goldfinchlib.ringbuffer import RingBuffer
+from goldfinchlib.status import Status, format_status
+from goldfinchlib.textwidth import truncate_columns, display_width
+from goldfinchlib.searchindex import SearchIndex, tokens
+from goldfinchlib.wrapcache import WrapCache
+
+def item_text(item):
+  '''The text of an item to search, the screen name and text for a
+  Status.
+
+  '''
+  if isinstance(item, Status):
+    return u'%s %s' % (item.screen_name, item.text)
+  if isinstance(item, basestring):
+    return item
+  return u''
+
+def format_item(item, width):
+  '''Default pager formatter: Status records are laid out with
+  format_status, anything else is a line of text.
+
+  '''
+  if isinstance(item, Status):
+    return format_status(item.screen_name, item.text, width)
+  return [item]
 
 class Pager(object):
-  '''Creates a simple WindowObject returned by curses.newpad and 
-  adds convience functions for drawing text, scrolling, etc.
-  
+  '''The scrolling area between the status bars.  The pager holds items,
+  Status records or plain lines of text, in a RingBuffer and formats them
+  into lines only when they are drawn, so they can be laid out again for
+  another width.  Layouts are kept in a WrapCache.  The view's position is
+  the item at the top plus how many of its lines are scrolled off, so
+  drawing and scrolling cost the same however much scrollback there is,
+  and after a resize the same status stays at the top.  Changes are drawn
+  by the compositor, if there is one, otherwise straight away.
+
   '''
 
-  def __init__(self, scrollback, stdscr, logger=None):
+  def __init__(self, scrollback, stdscr, logger=None, compositor=None,
+      formatter=format_item):
     '''Initialises a Pager object.
 
-    scrollback -- how many lines to hold in the scroll buffer
+    scrollback -- how many items to hold in the scroll buffer
     stdscr -- curses window to draw to
     logger -- optional logger object mainly for debug purposes
+    compositor -- optional Compositor to do the drawing
+    formatter -- function (item, width) -> list of lines
 
     '''
     self.scrollback = scrollback
     self.stdscr = stdscr
     self.logger = logger
-    self.scroll_pos = 0
-    self.text_ypos = 0
-    self.content_queue = Queue.Queue()
+    self.layout = WrapCache(formatter)
+    self.items = RingBuffer(scrollback)
+    self.top = (0, 0)  # (index of the top item, lines of it scrolled off)
+    # items are numbered in order down the pager, so the index's keys stay
+    # valid as items are added at either end
+    self.first_serial = 0  # number of items[0]
+    self.index = SearchIndex()
+    self.search_words = set()
+    self.highlight = None  # regex matching the words searched for
+    self.match = None  # serial of the current match
+    self.lock = threading.RLock()
+    self.compositor = compositor
     (self.term_height, self.term_width) = self.stdscr.getmaxyx()
+    self.view_height = self.term_height - 3  # 2 status bars + inputbox
     locale.setlocale(locale.LC_ALL,"")
 
+  @property
+  def text_ypos(self):
+    '''Number of items in the pager'''
+    return len(self.items)
+
+  @property
+  def scroll_pos(self):
+    '''Lines scrolled past, at the current width.  Costs a walk over the
+    items above the view, so it's not for drawing.
+
+    '''
+    with self.lock:
+      (index, offset) = self.top
+      return sum([len(self._lines(item))
+          for item in self.items.slice(0, index)]) + offset
+
+  def position(self):
+    '''Where the view is, as (id of the top item, lines of it scrolled
+    off), which still means the same place at another width or once more
+    items have been added, unlike scroll_pos.  The id is None if the top
+    item hasn't got one.
+
+    '''
+    with self.lock:
+      (index, offset) = self.top
+      if index >= len(self.items):
+        return (None, 0)
+      return (getattr(self.items[index], 'id', None), offset)
+
+  def scroll_to(self, item_id, offset=0):
+    '''Scroll so the item with item_id is at the top of the view, offset
+    lines of it scrolled off, as far as the last page allows.
+
+    Returns False if there is no such item.
+
+    '''
+    with self.lock:
+      for (index, item) in enumerate(self.items.slice(0, len(self.items))):
+        if getattr(item, 'id', None) == item_id:
+          break
+      else:
+        return False
+      offset = min(offset, len(self._lines(item)) - 1)
+      self.top = min((index, max(offset, 0)), self._max_top())
+    self.invalidate()
+    return True
+
   def draw(self):
-    '''Draw the pager to screen'''
-    self.pager_pad = curses.newpad(self.scrollback, self.term_width) 
-    self.pager_pad.refresh(self.scroll_pos, 0, 1, 0, self.term_height-3, self.term_width)
-    self.pager_pad.scrollok(True)
-    self.pager_pad.idlok(True)
-    self.stdscr.refresh()
+    '''Draw the pager to screen, laying the contents out again if the
+    terminal size has changed.
+
+    '''
+    with self.lock:
+      (self.term_height, self.term_width) = self.stdscr.getmaxyx()
+      self.view_height = self.term_height - 3
+      self.window = curses.newwin(self.view_height, self.term_width, 1, 0)
+      self._reflow()
+    self.invalidate()
+
+  def _reflow(self):
+    '''Keep the top item where it is after a change of size, only its
+    offset may need to shrink.
+
+    '''
+    (index, offset) = self.top
+    if index < len(self.items):
+      offset = min(offset, len(self._lines(self.items[index])) - 1)
+      self.top = min((index, max(offset, 0)), self._max_top())
+    else:
+      self.top = (0, 0)
 
   def add_text(self, text):
-    '''Add a line or lines of text to the pager'''
-    assert hasattr(self, 'pager_pad'), 'You must call Pager.draw() ' +\
+    '''Add an item or list of items to the bottom of the pager'''
+    assert hasattr(self, 'window'), 'You must call Pager.draw() ' +\
         'prior to adding text.'
-    self.content_queue.put(text)
-    self._draw_text()
-
-  def _draw_text(self):
-    content = self.content_queue.get()
-    if type(content) is not list:
-      content = [content]
-    for line in content:
-      try:
-        self.pager_pad.addstr(self.text_ypos, 0, line.encode('utf-8'))
-        self.text_ypos = self.text_ypos + 1
-      except curses.error as e:
-        if self.logger:
-          self.logger.error(e)
-          self.logger.error(line)
-    self.pager_pad.refresh(0, 0, 1, 0, self.term_height-3,\
-        self.term_width)
-    self.stdscr.refresh()
-
-  def scroll(self, lines): 
-    '''Scroll the pager.  Should be able to use window.scroll for this
-    but couldn't get to work for some reason.
-    
+    if type(text) is not list:
+      text = [text]
+    with self.lock:
+      dropped = max(len(self.items) + len(text) - self.scrollback, 0)
+      end = self.first_serial + len(self.items)
+      first = max(self.first_serial, end + len(text) - self.scrollback)
+      for (i, item) in enumerate(self.items.slice(0,
+          first - self.first_serial)):
+        self.index.remove(self.first_serial + i, item_text(item))
+      for (i, item) in enumerate(text):
+        if end + i >= first:
+          self.index.add(end + i, item_text(item))
+      self.first_serial = first
+      self.items.extend(text)
+      if dropped:
+        # keep the view on the same items as the top ones fall off
+        (index, offset) = self.top
+        if index < dropped:
+          self.top = (0, 0)
+        else:
+          self.top = (index - dropped, offset)
+    self.invalidate()
+
+  def prepend_text(self, text):
+    '''Insert an item or items above the existing pager contents,
+    pushing them down rather than erasing them.  If the pager is scrolled
+    the view stays on the same items.
+
+    '''
+    assert hasattr(self, 'window'), 'You must call Pager.draw() ' +\
+        'prior to adding text.'
+    if type(text) is not list:
+      text = [text]
+    with self.lock:
+      kept = min(len(text), self.scrollback)
+      dropped = max(len(self.items) + kept - self.scrollback, 0)
+      end = self.first_serial + len(self.items)
+      for item in self.items.slice(len(self.items) - dropped,
+          len(self.items)):
+        end = end - 1
+        self.index.remove(end, item_text(item))
+      self.first_serial = self.first_serial - kept
+      for (i, item) in enumerate(text[:kept]):
+        self.index.add(self.first_serial + i, item_text(item))
+      self.items.extendleft(text)
+      if self.top != (0, 0):
+        (index, offset) = self.top
+        self.top = min((index + kept, offset), self._max_top())
+        # the same lines are in view unless some fell off the bottom
+        if not dropped and self.top == (index + kept, offset):
+          return
+    self.invalidate()
+
+  def scroll(self, lines):
+    '''Scroll the pager, stopping at the first line and at the last
+    page.
+
     lines -- number of lines to scroll. (negative to scroll up)
 
     '''
-    try:
-      self.pager_pad.refresh(self.scroll_pos+lines, 0, 1,\
-          0, self.term_height-3, self.term_width)
-      if (lines < 0) and (abs(lines) - self.scroll_pos > 0):
-        self.scroll_pos = 0
-      else:
-        self.scroll_pos = self.scroll_pos + lines
-    except curses.error as e:
-      self.logger.error(e)
+    with self.lock:
+      (index, offset) = self.top
+      while lines > 0 and index < len(self.items):
+        remaining = len(self._lines(self.items[index])) - offset
+        if lines < remaining:
+          offset = offset + lines
+          lines = 0
+        else:
+          lines = lines - remaining
+          (index, offset) = (index + 1, 0)
+      while lines < 0:
+        if offset > 0:
+          step = min(offset, -lines)
+          offset = offset - step
+          lines = lines + step
+        elif index > 0:
+          index = index - 1
+          offset = len(self._lines(self.items[index]))
+        else:
+          break
+      top = min((index, offset), self._max_top())
+      if top == self.top:
+        return
+      self.top = top
+    self.invalidate()
+
+  def scroll_home(self):
+    '''Scroll to the first line.'''
+    with self.lock:
+      if self.top == (0, 0):
+        return
+      self.top = (0, 0)
+    self.invalidate()
+
+  def scroll_end(self):
+    '''Scroll to the last page.'''
+    with self.lock:
+      top = self._max_top()
+      if top == self.top:
+        return
+      self.top = top
+    self.invalidate()
+
+  def set_scrollback(self, scrollback):
+    '''Change how many items are kept.  If there are more than that the
+    ones at the bottom are dropped.
+
+    '''
+    with self.lock:
+      for (i, item) in enumerate(self.items.slice(scrollback,
+          len(self.items))):
+        self.index.remove(self.first_serial + scrollback + i,
+            item_text(item))
+      if self.match is not None and self.match >= self.first_serial + \
+          scrollback:
+        self.match = None
+      self.scrollback = scrollback
+      self.items.resize(scrollback)
+      self.top = min(self.top, self._max_top())
+    self.invalidate()
 
   def erase(self):
     '''Clear the pager contents'''
-    self.pager_pad.erase()
-    self.text_ypos = 0
+    with self.lock:
+      self.items.clear()
+      self.index.clear()
+      self.top = (0, 0)
+      self.match = None
+    self.invalidate()
+
+  def search(self, pattern):
+    '''Find the items containing every word of pattern, case
+    insensitively, highlight the words and jump to the first match below
+    the top of the view.  An empty pattern clears the search.
+
+    Returns (number of the match jumped to from 1, number of matches), or
+    None if nothing matches.
+
+    '''
+    with self.lock:
+      self.search_words = tokens(pattern)
+      self.match = None
+      if not self.search_words:
+        self.highlight = None
+        self.invalidate()
+        return None
+      self.highlight = re.compile(r'\b(%s)\b' % '|'.join(
+          [re.escape(word) for word in self.search_words]),
+          re.IGNORECASE | re.UNICODE)
+      if self.index.lookup(self.search_words):
+        self.match = self.first_serial + self.top[0] - 1
+        return self.next_match(1)
+      self.invalidate()
+      return None
+
+  def next_match(self, direction=1):
+    '''Jump to the next match of the last search, or the previous one if
+    direction is negative, wrapping around at either end.
+
+    Returns (number of the match from 1, number of matches), or None if
+    there are none.
+
+    '''
+    with self.lock:
+      matches = self.index.lookup(self.search_words)
+      if not matches:
+        return None
+      current = self.match
+      if current is None:
+        current = self.first_serial + self.top[0] - direction
+      if direction > 0:
+        i = bisect.bisect_right(matches, current) % len(matches)
+      else:
+        i = (bisect.bisect_left(matches, current) - 1) % len(matches)
+      self.match = matches[i]
+      self.top = min((self.match - self.first_serial, 0), self._max_top())
+    self.invalidate()
+    return (i + 1, len(matches))
+
+  def _lines(self, item):
+    return self.layout.lines(item, self.term_width)
+
+  def _max_top(self):
+    '''The furthest the view can scroll: the last page of lines.'''
+    index = len(self.items)
+    needed = self.view_height
+    while index > 0:
+      index = index - 1
+      count = len(self._lines(self.items[index]))
+      if count >= needed:
+        return (index, count - needed)
+      needed = needed - count
+    return (0, 0)
+
+  def visible_lines(self):
+    '''Returns the lines in view, formatting only the items they come
+    from.
+
+    '''
+    with self.lock:
+      (index, offset) = self.top
+      lines = []
+      while len(lines) < self.view_height and index < len(self.items):
+        lines.extend(self._lines(self.items[index])[offset:])
+        (index, offset) = (index + 1, 0)
+      return lines[:self.view_height]
+
+  def invalidate(self):
+    '''The lines in view have changed, redraw them.'''
+    if self.compositor is not None:
+      self.compositor.mark_dirty(self)
+    else:
+      self.render()
+      self.window.refresh()
+
+  def render(self):
+    '''Draw the lines in view, and only those, into the window.'''
+    lines = self.visible_lines()
+    self.window.erase()
+    for row, line in enumerate(lines):
+      try:
+        self._draw_line(row, truncate_columns(line, self.term_width))
+      except curses.error as e:
+        # writing the bottom right corner moves the cursor off the window,
+        # the text is still drawn
+        if row != self.view_height - 1 and self.logger:
+          self.logger.error(e)
+          self.logger.error(line)
+
+  def _draw_line(self, row, line):
+    if self.highlight is None:
+      self.window.addstr(row, 0, line.encode('utf-8'))
+      return
+    column = 0
+    start = 0
+    for found in self.highlight.finditer(line):
+      before = line[start:found.start()]
+      if before:
+        self.window.addstr(row, column, before.encode('utf-8'))
+        column = column + display_width(before)
+      self.window.addstr(row, column, found.group().encode('utf-8'),
+          curses.A_REVERSE)
+      column = column + display_width(found.group())
+      start = found.end()
+    if start < len(line) or not line:
+      self.window.addstr(row, column, line[start:].encode('utf-8'))
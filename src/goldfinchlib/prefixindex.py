@@ -0,0 +1,93 @@
+#!/usr/bin/env python
+
+# Copyright (C) 2010 Paul Bourke <pauldbourke@gmail.com>
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+# $Id$
+# ex: expandtab tabstop=2 shiftwidth=2:
+
+
+import bisect
+import threading
+
+def common_prefix(words):
+  '''The longest prefix, ignoring case, shared by all of words, as spelt
+  in the first of them.
+
+  '''
+  if not words:
+    return ''
+  first = words[0]
+  lowered = [word.lower() for word in words]
+  length = len(first)
+  for word in lowered[1:]:
+    length = min(length, len(word))
+    for i in xrange(length):
+      if word[i] != lowered[0][i]:
+        length = i
+        break
+  return first[:length]
+
+class PrefixIndex(object):
+  '''Words kept sorted, ignoring case, so the ones starting with a prefix
+  are found with two binary searches and a slice, however many there are.
+
+  '''
+
+  def __init__(self, words=()):
+    self.keys = []  # [(lowered word, word)], sorted
+    self.lock = threading.Lock()
+    self.update(words)
+
+  def __len__(self):
+    return len(self.keys)
+
+  def update(self, words):
+    '''Add words, all at once.'''
+    with self.lock:
+      keys = set(self.keys)
+      keys.update([(word.lower(), word) for word in words])
+      self.keys = sorted(keys)
+
+  def add(self, word):
+    key = (word.lower(), word)
+    with self.lock:
+      i = bisect.bisect_left(self.keys, key)
+      if i == len(self.keys) or self.keys[i] != key:
+        self.keys.insert(i, key)
+
+  def remove(self, word):
+    key = (word.lower(), word)
+    with self.lock:
+      i = bisect.bisect_left(self.keys, key)
+      if i < len(self.keys) and self.keys[i] == key:
+        del(self.keys[i])
+
+  def complete(self, prefix, limit=None):
+    '''Returns the words starting with prefix, ignoring case, in order.
+
+    limit -- most words to return, all of them if None
+
+    '''
+    prefix = prefix.lower()
+    with self.lock:
+      start = bisect.bisect_left(self.keys, (prefix,))
+      end = start
+      stop = len(self.keys)
+      if limit is not None:
+        stop = min(stop, start + limit)
+      while end < stop and self.keys[end][0].startswith(prefix):
+        end = end + 1
+      return [word for (lowered, word) in self.keys[start:end]]
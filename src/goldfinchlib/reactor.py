@@ -0,0 +1,262 @@
+#!/usr/bin/env python
+
+# Copyright (C) 2010 Paul Bourke <pauldbourke@gmail.com>
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+# $Id$
+# ex: expandtab tabstop=2 shiftwidth=2:
+
+import collections
+import errno
+import fcntl
+import logging
+import math
+import os
+import select
+import time
+import traceback
+
+class Timer(object):
+  '''A call scheduled on a TimerWheel.  cancel() stops it running.'''
+
+  __slots__ = ('deadline', 'func', 'args', 'rounds', 'cancelled')
+
+  def __init__(self, deadline, func, args):
+    self.deadline = deadline
+    self.func = func
+    self.args = args
+    self.rounds = 0
+    self.cancelled = False
+
+  def cancel(self):
+    self.cancelled = True
+
+class TimerWheel(object):
+  '''Hashed timing wheel: timers go in the slot for the tick they're due
+  on, counting how many times round the wheel they have to wait, so adding
+  and cancelling are O(1) and each tick only looks at one slot.  Timers
+  fire on the first tick at or after their deadline, so up to resolution
+  seconds late.
+
+  '''
+
+  def __init__(self, resolution=0.05, slots=512, clock=time.time):
+    '''Initialises a TimerWheel.
+
+    resolution -- seconds per tick
+    slots -- ticks per turn of the wheel
+    clock -- function returning the current time in seconds
+
+    '''
+    self.resolution = resolution
+    self.slots = [[] for i in range(slots)]
+    self.clock = clock
+    self.tick = int(clock() / resolution)  # the last tick run
+    self.count = 0
+
+  def __len__(self):
+    return self.count
+
+  def call_later(self, delay, func, *args):
+    '''Run func(*args) once delay seconds have passed.  Returns the Timer.'''
+    timer = Timer(self.clock() + delay, func, args)
+    tick = max(int(math.ceil(timer.deadline / self.resolution)),
+        self.tick + 1)
+    timer.rounds = (tick - self.tick - 1) // len(self.slots)
+    self.slots[tick % len(self.slots)].append(timer)
+    self.count = self.count + 1
+    return timer
+
+  def advance(self):
+    '''Move the wheel up to the current time.  Returns the timers due, in
+    the order they're due, for the caller to run.
+
+    '''
+    now = int(self.clock() / self.resolution)
+    size = len(self.slots)
+    due = []
+    # after a long wait only the last turn of the wheel is visited, each
+    # slot counting off the turns it missed as well
+    for tick in xrange(max(self.tick + 1, now - size + 1), now + 1):
+      slot = self.slots[tick % size]
+      if not slot:
+        continue
+      missed = (tick - self.tick - 1) // size
+      waiting = []
+      for timer in slot:
+        if timer.cancelled:
+          self.count = self.count - 1
+        elif timer.rounds <= missed:
+          due.append(timer)
+          self.count = self.count - 1
+        else:
+          timer.rounds = timer.rounds - missed - 1
+          waiting.append(timer)
+      self.slots[tick % size] = waiting
+    self.tick = max(self.tick, now)
+    due.sort(key=lambda timer: timer.deadline)
+    return due
+
+  def next_tick(self):
+    '''Time of the next tick with a timer in its slot, or None if there are
+    no timers.  A timer more than a turn away makes this a tick at which
+    nothing may be due.
+
+    '''
+    if not self.count:
+      return None
+    for offset in xrange(1, len(self.slots) + 1):
+      if self.slots[(self.tick + offset) % len(self.slots)]:
+        return (self.tick + offset) * self.resolution
+    return None
+
+class Reactor(object):
+  '''A single threaded event loop: waits in select() for file descriptors
+  to become readable or the next timer to be due, then runs their
+  callbacks.  Hooks run every time round the loop and say how soon they
+  next need to.  Other threads hand work to the loop with
+  call_from_thread(), which wakes it through a pipe.
+
+  '''
+
+  def __init__(self, resolution=0.05, clock=time.time):
+    '''Initialises a Reactor.
+
+    resolution -- timer precision in seconds
+    clock -- function returning the current time in seconds
+
+    '''
+    self.logger = logging.getLogger(''.join(
+        ['goldfinch', '.', self.__class__.__name__]))
+    self.clock = clock
+    self.timers = TimerWheel(resolution, clock=clock)
+    self.readers = {}  # {fd:callback}
+    self.hooks = []
+    self.calls = collections.deque()  # from other threads
+    self.running = False
+    (self.wake_fd, self.wake_write_fd) = os.pipe()
+    for fd in (self.wake_fd, self.wake_write_fd):
+      flags = fcntl.fcntl(fd, fcntl.F_GETFL)
+      fcntl.fcntl(fd, fcntl.F_SETFL, flags | os.O_NONBLOCK)
+    self.woken = False
+    self.add_reader(self.wake_fd, self._woken)
+
+  def add_reader(self, fd, callback):
+    '''Call callback() whenever fd is readable.  Callbacks should read
+    without blocking: a signal (e.g. SIGWINCH) wakes every reader in case
+    it left something to read.
+
+    '''
+    self.readers[fd] = callback
+
+  def remove_reader(self, fd):
+    self.readers.pop(fd, None)
+
+  def add_hook(self, func):
+    '''Call func() every time round the loop.  It returns the most seconds
+    the loop may wait before calling it again, or None for no limit.
+
+    '''
+    self.hooks.append(func)
+
+  def call_later(self, delay, func, *args):
+    '''Run func(*args) on the loop after delay seconds.  Returns a Timer
+    which can be cancelled.
+
+    '''
+    return self.timers.call_later(delay, func, *args)
+
+  def call_from_thread(self, func, *args):
+    '''Run func(*args) on the loop as soon as possible.  Safe to call from
+    any thread.
+
+    '''
+    self.calls.append((func, args))
+    self.wake()
+
+  def wake(self):
+    '''Make the loop go round now.  Safe to call from any thread.'''
+    if self.woken:
+      return
+    self.woken = True
+    try:
+      os.write(self.wake_write_fd, 'x')
+    except OSError as e:
+      if e.errno != errno.EAGAIN:  # full, so it will wake anyway
+        raise
+
+  def run(self):
+    self.running = True
+    while self.running:
+      self.run_once()
+
+  def stop(self):
+    self.running = False
+    self.wake()
+
+  def run_once(self):
+    '''Run whatever is due, then wait for the next thing to do.'''
+    for timer in self.timers.advance():
+      self._call(timer.func, timer.args)
+    while self.calls:
+      (func, args) = self.calls.popleft()
+      self._call(func, args)
+    timeout = None
+    for hook in self.hooks:
+      wait = self._call(hook, ())
+      if wait is not None and (timeout is None or wait < timeout):
+        timeout = wait
+    next_tick = self.timers.next_tick()
+    if next_tick is not None:
+      wait = max(next_tick - self.clock(), 0)
+      if timeout is None or wait < timeout:
+        timeout = wait
+    if self.calls or not self.running:
+      timeout = 0
+    try:
+      (readable, writable, broken) = select.select(self.readers.keys(),
+          [], [], timeout)
+    except select.error as e:
+      if e.args[0] != errno.EINTR:
+        raise
+      readable = self.readers.keys()
+    for fd in readable:
+      callback = self.readers.get(fd)
+      if callback is not None:
+        self._call(callback, ())
+
+  def close(self):
+    os.close(self.wake_fd)
+    os.close(self.wake_write_fd)
+
+  def _call(self, func, args):
+    # one failing callback shouldn't take the loop down with it
+    try:
+      return func(*args)
+    except Exception as e:
+      self.logger.error(traceback.format_exc())
+      return None
+
+  def _woken(self):
+    try:
+      while os.read(self.wake_fd, 4096):
+        pass
+    except OSError as e:
+      if e.errno != errno.EAGAIN:
+        raise
+    # only once the pipe is empty: a wake() while draining must still
+    # leave the flag clear for the next one.  Anything it was for is
+    # picked up by the hooks and calls which run before the next select()
+    self.woken = False
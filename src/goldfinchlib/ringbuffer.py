@@ -0,0 +1,100 @@
+#!/usr/bin/env python
+
+# Copyright (C) 2010 Paul Bourke <pauldbourke@gmail.com>
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+# $Id$
+# ex: expandtab tabstop=2 shiftwidth=2:
+
+class RingBuffer(object):
+  '''A fixed capacity sequence which can grow at either end.  Once full,
+  adding at one end drops items from the other.  Indexing is O(1), unlike
+  a collections.deque.
+
+  '''
+
+  def __init__(self, capacity):
+    assert capacity > 0, 'capacity must be positive'
+    self.capacity = capacity
+    self.items = [None] * capacity
+    self.start = 0
+    self.count = 0
+
+  def __len__(self):
+    return self.count
+
+  def __getitem__(self, index):
+    if index < 0:
+      index = index + self.count
+    if index < 0 or index >= self.count:
+      raise IndexError('RingBuffer index out of range')
+    return self.items[(self.start + index) % self.capacity]
+
+  def __iter__(self):
+    for i in xrange(self.count):
+      yield self.items[(self.start + i) % self.capacity]
+
+  def append(self, item):
+    '''Add item at the end, dropping the first item if full.'''
+    if self.count == self.capacity:
+      self.items[self.start] = item
+      self.start = (self.start + 1) % self.capacity
+    else:
+      self.items[(self.start + self.count) % self.capacity] = item
+      self.count = self.count + 1
+
+  def appendleft(self, item):
+    '''Add item at the start, dropping the last item if full.'''
+    self.start = (self.start - 1) % self.capacity
+    self.items[self.start] = item
+    if self.count < self.capacity:
+      self.count = self.count + 1
+
+  def extend(self, items):
+    for item in items:
+      self.append(item)
+
+  def extendleft(self, items):
+    '''Add items at the start, keeping their order, so items[0] becomes
+    the first item.
+
+    '''
+    items = list(items)[:self.capacity]
+    for item in reversed(items):
+      self.appendleft(item)
+
+  def slice(self, start, stop):
+    '''Returns a list of the items from start up to stop.'''
+    start = max(start, 0)
+    stop = min(stop, self.count)
+    return [self.items[(self.start + i) % self.capacity]
+        for i in xrange(start, stop)]
+
+  def resize(self, capacity):
+    '''Change the capacity.  If there are more items than that the ones at
+    the end are dropped.
+
+    '''
+    assert capacity > 0, 'capacity must be positive'
+    items = self.slice(0, capacity)
+    self.capacity = capacity
+    self.items = items + [None] * (capacity - len(items))
+    self.start = 0
+    self.count = len(items)
+
+  def clear(self):
+    self.items = [None] * self.capacity
+    self.start = 0
+    self.count = 0
@@ -0,0 +1,201 @@
+#!/usr/bin/env python
+
+# Copyright (C) 2010 Paul Bourke <pauldbourke@gmail.com>
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+# $Id$
+# ex: expandtab tabstop=2 shiftwidth=2:
+
+import logging
+import threading
+import time
+
+class TokenBucket(object):
+  '''Classic token bucket: holds up to capacity tokens and gains rate
+  tokens per second.
+
+  '''
+
+  def __init__(self, capacity, rate, clock=time.time):
+    '''Initialises a full TokenBucket.
+
+    capacity -- most tokens the bucket can hold
+    rate -- tokens added per second
+    clock -- function returning the current time in seconds
+
+    '''
+    self.capacity = float(capacity)
+    self.rate = float(rate)
+    self.clock = clock
+    self.tokens = self.capacity
+    self.last = clock()
+    self.lock = threading.Lock()
+
+  def consume(self, n=1):
+    '''Take n tokens if there are enough.  Returns True on success.'''
+    with self.lock:
+      self._fill()
+      if self.tokens >= n:
+        self.tokens = self.tokens - n
+        return True
+      return False
+
+  def time_until(self, n=1):
+    '''Seconds until n tokens will be available.'''
+    with self.lock:
+      self._fill()
+      if self.tokens >= n:
+        return 0.0
+      if self.rate <= 0:
+        return float('inf')
+      return (n - self.tokens) / self.rate
+
+  def reset(self, tokens, rate):
+    '''Replace the current level and refill rate, e.g. with figures
+    reported by the server.
+
+    '''
+    with self.lock:
+      self.last = self.clock()
+      self.tokens = min(float(tokens), self.capacity)
+      self.rate = float(rate)
+
+  def resize(self, capacity):
+    '''Change the most tokens the bucket can hold, dropping any over it.'''
+    with self.lock:
+      self._fill()
+      self.capacity = float(capacity)
+      self.tokens = min(self.tokens, self.capacity)
+
+  def _fill(self):
+    now = self.clock()
+    self.tokens = min(self.capacity,
+        self.tokens + (now - self.last) * self.rate)
+    self.last = now
+
+class RefreshScheduler(object):
+  '''Decides how long to wait before the next timeline refresh.
+
+  The wait shrinks while refreshes keep finding new statuses and grows while
+  they come back empty, staying between min_interval and max_interval.  On
+  top of that every refresh spends requests_per_refresh tokens from a
+  TokenBucket.  The bucket only holds a few refreshes' worth of tokens and
+  refills at the remaining quota divided by the time to the reset, as
+  reported by the api, so the quota is spread evenly over the window
+  rather than used up early.
+
+  '''
+
+  busy_threshold = 3  # new statuses per refresh which count as busy
+  burst = 4  # refreshes the token bucket can save up
+
+  def __init__(self, base_interval, min_interval=None, max_interval=None,
+      requests_per_refresh=1, quota=150, quota_window=3600,
+      clock=time.time):
+    '''Initialises a RefreshScheduler.
+
+    base_interval -- the configured refresh interval, in seconds
+    min_interval -- shortest allowed wait, defaults to base_interval/4
+    max_interval -- longest allowed wait, defaults to base_interval*5
+    requests_per_refresh -- api calls each refresh makes
+    quota -- requests allowed per quota_window until the api says otherwise
+    quota_window -- seconds in a rate limit window
+
+    '''
+    self.logger = logging.getLogger(''.join(
+        ['goldfinch', '.', self.__class__.__name__]))
+    self.set_base_interval(base_interval, min_interval, max_interval)
+    self.requests_per_refresh = requests_per_refresh
+    self.clock = clock
+    self.bucket = TokenBucket(requests_per_refresh * self.burst,
+        float(quota) / quota_window, clock)
+
+  def set_base_interval(self, base_interval, min_interval=None,
+      max_interval=None):
+    '''Change the configured refresh interval, and start again from it.
+    Defaults for min_interval and max_interval are as for __init__.
+
+    '''
+    self.base_interval = float(base_interval)
+    self.min_interval = float(min_interval or max(base_interval / 4.0, 15))
+    self.max_interval = float(max_interval or base_interval * 5)
+    self.interval = self.base_interval
+
+  def set_requests_per_refresh(self, requests_per_refresh):
+    '''Change how many api calls each refresh makes, and so how many
+    tokens the bucket can save up.
+
+    '''
+    self.requests_per_refresh = requests_per_refresh
+    self.bucket.resize(requests_per_refresh * self.burst)
+
+  def record_activity(self, new_items):
+    '''Tell the scheduler how many new statuses the last refresh found.'''
+    if new_items >= self.busy_threshold:
+      self.interval = self.interval / 2
+    elif new_items == 0:
+      self.interval = self.interval * 1.5
+    else:
+      # drift back towards the configured interval
+      self.interval = (self.interval + self.base_interval) / 2
+    self.interval = min(max(self.interval, self.min_interval),
+        self.max_interval)
+
+  def update_quota(self, remaining, reset_at):
+    '''Resync the token bucket with the api's rate limit figures.
+
+    remaining -- requests left in the current window
+    reset_at -- unix time at which the window resets
+
+    '''
+    window_left = max(reset_at - self.clock(), 1)
+    # with nothing left, refill just enough for one refresh at the reset so
+    # that refresh can pick up the new quota
+    rate = max(remaining, self.requests_per_refresh) / float(window_left)
+    self.bucket.reset(remaining, rate)
+    self.logger.debug('quota: %d requests left, resets in %ds' %
+        (remaining, window_left))
+
+  def update_quotas(self, quotas):
+    '''Resync the token bucket with rate limits the api keeps for each
+    endpoint, each of which a refresh calls once.  The endpoint which will
+    run out first sets the pace.
+
+    quotas -- {endpoint:(remaining, reset_at)}, as for update_quota
+
+    '''
+    now = self.clock()
+    # a window which has already reset says nothing about the new one
+    current = [quota for quota in quotas.values() if quota[1] > now]
+    if not current:
+      return
+    (remaining, reset_at) = min(current,
+        key=lambda quota: (quota[0] / max(quota[1] - now, 1.0), -quota[1]))
+    self.update_quota(remaining * self.requests_per_refresh, reset_at)
+
+  def next_interval(self):
+    '''Seconds to wait before the next refresh.'''
+    budget_wait = self.bucket.time_until(self.requests_per_refresh)
+    if budget_wait == float('inf'):
+      # no quota left and no reset time known, check back later
+      budget_wait = self.max_interval
+    return max(self.interval, budget_wait)
+
+  def start_refresh(self):
+    '''Spend the tokens for a refresh.  Returns False if the budget can't
+    cover it, in which case the refresh should be skipped.
+
+    '''
+    return self.bucket.consume(self.requests_per_refresh)
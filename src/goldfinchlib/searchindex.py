@@ -0,0 +1,92 @@
+#!/usr/bin/env python
+
+# Copyright (C) 2010 Paul Bourke <pauldbourke@gmail.com>
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+# $Id$
+# ex: expandtab tabstop=2 shiftwidth=2:
+
+import re
+import threading
+
+_word = re.compile(r'\w+', re.UNICODE)
+
+def tokens(text):
+  '''The set of lower case words in text.'''
+  if isinstance(text, str):
+    text = text.decode('utf-8', 'replace')
+  return set([word.lower() for word in _word.findall(text)])
+
+class SearchIndex(object):
+  '''An inverted index from words to the entries containing them, kept up
+  to date as entries are added and removed, so a search costs the number
+  of entries matching rather than the number held.
+
+  Entries are identified by integer keys; lookup() returns them sorted, so
+  callers can number their entries in display order and bisect the result.
+
+  '''
+
+  def __init__(self):
+    self.postings = {}  # {word:set(key)}
+    self.generation = 0  # bumped on every change
+    self.lock = threading.Lock()
+    self._last = (None, None, [])  # (words, generation, keys)
+
+  def add(self, key, text):
+    with self.lock:
+      for word in tokens(text):
+        self.postings.setdefault(word, set()).add(key)
+      self.generation = self.generation + 1
+
+  def remove(self, key, text):
+    with self.lock:
+      for word in tokens(text):
+        keys = self.postings.get(word)
+        if keys is not None:
+          keys.discard(key)
+          if not keys:
+            del self.postings[word]
+      self.generation = self.generation + 1
+
+  def clear(self):
+    with self.lock:
+      self.postings = {}
+      self.generation = self.generation + 1
+
+  def lookup(self, words):
+    '''Returns the sorted keys of the entries containing every one of
+    words.  The last result is kept until the index changes, so stepping
+    through matches doesn't repeat the search.
+
+    words -- set of lower case words, see tokens()
+
+    '''
+    words = frozenset(words)
+    with self.lock:
+      (last_words, generation, keys) = self._last
+      if last_words == words and generation == self.generation:
+        return keys
+      keys = []
+      if words:
+        # start from the rarest word, the rest only filter it
+        found = sorted([self.postings.get(word, set()) for word in words],
+            key=len)
+        keys = set(found[0])
+        for other in found[1:]:
+          keys.intersection_update(other)
+        keys = sorted(keys)
+      self._last = (words, self.generation, keys)
+      return keys
@@ -0,0 +1,146 @@
+#!/usr/bin/env python
+
+# Copyright (C) 2010 Paul Bourke <pauldbourke@gmail.com>
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+# $Id$
+# ex: expandtab tabstop=2 shiftwidth=2:
+
+from goldfinchlib.status import Timeline
+from goldfinchlib.workerpool import WorkerPool
+from goldfinchlib.controllers.connpool import ConnectionPool
+
+import logging
+import threading
+
+def account_sections(config):
+  '''Returns the config sections describing accounts, '[account]' first
+  followed by any '[account NAME]' sections in file order.
+
+  '''
+  sections = [section for section in config.sections()
+      if section.startswith('account ')]
+  if config.has_section('account'):
+    sections.insert(0, 'account')
+  return sections
+
+class Session(object):
+  '''Everything belonging to one account: its controller, its own refresh
+  schedule and rate limit budget, and the contents of its pager view.
+
+  '''
+
+  refresh_endpoints = ('home_timeline', 'mentions', 'direct_messages')
+
+  def __init__(self, name, controller, scheduler, scrollback=200,
+      outbox=None):
+    '''Initialises a Session.
+
+    name -- account name, as shown to the user
+    controller -- the account's Controller
+    scheduler -- the account's RefreshScheduler
+    scrollback -- how many statuses to keep
+    outbox -- optional Outbox the account's posts are sent through
+
+    '''
+    self.name = name
+    self.controller = controller
+    self.scheduler = scheduler
+    self.scrollback = scrollback
+    self.outbox = outbox
+    self.unread = {}  # {endpoint:count}
+    self.new_statuses = 0  # arrived since the view was last shown
+    self.timeline = Timeline(scrollback)
+    self.lock = threading.Lock()
+    # the refresh in progress, kept by the UI thread
+    self.refresh_pending = 0  # requests not back yet
+    self.refresh_found = 0  # statuses they've brought so far
+    self.refresh_timeout = None  # Timer giving up on the rest
+    self.next_refresh = None  # Timer starting the next one
+
+  def add_statuses(self, statuses):
+    '''Add Status records, newest first, to the top of the account's
+    timeline.  Returns those which it didn't already have.
+
+    '''
+    with self.lock:
+      return self.timeline.prepend(statuses)
+
+  def set_scrollback(self, scrollback):
+    with self.lock:
+      self.scrollback = scrollback
+      self.timeline.set_capacity(scrollback)
+
+  def statuses(self):
+    with self.lock:
+      return list(self.timeline)
+
+  def view(self):
+    '''Returns the account's statuses, for the pager, and marks them as
+    seen.
+
+    '''
+    with self.lock:
+      self.new_statuses = 0
+      return list(self.timeline)
+
+class SessionManager(object):
+  '''Holds the sessions for every configured account.  They share one
+  bounded WorkerPool for api requests and one ConnectionPool, so running
+  several accounts doesn't multiply threads and sockets.
+
+  '''
+
+  def __init__(self, pool_size=4, timeout=60):
+    '''Initialises a SessionManager.
+
+    pool_size -- number of fetch threads shared by all sessions
+    timeout -- socket timeout for the shared connections
+
+    '''
+    self.logger = logging.getLogger(''.join(
+        ['goldfinch', '.', self.__class__.__name__]))
+    self.pool = WorkerPool(pool_size, 'fetch')
+    self.connection_pool = ConnectionPool(timeout=timeout)
+    self.sessions = []
+    self.current = None
+
+  def add(self, session):
+    '''Add a session.  The first one added becomes the current one.'''
+    assert self.get(session.name) is None, \
+        'duplicate account name ' + session.name
+    self.sessions.append(session)
+    if self.current is None:
+      self.current = session
+
+  def get(self, name):
+    for session in self.sessions:
+      if session.name.lower() == name.lower():
+        return session
+    return None
+
+  def names(self):
+    return [session.name for session in self.sessions]
+
+  def switch(self, name):
+    '''Make the named session the current one.  Returns it, or None if
+    there is no such account.
+
+    '''
+    session = self.get(name)
+    if session is not None:
+      self.logger.info('switching to account ' + session.name)
+      self.current = session
+    return session
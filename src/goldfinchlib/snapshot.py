@@ -0,0 +1,71 @@
+#!/usr/bin/env python
+
+# Copyright (C) 2010 Paul Bourke <pauldbourke@gmail.com>
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+# $Id$
+# ex: expandtab tabstop=2 shiftwidth=2:
+
+from goldfinchlib.fileutil import atomic_write
+
+import logging
+import traceback
+import cPickle
+
+format_version = 4
+
+logger = logging.getLogger('goldfinch.snapshot')
+
+def save_snapshot(filename, sessions, position=(None, 0)):
+  '''Save what each account's timeline looked like so the next launch can
+  show it straight away.
+
+  filename -- file to write
+  sessions -- a SessionManager
+  position -- the pager's Pager.position()
+
+  '''
+  accounts = {}
+  for session in sessions.sessions:
+    accounts[session.name] = {
+        'statuses': session.statuses(),
+        'newest_id': session.controller.newest_id,
+        # only a MultiFetchController polls the other endpoints
+        'newest_ids': dict(getattr(session.controller, 'newest_ids', {}))}
+  data = cPickle.dumps({'version': format_version,
+      'current': sessions.current.name, 'position': position,
+      'accounts': accounts}, cPickle.HIGHEST_PROTOCOL)
+  atomic_write(filename, data)
+  logger.debug('saved timeline snapshot')
+
+def load_snapshot(filename):
+  '''Returns the dict written by save_snapshot, or None if there is no
+  usable snapshot.
+
+  '''
+  try:
+    with open(filename, 'rb') as f:
+      snapshot = cPickle.load(f)
+  except IOError as e:
+    return None
+  except (cPickle.PickleError, EOFError, AttributeError, ImportError), e:
+    logger.debug(traceback.format_exc())
+    logger.info('could not read timeline snapshot, ignoring it')
+    return None
+  if not isinstance(snapshot, dict) or \
+      snapshot.get('version') != format_version:
+    logger.info('unknown timeline snapshot version, ignoring it')
+    return None
+  return snapshot
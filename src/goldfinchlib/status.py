@@ -0,0 +1,186 @@
+#!/usr/bin/env python
+
+# Copyright (C) 2010 Paul Bourke <pauldbourke@gmail.com>
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+# $Id$
+# ex: expandtab tabstop=2 shiftwidth=2:
+
+from goldfinchlib.ringbuffer import RingBuffer
+from goldfinchlib.textwidth import wrap_columns, ljust_columns
+
+import calendar
+import datetime
+
+_screen_names = {}
+
+def to_timestamp(dt):
+  '''UTC datetime -> seconds since the epoch'''
+  return calendar.timegm(dt.utctimetuple())
+
+def intern_name(screen_name):
+  '''Returns the one shared copy of screen_name.  The same few hundred
+  names appear on thousands of statuses.
+
+  '''
+  return _screen_names.setdefault(screen_name, screen_name)
+
+class Status(object):
+  '''A status kept in as little memory as possible: no instance dict, a
+  shared screen name, the text as utf-8 and the time as an integer.
+
+  It unpacks and indexes like the (screen_name, text, created_at) tuples
+  the controllers used to return.
+
+  '''
+
+  __slots__ = ('id', 'screen_name', '_text', 'timestamp')
+
+  def __init__(self, status_id, screen_name, text, created_at):
+    '''Initialises a Status.
+
+    status_id -- the status id, or None if not known
+    screen_name -- who posted it
+    text -- the status text
+    created_at -- UTC datetime, or seconds since the epoch
+
+    '''
+    self.id = status_id
+    self.screen_name = intern_name(screen_name)
+    if isinstance(text, unicode):
+      text = text.encode('utf-8')
+    self._text = text
+    if isinstance(created_at, datetime.datetime):
+      created_at = to_timestamp(created_at)
+    self.timestamp = int(created_at)
+
+  @classmethod
+  def from_api(cls, item):
+    '''Make a Status from a tweepy Status or DirectMessage.'''
+    if hasattr(item, 'sender_screen_name'):
+      return cls(item.id, item.sender_screen_name, item.text, item.created_at)
+    return cls(item.id, item.user.screen_name, item.text, item.created_at)
+
+  @property
+  def text(self):
+    return self._text.decode('utf-8')
+
+  @property
+  def created_at(self):
+    return datetime.datetime.utcfromtimestamp(self.timestamp)
+
+  def __iter__(self):
+    return iter((self.screen_name, self.text, self.created_at))
+
+  def __len__(self):
+    return 3
+
+  def __getitem__(self, index):
+    return tuple(self)[index]
+
+  def __getstate__(self):
+    return (self.id, self.screen_name, self._text, self.timestamp)
+
+  def __setstate__(self, state):
+    (self.id, screen_name, self._text, self.timestamp) = state
+    self.screen_name = intern_name(screen_name)
+
+  def __repr__(self):
+    return 'Status(%r, %r, %r, %r)' % (self.id, self.screen_name,
+        self.text, self.timestamp)
+
+class Timeline(object):
+  '''Statuses newest first, at most capacity of them, indexed by id so the
+  same status arriving twice (e.g. from the stream and a refresh) is only
+  kept once.
+
+  '''
+
+  def __init__(self, capacity):
+    self.statuses = RingBuffer(capacity)
+    self.by_id = {}  # {id:Status}
+
+  def __len__(self):
+    return len(self.statuses)
+
+  def __iter__(self):
+    return iter(self.statuses)
+
+  def __getitem__(self, index):
+    return self.statuses[index]
+
+  def get(self, status_id):
+    return self.by_id.get(status_id)
+
+  def set_capacity(self, capacity):
+    '''Change how many statuses are kept, forgetting the oldest if there
+    are now too many.
+
+    '''
+    for status in self.statuses.slice(capacity, len(self.statuses)):
+      self.by_id.pop(status.id, None)
+    self.statuses.resize(capacity)
+
+  def prepend(self, statuses):
+    '''Add statuses, newest first, above those already held.  Returns
+    the ones which weren't already there.
+
+    '''
+    new = []
+    seen = set()
+    for status in statuses:
+      if status.id is not None:
+        if status.id in self.by_id or status.id in seen:
+          continue
+        seen.add(status.id)
+      new.append(status)
+    if len(self.statuses) + len(new) > self.statuses.capacity:
+      # forget the ids of the ones about to fall off the end
+      drop = len(self.statuses) + len(new) - self.statuses.capacity
+      for status in self.statuses.slice(len(self.statuses) - drop,
+          len(self.statuses)):
+        self.by_id.pop(status.id, None)
+    self.statuses.extendleft(new)
+    for status in new[:self.statuses.capacity]:
+      if status.id is not None:
+        self.by_id[status.id] = status
+    return new
+
+def format_status(screen_name, message, width):
+  '''Formats a status for the pager, so everything aligns nicely.  The
+  screen name is padded to 20 columns and the message wrapped to fit
+  beside it, followed by a blank line.  Columns are counted as the
+  terminal draws them, so wide (e.g. CJK) characters take two.
+
+  Returns a list of lines.
+
+  '''
+  screen_name_padding = 20
+  the_content = []
+  max_chunk_size = width - screen_name_padding
+  chunks = wrap_columns(message, max_chunk_size)
+
+  # add the first chunk of content, right justified
+  the_content.append(''.join([ljust_columns(screen_name,
+      screen_name_padding), chunks[0]]))
+
+  # if there are more chunks, break onto subsequent lines
+  for chunk in chunks[1:]:
+    the_content.append(''.join([' ' * screen_name_padding, chunk]))
+
+  # add a new line
+  the_content.append('')
+
+  return the_content
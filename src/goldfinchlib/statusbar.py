@@ -20,57 +20,89 @@
 
 import curses
 
+from goldfinchlib.textwidth import display_width, truncate_columns
+
 class StatusBar(object):
-  def __init__(self, ypos, stdscr):
+  def __init__(self, ypos, stdscr, compositor=None):
     '''Creates a single line 'statusbar' that can be placed on 
     a curses window.
     position -- The portion of the screen to place it.
                 Can either be 'top or 'bottom'
     stdscr   -- Window object returned by curses.initscr()
+    compositor -- optional Compositor to do the drawing
 
     '''
     self.stdscr = stdscr
+    self.window = stdscr
+    self.compositor = compositor
     (self.term_height, self.term_width) = self.stdscr.getmaxyx()
     self.ypos = ypos
     self.text_left = ''
     self.text_right = ''
+    self.text_metrics = ''
 
   def draw(self):
-    if self.text_left:
-      # add left text and padding
-      self.stdscr.addch(self.ypos, 0, ' ', curses.A_REVERSE)
-      self.stdscr.addstr(self.ypos, 1, self.text_left, curses.A_REVERSE)
-      # paint rest up to possible right text
-      for i in range(len(self.text_left)+1, self.term_width-len(self.text_right)-1):
-        try:
-          self.stdscr.addch(self.ypos, i, ' ', curses.A_REVERSE)
-        except curses.error as e: 
-          pass
-    else:
-      # paint all the way up to possible right text
-      for i in range(0, self.term_width-len(self.text_right)-1):
-        try:
-          self.stdscr.addch(self.ypos, i, ' ', curses.A_REVERSE)
-        except curses.error as e: 
-          pass
-    start_text_at = self.term_width - len(self.text_right) - 1
-    if self.text_right:
-      # add right text and padding
-      self.stdscr.addstr(self.ypos, start_text_at, self.text_right, curses.A_REVERSE)
-      self.stdscr.addstr(self.ypos, 1, self.text_left, curses.A_REVERSE)
+    '''Schedule the bar to be drawn.  With a compositor, any number of
+    changes in a frame are drawn once.
+
+    '''
+    if self.compositor is not None:
+      self.compositor.mark_dirty(self)
     else:
-      for i in range(start_text_at, self.term_width):
-        try:
-          self.stdscr.addch(self.ypos, i, ' ', curses.A_REVERSE)
-        except curses.error as e: 
-          pass
-    self.stdscr.refresh()
+      self.render()
+      self.stdscr.refresh()
+
+  def line(self):
+    '''The bar as one string of term_width columns: the left text from
+    column 1, the right text ending a column short of the edge, and the
+    metrics just before it.  When they don't all fit the metrics go
+    first, then the end of the left text.
+
+    '''
+    right = [text for text in (self.text_metrics, self.text_right) if text]
+    right = '  '.join(right)
+    if self.text_metrics and 1 + display_width(self.text_left) + 1 + \
+        display_width(right) + 1 > self.term_width:
+      right = self.text_right
+    right = truncate_columns(right, max(self.term_width - 2, 0))
+    # a space either end, and one between left and right
+    room = max(self.term_width - display_width(right) - 3, 0)
+    left = truncate_columns(self.text_left, room)
+    padding = self.term_width - 2 - display_width(left) - display_width(right)
+    return u''.join([' ', left, ' ' * padding, right, ' '])
+
+  def render(self):
+    try:
+      self.stdscr.addstr(self.ypos, 0, self.line().encode('utf-8'),
+          curses.A_REVERSE)
+    except curses.error as e:
+      # the bar fills the row, which moves the cursor off the end of it
+      pass
+
+  def resize(self, ypos):
+    '''Move to row ypos and fit the current terminal width.'''
+    (self.term_height, self.term_width) = self.stdscr.getmaxyx()
+    self.ypos = ypos
+    self.draw()
 
   def add_text(self, text, align):
     assert align == 'left' or align == 'right'
     if align == 'left':
+      if text == self.text_left:
+        return
       self.text_left = text
     elif align ==  'right':
+      if text == self.text_right:
+        return
       self.text_right = text
     self.draw()
 
+  def set_metrics(self, text):
+    '''Show text, e.g. api usage, at the right of the bar before the
+    right text.
+
+    '''
+    if text == self.text_metrics:
+      return
+    self.text_metrics = text
+    self.draw()
@@ -0,0 +1,256 @@
+#!/usr/bin/env python
+
+# Copyright (C) 2010 Paul Bourke <pauldbourke@gmail.com>
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+# $Id$
+# ex: expandtab tabstop=2 shiftwidth=2:
+
+import re
+import unicodedata
+
+# Characters which take two columns although unicodedata, which is only as
+# new as the python it comes with, doesn't say so: mostly emoji.
+_wide_ranges = [
+  (0x1100, 0x115f),  # Hangul Jamo initials
+  (0x231a, 0x231b),
+  (0x23e9, 0x23ec),
+  (0x23f0, 0x23f0),
+  (0x23f3, 0x23f3),
+  (0x25fd, 0x25fe),
+  (0x2614, 0x2615),
+  (0x2648, 0x2653),
+  (0x267f, 0x267f),
+  (0x2693, 0x2693),
+  (0x26a1, 0x26a1),
+  (0x26aa, 0x26ab),
+  (0x26bd, 0x26be),
+  (0x26c4, 0x26c5),
+  (0x26ce, 0x26ce),
+  (0x26d4, 0x26d4),
+  (0x26ea, 0x26ea),
+  (0x26f2, 0x26f3),
+  (0x26f5, 0x26f5),
+  (0x26fa, 0x26fa),
+  (0x26fd, 0x26fd),
+  (0x2705, 0x2705),
+  (0x270a, 0x270b),
+  (0x2728, 0x2728),
+  (0x274c, 0x274c),
+  (0x274e, 0x274e),
+  (0x2753, 0x2755),
+  (0x2757, 0x2757),
+  (0x2795, 0x2797),
+  (0x27b0, 0x27b0),
+  (0x27bf, 0x27bf),
+  (0x2b1b, 0x2b1c),
+  (0x2b50, 0x2b50),
+  (0x2b55, 0x2b55),
+  (0x1f004, 0x1f004),
+  (0x1f0cf, 0x1f0cf),
+  (0x1f18e, 0x1f18e),
+  (0x1f191, 0x1f19a),
+  (0x1f200, 0x1f251),
+  (0x1f300, 0x1f64f),
+  (0x1f680, 0x1f6ff),
+  (0x1f7e0, 0x1f7eb),
+  (0x1f90c, 0x1f9ff),
+  (0x1fa70, 0x1faff),
+  (0x20000, 0x3fffd),  # CJK extensions
+]
+
+_zero_width = set([
+  0x200b,  # zero width space
+  0x200c,  # zero width non-joiner
+  0x200d,  # zero width joiner
+  0x2060,  # word joiner
+  0xfeff,  # byte order mark
+])
+
+_ZWJ = u'\u200d'
+
+_ascii = re.compile(r'^[\x20-\x7e]*$')
+
+# char -> columns, filled in as characters are seen
+_widths = {}
+# the same by code point for unicode.translate(), with the columns as a
+# character: u'\x00', u'\x01' or u'\x02'
+_column_chars = {}
+
+_wrapped = {}  # {(text, width):[chunk]}
+_measured = {}  # {text:columns}
+max_wrapped = 10000  # most of each to remember
+
+def _lookup(char):
+  code = ord(char)
+  if code < 0x20 or 0x7f <= code < 0xa0:
+    width = 0  # control characters
+  elif code in _zero_width or 0xfe00 <= code <= 0xfe0f or \
+      unicodedata.combining(char) or \
+      unicodedata.category(char) in ('Mn', 'Me', 'Cf'):
+    width = 0  # combining marks, variation selectors and the like
+  elif 0xdc00 <= code <= 0xdfff:
+    width = 0  # low surrogate, the high one counts for the pair
+  elif 0xd800 <= code <= 0xdbff:
+    width = 2  # astral characters on a narrow build, nearly all emoji
+  elif unicodedata.east_asian_width(char) in ('W', 'F'):
+    width = 2
+  else:
+    width = 1
+    for (start, end) in _wide_ranges:
+      if start <= code <= end:
+        width = 2
+        break
+  _widths[char] = width
+  _column_chars[code] = unichr(width)
+  return width
+
+# including the control characters, so none is left as it is by translate()
+for _code in range(0xa0):
+  _lookup(unichr(_code))
+
+def char_width(char):
+  '''Columns the character takes in a terminal: 0, 1 or 2.'''
+  try:
+    return _widths[char]
+  except KeyError:
+    return _lookup(char)
+
+def is_plain(text):
+  '''True if text is printable ASCII, one column per character.'''
+  return _ascii.match(text) is not None
+
+def display_width(text):
+  '''Columns text takes in a terminal.'''
+  try:
+    return _measured[text]
+  except KeyError:
+    pass
+  if is_plain(text):
+    width = len(text)
+  else:
+    width = _total(_columns(_as_unicode(text)))
+  if len(_measured) >= max_wrapped:
+    _measured.clear()
+  _measured[text] = width
+  return width
+
+def _as_unicode(text):
+  if isinstance(text, str):
+    return text.decode('utf-8', 'replace')
+  return text
+
+def _columns(text):
+  '''The columns each character of unicode text takes, as a string of
+  u'\x00', u'\x01' and u'\x02', so that slices of it can be added up by
+  _total() without a loop.
+
+  '''
+  columns = text.translate(_column_chars)
+  # translate() leaves characters not seen yet as they are, and so in the
+  # way of stripping the columns from the ends
+  if columns.strip(u'\x00\x01\x02'):
+    for char in set(text):
+      if char not in _widths:
+        _lookup(char)
+    columns = text.translate(_column_chars)
+  return columns
+
+def _total(columns):
+  '''Add up a string of columns from _columns().'''
+  return len(columns) + columns.count(u'\x02') - columns.count(u'\x00')
+
+def _split(text, width):
+  '''Break unicode text into chunks of at most width columns.  Zero width
+  characters (combining marks etc.) and whatever follows a ZWJ are drawn
+  with the character before them, so a chunk never starts with one.
+
+  '''
+  columns = _columns(text)
+  end = len(text)
+  i = text.find(_ZWJ)
+  while 0 <= i < end - 1:
+    columns = u''.join([columns[:i + 1], u'\x00', columns[i + 2:]])
+    i = text.find(_ZWJ, i + 1)
+  chunks = []
+  start = 0
+  while start < end:
+    # the first character goes in however wide it is
+    i = start + 1
+    used = ord(columns[start])
+    while i < end:
+      room = width - used
+      if room > 1:
+        # no character takes more than two columns, so half the room left
+        # is sure to fit and can be added up in one go
+        step = room // 2
+        used = used + _total(columns[i:i + step])
+        i = i + step
+      elif ord(columns[i]) <= max(room, 0):
+        used = used + ord(columns[i])
+        i = i + 1
+      else:
+        break
+    chunks.append(text[start:i])
+    start = i
+  return chunks
+
+def wrap_columns(text, width):
+  '''Break text into chunks which each fit in width columns, never splitting
+  a character from its combining marks.  A character wider than width still
+  gets a chunk to itself.
+
+  Plain ASCII is sliced directly, which costs less than remembering it.
+  Other results are remembered, so laying out the same text again is a
+  lookup.
+
+  Returns a list of strings, [''] for empty text.
+
+  '''
+  width = max(width, 1)
+  if is_plain(text):
+    if len(text) <= width:
+      return [text]
+    return [text[i:i + width] for i in range(0, len(text), width)]
+  key = (text, width)
+  try:
+    return _wrapped[key]
+  except KeyError:
+    pass
+  chunks = _split(_as_unicode(text), width)
+  if len(_wrapped) >= max_wrapped:
+    _wrapped.clear()
+  _wrapped[key] = chunks
+  return chunks
+
+def truncate_columns(text, width):
+  '''The start of text which fits in width columns.'''
+  if is_plain(text):
+    return text[:width]
+  text = _as_unicode(text)
+  if width < 1:
+    return text[:0]
+  chunk = _split(text, width)[:1] or [text]
+  if display_width(chunk[0]) > width:
+    return text[:0]  # the first character alone is too wide
+  return chunk[0]
+
+def ljust_columns(text, width):
+  '''Pad text with spaces on the right to width columns.'''
+  return text + ' ' * (width - display_width(text))
+
+def rjust_columns(text, width):
+  '''Pad text with spaces on the left to width columns.'''
+  return ' ' * (width - display_width(text)) + text
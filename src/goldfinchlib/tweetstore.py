@@ -0,0 +1,167 @@
+#!/usr/bin/env python
+
+# Copyright (C) 2010 Paul Bourke <pauldbourke@gmail.com>
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+# $Id$
+# ex: expandtab tabstop=2 shiftwidth=2:
+
+from goldfinchlib.status import Status, to_timestamp
+
+import calendar
+import logging
+import sqlite3
+import threading
+import time
+
+def parse_query(query):
+  '''Split a search string into keyword arguments for TweetStore.search.
+
+  Plain words must all appear in the status text (a trailing * matches any
+  word with that prefix).  from:name limits to one screen name, and
+  since:YYYY-MM-DD / until:YYYY-MM-DD limit the date range (both days
+  inclusive, UTC).
+
+  '''
+  kwargs = {'words': []}
+  for token in query.split():
+    (key, sep, value) = token.partition(':')
+    if sep and value and key == 'from':
+      kwargs['screen_name'] = value.lstrip('@')
+    elif sep and value and key in ('since', 'until'):
+      day = time.strptime(value, '%Y-%m-%d')
+      timestamp = calendar.timegm(day)
+      if key == 'until':
+        timestamp = timestamp + 24*60*60
+      kwargs[key] = timestamp
+    else:
+      kwargs['words'].append(token)
+  return kwargs
+
+class TweetStore(object):
+  '''Keeps every status the client has seen in an sqlite database with a
+  full text index on the status text, so old tweets can be searched without
+  going back to the api.  Falls back to (slow) LIKE matching if the sqlite
+  library was built without FTS.
+
+  '''
+
+  def __init__(self, filename):
+    '''Opens, creating if necessary, a TweetStore.
+
+    filename -- database file, or ':memory:'
+
+    '''
+    self.logger = logging.getLogger(''.join(
+        ['goldfinch', '.', self.__class__.__name__]))
+    # the refresh thread writes while the ui thread searches
+    self.lock = threading.Lock()
+    self.db = sqlite3.connect(filename, check_same_thread=False)
+    self.db.execute('''CREATE TABLE IF NOT EXISTS status (
+        id INTEGER PRIMARY KEY,
+        screen_name TEXT NOT NULL,
+        text TEXT NOT NULL,
+        created_at INTEGER NOT NULL)''')
+    self.db.execute('''CREATE INDEX IF NOT EXISTS status_user
+        ON status (screen_name, created_at)''')
+    self.db.execute('''CREATE INDEX IF NOT EXISTS status_time
+        ON status (created_at)''')
+    self.fts = None
+    for module in ('fts4', 'fts3'):
+      try:
+        self.db.execute('CREATE VIRTUAL TABLE IF NOT EXISTS status_fts '
+            'USING %s (text)' % module)
+        self.fts = module
+        break
+      except sqlite3.OperationalError as e:
+        self.logger.debug('%s unavailable: %s' % (module, e))
+    if not self.fts:
+      self.logger.info('sqlite has no full text search, using LIKE')
+    self.db.commit()
+
+  def add(self, statuses):
+    '''Store statuses, ignoring any already stored.
+
+    statuses -- iterable of (id, screen_name, text, created_at) where
+                created_at is a UTC datetime
+
+    '''
+    with self.lock:
+      for (status_id, screen_name, text, created_at) in statuses:
+        cursor = self.db.execute('INSERT OR IGNORE INTO status '
+            'VALUES (?, ?, ?, ?)',
+            (status_id, screen_name, text, to_timestamp(created_at)))
+        if cursor.rowcount and self.fts:
+          self.db.execute('INSERT INTO status_fts (docid, text) '
+              'VALUES (?, ?)', (status_id, text))
+      self.db.commit()
+
+  def count(self):
+    with self.lock:
+      return self.db.execute('SELECT count(*) FROM status').fetchone()[0]
+
+  def search(self, words=(), screen_name=None, since=None, until=None,
+      limit=100):
+    '''Find stored statuses, newest first.
+
+    words -- words which must all appear in the text
+    screen_name -- only statuses by this user
+    since -- only statuses at or after this unix timestamp
+    until -- only statuses before this unix timestamp
+    limit -- maximum number of results
+
+    Returns a list of goldfinchlib.status.Status.
+
+    '''
+    clauses = []
+    params = []
+    if words and self.fts:
+      clauses.append('id IN (SELECT docid FROM status_fts '
+          'WHERE status_fts MATCH ?)')
+      params.append(' '.join([self._fts_term(w) for w in words]))
+    else:
+      for word in words:
+        clauses.append('text LIKE ?')
+        params.append('%' + word.rstrip('*') + '%')
+    if screen_name:
+      clauses.append('screen_name = ?')
+      params.append(screen_name)
+    if since is not None:
+      clauses.append('created_at >= ?')
+      params.append(since)
+    if until is not None:
+      clauses.append('created_at < ?')
+      params.append(until)
+    sql = 'SELECT id, screen_name, text, created_at FROM status'
+    if clauses:
+      sql = sql + ' WHERE ' + ' AND '.join(clauses)
+    sql = sql + ' ORDER BY id DESC LIMIT ?'
+    params.append(limit)
+    with self.lock:
+      rows = self.db.execute(sql, params).fetchall()
+    return [Status(status_id, screen_name, text, ts)
+        for (status_id, screen_name, text, ts) in rows]
+
+  def close(self):
+    with self.lock:
+      self.db.close()
+
+  def _fts_term(self, word):
+    # quote each word so punctuation isn't read as query syntax
+    prefix = word.endswith('*')
+    word = word.rstrip('*').replace('"', '')
+    if prefix:
+      return '"%s*"' % word
+    return '"%s"' % word
@@ -0,0 +1,122 @@
+#!/usr/bin/env python
+
+# Copyright (C) 2010 Paul Bourke <pauldbourke@gmail.com>
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+# $Id$
+# ex: expandtab tabstop=2 shiftwidth=2:
+
+import logging
+import traceback
+import Queue
+
+class UIChannel(object):
+  '''Carries updates from background threads to the thread which owns the
+  screen.  Producers put (kind, args) records, where args should be
+  immutable, and never touch curses themselves.  The owning thread calls
+  drain() whenever it is idle, which hands each record to the handler
+  registered for its kind.
+
+  A handler registered with batch=True is called once for each run of
+  consecutive records of its kind, with the list of their args, so e.g. a
+  burst of statuses from several fetchers is drawn in one go.
+
+  '''
+
+  def __init__(self, wake=None):
+    '''Initialises a UIChannel.
+
+    wake -- optional function called after each put, e.g. Reactor.wake so
+            the UI thread drains the record straight away
+
+    '''
+    self.logger = logging.getLogger(''.join(
+        ['goldfinch', '.', self.__class__.__name__]))
+    self.queue = Queue.Queue()
+    self.handlers = {}  # {kind:(func, batch)}
+    self.wake = wake
+
+  def register(self, kind, func, batch=False):
+    '''Set the function which applies records of a kind.
+
+    kind -- record kind, any hashable
+    func -- called with a record's args, or a list of args if batch is set
+    batch -- pass runs of consecutive records to func together
+
+    '''
+    self.handlers[kind] = (func, batch)
+
+  def put(self, kind, *args):
+    '''Send a record to the UI thread.  Safe to call from any thread.'''
+    self.queue.put((kind, args))
+    if self.wake is not None:
+      self.wake()
+
+  def drain(self, max_records=500):
+    '''Apply the records waiting, up to max_records of them, without
+    blocking.  Must only be called from the thread which owns the screen.
+
+    Returns the number of records applied.
+
+    '''
+    records = []
+    while len(records) < max_records:
+      try:
+        records.append(self.queue.get_nowait())
+      except Queue.Empty:
+        break
+    i = 0
+    while i < len(records):
+      (kind, args) = records[i]
+      (func, batch) = self.handlers[kind]
+      if batch:
+        run = [args]
+        while i + 1 < len(records) and records[i + 1][0] == kind:
+          i = i + 1
+          run.append(records[i][1])
+        self._apply(func, (run,))
+      else:
+        self._apply(func, args)
+      i = i + 1
+    return len(records)
+
+  def _apply(self, func, args):
+    # one bad record shouldn't stop the rest being drawn
+    try:
+      func(*args)
+    except Exception as e:
+      self.logger.error(traceback.format_exc())
+
+class ChannelQueue(object):
+  '''Stands in for the Queue.Queue a producer puts its results on, e.g.
+  MultiFetchController.poll's ret_queue, and sends each one to the UI
+  thread as a record instead, so nothing has to wait for them.
+
+  '''
+
+  def __init__(self, channel, kind, *args):
+    '''Initialises a ChannelQueue.
+
+    channel -- the UIChannel to send records on
+    kind -- their kind
+    args -- passed to the handler ahead of each item
+
+    '''
+    self.channel = channel
+    self.kind = kind
+    self.args = args
+
+  def put(self, item, block=True, timeout=None):
+    self.channel.put(self.kind, *(self.args + (item,)))
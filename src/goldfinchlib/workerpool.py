@@ -0,0 +1,126 @@
+#!/usr/bin/env python
+
+# Copyright (C) 2010 Paul Bourke <pauldbourke@gmail.com>
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+# $Id$
+# ex: expandtab tabstop=2 shiftwidth=2:
+
+import logging
+import threading
+import traceback
+import Queue
+
+class WorkerPool(object):
+  '''A fixed number of long lived daemon threads which take jobs from a
+  shared Queue.Queue.  Used to run blocking api calls without spawning a new
+  thread for each one.
+
+  '''
+
+  def __init__(self, size, name='worker'):
+    '''Initialises a WorkerPool and starts its threads.
+
+    size -- number of worker threads, i.e. the maximum number of jobs which
+            can run at once
+    name -- prefix for the thread names, handy when reading logs
+
+    '''
+    assert size > 0, 'WorkerPool size must be > 0'
+    self.logger = logging.getLogger(''.join(
+        ['goldfinch', '.', self.__class__.__name__]))
+    self.size = size
+    self.jobs = Queue.Queue()
+    self.threads = []
+    for i in range(size):
+      t = threading.Thread(target=self._work, name='%s-%d' % (name, i))
+      t.setDaemon(True)
+      t.start()
+      self.threads.append(t)
+
+  def submit(self, func, args=(), ret_queue=None):
+    '''Queue a call to func(*args).
+
+    ret_queue -- optional Queue.Queue which receives a tuple of
+                 (args, result, exception) once the call has finished.
+                 exception is None on success.
+
+    '''
+    self.jobs.put((func, args, ret_queue))
+
+  def imap_unordered(self, func, iterable):
+    '''Run func over each item of iterable on the pool, yielding the results
+    in the order they complete rather than the order they were submitted.
+    The first exception raised by a job is re-raised here once it arrives.
+
+    Safe to call from a job running on the pool: rather than tie up a
+    worker waiting, which could leave none to run the jobs, the calling
+    worker runs queued jobs itself until the results are in.
+
+    '''
+    ret_queue = Queue.Queue()
+    pending = 0
+    for item in iterable:
+      self.submit(func, (item,), ret_queue)
+      pending = pending + 1
+    helping = threading.currentThread() in self.threads
+    while pending:
+      if helping and ret_queue.empty() and self._run_queued():
+        continue
+      (args, result, exc) = ret_queue.get()
+      pending = pending - 1
+      if exc is not None:
+        raise exc
+      yield result
+
+  def shutdown(self):
+    '''Ask every worker to exit once the jobs already queued are done.'''
+    for t in self.threads:
+      self.jobs.put(None)
+    self.threads = []
+
+  def _work(self):
+    while True:
+      job = self.jobs.get()
+      if job is None:
+        return
+      self._run(job)
+
+  def _run_queued(self):
+    '''Run the next queued job on this thread.  Returns False if there
+    wasn't one.
+
+    '''
+    try:
+      job = self.jobs.get_nowait()
+    except Queue.Empty:
+      return False
+    if job is None:
+      self.jobs.put(None)  # a worker's exit, not ours to take
+      return False
+    self._run(job)
+    return True
+
+  def _run(self, job):
+    (func, args, ret_queue) = job
+    result = None
+    exc = None
+    try:
+      result = func(*args)
+    except Exception as e:
+      self.logger.debug(traceback.format_exc())
+      exc = e
+    if ret_queue is not None:
+      ret_queue.put((args, result, exc))
@@ -0,0 +1,99 @@
+#!/usr/bin/env python
+
+# Copyright (C) 2010 Paul Bourke <pauldbourke@gmail.com>
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+# $Id$
+# ex: expandtab tabstop=2 shiftwidth=2:
+
+import threading
+
+class WrapCache(object):
+  '''Remembers how items were laid out, keyed by (status id, width), so
+  redrawing and scrolling don't wrap the same status over and over.  Only
+  items which are actually drawn get wrapped, so after a resize the cost
+  is the statuses in view rather than the whole scrollback.
+
+  Layouts for the widths in use are kept, up to max_entries in all; past
+  that the cache starts again, which is cheap since only what's in view
+  needs wrapping.
+
+  '''
+
+  def __init__(self, formatter, max_entries=5000, widths=2):
+    '''Initialises a WrapCache.
+
+    formatter -- function (item, width) -> list of lines
+    max_entries -- most layouts to keep
+    widths -- most different widths to keep layouts for, so resizing
+              back and forth doesn't wrap everything again
+
+    '''
+    self.formatter = formatter
+    self.max_entries = max_entries
+    self.max_widths = widths
+    self.layouts = {}  # {width:{key:[line]}}
+    self.widths = []  # most recently used last
+    self.entries = 0
+    self.hits = 0
+    self.misses = 0
+    self.lock = threading.Lock()
+
+  def lines(self, item, width):
+    '''Returns item laid out for width, wrapping it only if it hasn't been
+    at that width before.
+
+    '''
+    key = getattr(item, 'id', None)
+    if key is None:
+      # plain text, or a status without an id, is cheap or unsafe to key
+      return self.formatter(item, width)
+    with self.lock:
+      layouts = self.layouts.get(width)
+      if layouts is not None and key in layouts:
+        self.hits = self.hits + 1
+        if self.widths[-1] != width:
+          self._layouts_for(width)
+        return layouts[key]
+    lines = self.formatter(item, width)
+    with self.lock:
+      self.misses = self.misses + 1
+      if self.entries >= self.max_entries:
+        self._clear()
+      layouts = self._layouts_for(width)
+      if key not in layouts:
+        self.entries = self.entries + 1
+      layouts[key] = lines
+    return lines
+
+  def clear(self):
+    with self.lock:
+      self._clear()
+
+  def _clear(self):
+    self.layouts = {}
+    self.widths = []
+    self.entries = 0
+
+  def _layouts_for(self, width):
+    if width in self.widths:
+      self.widths.remove(width)
+    self.widths.append(width)
+    if width not in self.layouts:
+      self.layouts[width] = {}
+      while len(self.widths) > self.max_widths:
+        old = self.layouts.pop(self.widths.pop(0))
+        self.entries = self.entries - len(old)
+    return self.layouts[width]
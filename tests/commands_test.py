@@ -0,0 +1,66 @@
+import unittest
+
+import sys
+sys.path.append('../src')
+
+from goldfinchlib.commands import Arg, Command, CommandError, \
+    CommandRegistry
+
+class CommandRegistryTestCase(unittest.TestCase):
+  def setUp(self):
+    self.ran = []
+    self.commands = CommandRegistry()
+    self.commands.add(Command(':post', self.record, [Arg('text',
+        rest=True)], aliases=[':p']))
+    self.commands.add(Command(':list', self.record, [Arg('what',
+        choices=['lists', 'friends'])], aliases=[':l']))
+    self.commands.add(Command(':lines', self.record, [Arg('count', int,
+        optional=True)]))
+    self.commands.add(Command(':account', self.record, [Arg('name',
+        choices=lambda: ['Personal', 'Work'], optional=True)]))
+
+  def record(self, *args):
+    self.ran.append(args)
+
+  def failure(self, line):
+    try:
+      self.commands.run(line)
+    except CommandError as e:
+      return str(e)
+    self.fail('%r ran' % line)
+
+  def test_run(self):
+    self.commands.run(':p  hello   there ')
+    self.commands.run(':list FRIENDS')
+    self.commands.run(':lines 3')
+    self.commands.run(':lines')
+    self.commands.run(':acc Work')
+    assert self.ran == [('hello   there',), ('friends',), (3,), (None,),
+        ('Work',)]
+
+  def test_errors(self):
+    assert self.failure(':nothing') == 'Unknown command.  Try :help'
+    assert self.failure(':li') == 'Ambiguous command :li: :lines :list'
+    assert self.failure(':post') == 'usage: :post TEXT...'
+    assert self.failure(':list') == 'usage: :list lists|friends'
+    assert self.failure(':list all') == 'what must be one of lists, friends'
+    assert self.failure(':lines three').startswith('bad count')
+    assert self.failure(':lines 1 2') == 'usage: :lines [COUNT]'
+    assert self.ran == []
+
+  def test_complete_names(self):
+    assert self.commands.complete('') == (0, [':account', ':lines', ':list',
+        ':post'])
+    assert self.commands.complete(':l') == (0, [':lines', ':list'])
+    assert self.commands.complete(':x') == (0, [])
+
+  def test_complete_args(self):
+    assert self.commands.complete(':list f') == (6, ['friends'])
+    assert self.commands.complete(':l ') == (3, ['friends', 'lists'])
+    assert self.commands.complete(':account w') == (9, ['Work'])
+    assert self.commands.complete(':list lists ') == (12, [])
+    assert self.commands.complete(':post some te') == (11, [])
+    assert self.commands.complete(':nothing ') == (9, [])
+
+if __name__ == '__main__':
+  unittest.main()
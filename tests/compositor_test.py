@@ -0,0 +1,73 @@
+import unittest
+
+import sys
+sys.path.append('../src')
+
+import time
+
+from goldfinchlib.compositor import Compositor
+from goldfinchlib.pager import Pager
+from goldfinchlib.statusbar import StatusBar
+from dummy_stdscr import Dummy_stdscr, Dummy_window
+
+class CompositorTestCase(unittest.TestCase):
+  def setUp(self):
+    self.updates = []
+    self.compositor = Compositor(max_fps=20,
+        update=lambda: self.updates.append(time.time()))
+    self.stdscr = Dummy_stdscr()
+    self.statusbar = StatusBar(0, self.stdscr)
+    self.pager = Pager(1000, self.stdscr)
+    self.window = Dummy_window(self.pager.view_height, self.pager.term_width)
+    self.pager.window = self.window
+    self.compositor.add(self.statusbar)
+    self.compositor.add(self.pager)
+    self.compositor.flush()
+    self.updates = []
+
+  def test_burst_is_one_frame(self):
+    for i in range(100):
+      self.pager.prepend_text('status %d' % i)
+      self.statusbar.add_text('%d new' % i, 'left')
+    assert self.window.rows[0] == ''  # nothing drawn yet
+    assert self.compositor.flush()
+    assert len(self.updates) == 1
+    assert self.window.rows[0] == 'status 99'
+    assert not self.compositor.flush()  # nothing left to draw
+    assert len(self.updates) == 1
+
+  def test_only_dirty_widgets_render(self):
+    self.window.refreshes = 0
+    self.statusbar.add_text('hello', 'left')
+    self.compositor.flush()
+    assert self.window.refreshes == 0
+    self.pager.add_text('hello')
+    self.compositor.flush()
+    assert self.window.refreshes == 1
+
+  def test_frame_rate_cap(self):
+    now = [time.time() + 1]
+    self.compositor.clock = lambda: now[0]
+    self.pager.prepend_text('one')
+    assert self.compositor.tick()
+    self.pager.prepend_text('two')
+    now[0] = now[0] + 0.01
+    assert not self.compositor.tick()  # 20 fps, too soon for another frame
+    now[0] = now[0] + 0.05
+    assert self.compositor.tick()
+    assert len(self.updates) == 2
+    assert self.window.rows[:2] == ['two', 'one']
+
+  def test_wait_time(self):
+    now = [time.time() + 1]
+    self.compositor.clock = lambda: now[0]
+    assert self.compositor.wait_time() is None  # nothing to draw
+    self.pager.prepend_text('one')
+    assert self.compositor.wait_time() == 0
+    self.compositor.tick()
+    self.pager.prepend_text('two')
+    now[0] = now[0] + 0.01
+    assert abs(self.compositor.wait_time() - 0.04) < 1e-6
+
+if __name__ == '__main__':
+  unittest.main()
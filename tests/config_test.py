@@ -0,0 +1,84 @@
+import unittest
+
+import sys
+sys.path.append('../src')
+
+import os
+import shutil
+import tempfile
+
+from goldfinchlib.config import Config, ConfigError, parse_settings, \
+    restart_needed
+
+class ConfigTestCase(unittest.TestCase):
+  def setUp(self):
+    self.dir = tempfile.mkdtemp()
+    self.filename = os.path.join(self.dir, 'goldfinchrc')
+    self.write('[preferences]\nRefresh = 90\nStreaming = yes\n')
+    self.config = Config()
+    self.config.load_config(self.filename)
+
+  def tearDown(self):
+    shutil.rmtree(self.dir)
+
+  def write(self, text):
+    with open(self.filename, 'w') as f:
+      f.write(text)
+
+  def test_settings(self):
+    settings = self.config.get_settings()
+    assert settings.refresh == 90
+    assert settings.streaming is True
+    assert settings.scrollback == 10000  # default
+    assert self.config.get_settings() is settings  # parsed once
+
+  def test_defaults(self):
+    settings = parse_settings(None)
+    assert settings.refresh == 120
+    assert settings.showmetrics is True
+
+  def test_invalid(self):
+    self.write('[preferences]\nRefresh = 0\n')
+    self.config.load_config(self.filename)
+    self.assertRaises(ConfigError, self.config.get_settings)
+    self.write('[preferences]\nRefresh = 10\nShowMetrics = maybe\n')
+    self.config.load_config(self.filename)
+    try:
+      self.config.get_settings()
+    except ConfigError as e:
+      assert str(e) == 'showmetrics = maybe in [preferences]: ' +\
+          'must be yes or no'
+    else:
+      self.fail('ShowMetrics = maybe was accepted')
+
+  def test_reload(self):
+    old = self.config.get_settings()
+    assert not self.config.changed()
+    self.write('[preferences]\nRefresh = 30\nScrollback = 500\n' +
+        'Timeout = 10\n')
+    assert self.config.changed()
+    new = self.config.reload()
+    assert not self.config.changed()
+    assert (new.refresh, new.scrollback) == (30, 500)
+    assert self.config.get_settings() is new
+    assert self.config.get_config().get('preferences', 'scrollback') == '500'
+    assert restart_needed(old, new) == ['timeout', 'streaming']
+
+  def test_bad_reload_keeps_old(self):
+    old = self.config.get_settings()
+    self.write('[preferences]\nRefresh = soon\n')
+    try:
+      self.config.reload()
+    except ConfigError as e:
+      assert str(e) == 'refresh = soon in [preferences]: ' +\
+          'must be a whole number'
+    else:
+      self.fail('Refresh = soon was accepted')
+    assert self.config.get_settings() is old
+    assert not self.config.changed()  # not tried again until edited
+    self.write('not a config file\n')
+    self.assertRaises(ConfigError, self.config.reload)
+    assert self.config.get_settings() is old
+
+if __name__ == '__main__':
+  unittest.main()
@@ -0,0 +1,124 @@
+import unittest
+
+import sys
+sys.path.append('../src')
+
+import gzip
+import httplib
+import threading
+import BaseHTTPServer
+import StringIO
+
+from goldfinchlib.controllers.connpool import ConnectionPool
+
+class KeepAliveHandler(BaseHTTPServer.BaseHTTPRequestHandler):
+  protocol_version = 'HTTP/1.1'
+
+  def do_GET(self):
+    body = 'hello from ' + self.path
+    if 'gzip' in self.headers.get('Accept-Encoding', ''):
+      buf = StringIO.StringIO()
+      f = gzip.GzipFile(fileobj=buf, mode='wb')
+      f.write(body)
+      f.close()
+      body = buf.getvalue()
+      self.send_response(200)
+      self.send_header('Content-Encoding', 'gzip')
+    else:
+      self.send_response(200)
+    self.send_header('Content-Length', str(len(body)))
+    self.end_headers()
+    self.wfile.write(body)
+
+  def do_POST(self):
+    self.server.posts.append(self.path)
+    self.send_response(200)
+    self.send_header('Content-Length', '0')
+    self.end_headers()
+
+  def log_message(self, *args):
+    pass
+
+class StaleConnection(object):
+  '''An idle connection the server has since dropped.'''
+  def __init__(self):
+    self.requests = []
+
+  def request(self, method, url, body=None, headers={}):
+    self.requests.append((method, url))
+
+  def getresponse(self):
+    raise httplib.BadStatusLine('')
+
+  def close(self):
+    pass
+
+class ConnectionPoolTestCase(unittest.TestCase):
+  def setUp(self):
+    self.server = BaseHTTPServer.HTTPServer(('127.0.0.1', 0),
+        KeepAliveHandler)
+    self.server.posts = []
+    self.host = '127.0.0.1:%d' % self.server.server_address[1]
+    self.thread = threading.Thread(target=self.server.serve_forever)
+    self.thread.setDaemon(True)
+    self.thread.start()
+    self.pool = ConnectionPool()
+
+  def tearDown(self):
+    self.pool.close_all()
+    self.server.shutdown()
+    self.server.server_close()
+
+  def get(self, httplib, path):
+    # the same calls tweepy.binder makes
+    conn = httplib.HTTPConnection(self.host, timeout=5)
+    conn.request('GET', path, headers={})
+    response = conn.getresponse()
+    body = response.read()
+    conn.close()
+    return (response, body)
+
+  def test_connections_are_reused(self):
+    shim = self.pool.httplib_shim()
+    for i in range(5):
+      (response, body) = self.get(shim, '/%d' % i)
+      assert response.status == 200
+      assert body == 'hello from /%d' % i
+    assert self.pool.created == 1
+    assert self.pool.reused == 4
+    assert self.pool.hit_rate() == 0.8
+
+  def test_gzip_is_transparent(self):
+    (response, body) = self.get(self.pool.httplib_shim(), '/gz')
+    assert body == 'hello from /gz'
+    assert response.getheader('content-encoding') is None
+
+  def test_last_response_per_thread(self):
+    shim = self.pool.httplib_shim()
+    self.get(shim, '/mine')
+    mine = self.pool.last_response()
+    assert mine is not None
+    thread = threading.Thread(target=self.get, args=(shim, '/theirs'))
+    thread.start()
+    thread.join()
+    assert self.pool.last_response() is mine
+    self.pool.forget_response()
+    assert self.pool.last_response() is None
+
+  def test_stale_get_is_retried(self):
+    stale = StaleConnection()
+    self.pool.idle[(False, self.host)] = [stale]
+    (response, body) = self.get(self.pool.httplib_shim(), '/again')
+    assert stale.requests == [('GET', '/again')]
+    assert body == 'hello from /again'
+
+  def test_stale_post_is_not_retried(self):
+    self.pool.idle[(False, self.host)] = [StaleConnection()]
+    conn = self.pool.connection(self.host, False)
+    conn.request('POST', '/update', 'status=hi')
+    self.assertRaises(httplib.BadStatusLine, conn.getresponse)
+    conn.close()
+    assert self.server.posts == []
+
+if __name__ == '__main__':
+  unittest.main()
@@ -0,0 +1,46 @@
+'''Times timeline refreshes, a friends sync and posting against an offline
+backend: a recording made with 'Backend = record FILE' if one is given,
+otherwise a synthetic timeline.
+
+usage: python controller_bench.py [recording [speedup]]
+'''
+
+import sys
+sys.path.append('../src')
+
+import shutil
+import tempfile
+import time
+
+from goldfinchlib.controllers.replay import ReplayAPI, SyntheticAPI
+from goldfinchlib.controllers.twitter import TwitterController
+
+def timed(name, func, *args):
+  start = time.time()
+  try:
+    func(*args)
+  except Exception as e:
+    print('%-24s failed: %s' % (name, e))
+    return
+  print('%-24s %8.2fms' % (name, (time.time() - start) * 1000))
+
+def main():
+  if len(sys.argv) > 1:
+    speedup = len(sys.argv) > 2 and float(sys.argv[2]) or 1.0
+    api = ReplayAPI(sys.argv[1], speedup)
+  else:
+    api = SyntheticAPI(50, num_friends=2000, latency=0.05)
+  cache_dir = tempfile.mkdtemp()
+  try:
+    controller = TwitterController(cache_dir, api=api)
+    for i in range(3):
+      timed('refresh %d' % i, controller.get_home_timeline_updates, 30)
+      time.sleep(0.5)
+    timed('friends (cold cache)', controller.get_friends)
+    timed('friends (no changes)', controller.get_friends)
+    timed('post', api.update_status, 'benchmark status')
+  finally:
+    shutil.rmtree(cache_dir)
+
+if __name__ == '__main__':
+  main()
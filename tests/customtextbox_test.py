@@ -0,0 +1,86 @@
+import unittest
+
+import sys
+sys.path.append('../src')
+
+from goldfinchlib.customtextbox import CustomTextbox
+from goldfinchlib.keymap import Keymap
+from dummy_stdscr import Dummy_input_window
+
+class CustomTextboxTestCase(unittest.TestCase):
+  def setUp(self):
+    self.modes = []
+    keymap = Keymap()
+    keymap.add_action('command_mode', lambda count: self.modes.append(count))
+    keymap.bind('edit', '<Esc>', 'command_mode')
+    self.win = Dummy_input_window(80)
+    self.box = CustomTextbox(self.win, keymap)
+
+  def type(self, keys):
+    self.win.keys.extend([ord(c) for c in keys])
+    return self.box.read_keys()
+
+  def test_typing(self):
+    assert self.type('hello\n') == ['hello ']
+    assert self.win.refreshes == 1
+
+  def test_paste_is_one_write(self):
+    text = 'x' * 70
+    self.type('a\x1b[200~' + text + '\x1b[201~b')
+    assert self.win.text() == 'a' + text + 'b'
+    assert self.win.writes == 3
+    assert self.win.refreshes == 1
+    assert self.modes == []  # the escape wasn't taken as a key
+
+  def test_paste_line_breaks(self):
+    self.type('\x1b[200~one\r\ntwo\tthree\x07\x1b[201~')
+    assert self.win.text() == 'one two three'
+
+  def test_paste_too_long(self):
+    '''A paste which doesn't fit is refused, not cut short.'''
+    overflows = []
+    self.box.on_overflow = overflows.append
+    self.type('ab\x1b[200~' + 'y' * 300 + '\x1b[201~')
+    assert self.win.text() == 'ab'
+    assert overflows == ['Paste too long: 300 characters, room for 77']
+    self.type('\x1b[200~' + 'y' * 77 + '\x1b[201~')
+    assert self.win.text() == 'ab' + 'y' * 77
+    assert len(overflows) == 1
+
+  def test_paste_too_long_inserting(self):
+    overflows = []
+    self.box.on_overflow = overflows.append
+    self.box.insert_mode = True
+    self.type('abc\x02\x02\x1b[200~' + 'y' * 77 + '\x1b[201~')
+    assert overflows == ['Paste too long: 77 characters, room for 76']
+
+  def test_paste_without_end(self):
+    self.type('\x1b[200~abc')
+    assert self.win.text() == 'abc'
+
+  def test_escape_still_a_key(self):
+    self.type('\x1b[20')
+    assert self.modes == [1]
+    assert self.win.text() == '[20'
+
+  def test_paste_ignored_in_command_mode(self):
+    self.box.mode = 'command'
+    self.type('\x1b[200~:q\n\x1b[201~')
+    assert self.win.text() == ''
+
+  def test_count_with_held_key(self):
+    self.box.keymap.add_action('down', self.modes.append, coalesce=True)
+    self.box.keymap.bind('command', 'j', 'down')
+    self.box.mode = 'command'
+    self.type('jjj')
+    self.type('10jjj')
+    assert self.modes == [3, 12]  # one more for each waiting press
+
+  def test_insert_printable_str(self):
+    self.type('old')
+    self.box.insert_printable_str('n' * 300)
+    assert self.win.text() == 'n' * 79
+    assert self.win.getyx() == (0, 79)
+
+if __name__ == '__main__':
+  unittest.main()
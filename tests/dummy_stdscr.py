@@ -20,3 +20,97 @@ class Dummy_stdscr(object):
 
   def refresh(self): 
     pass
+
+  def noutrefresh(self):
+    pass
+
+class Dummy_window(object):
+  '''Mimics a curses window just enough to see which rows were drawn.'''
+
+  def __init__(self, height, width):
+    self.height = height
+    self.width = width
+    self.rows = [''] * height
+    self.writes = 0
+    self.highlighted = []
+
+  def addstr(self, y, x, text, attr=0):
+    self.rows[y] = self.rows[y][:x] + text
+    self.writes = self.writes + 1
+    if attr:
+      self.highlighted.append((y, text))
+
+  def erase(self):
+    self.rows = [''] * self.height
+    self.highlighted = []
+
+  def refresh(self):
+    pass
+
+  def noutrefresh(self):
+    self.refreshes = getattr(self, 'refreshes', 0) + 1
+
+class Dummy_input_window(object):
+  '''Mimics the one line curses window under a CustomTextbox, with keys
+  to read queued up in keys.
+
+  '''
+
+  def __init__(self, width, keys=''):
+    self.width = width
+    self.cells = [' '] * width
+    self.x = 0
+    self.keys = [ord(c) for c in keys]
+    self.refreshes = 0
+    self.writes = 0
+
+  def getmaxyx(self):
+    return (1, self.width)
+
+  def getyx(self):
+    return (0, self.x)
+
+  def move(self, y, x):
+    self.x = x
+
+  def keypad(self, flag):
+    pass
+
+  def timeout(self, delay):
+    pass
+
+  def getch(self):
+    if not self.keys:
+      return -1
+    return self.keys.pop(0)
+
+  def inch(self, *args):
+    x = args and args[1] or self.x
+    return ord(self.cells[x])
+
+  def addch(self, ch):
+    self.addstr(chr(ch))
+
+  def addstr(self, text):
+    self.cells[self.x:self.x + len(text)] = list(text)
+    del(self.cells[self.width:])
+    self.x = min(self.x + len(text), self.width - 1)
+    self.writes = self.writes + 1
+
+  def insstr(self, text):
+    self.cells[self.x:self.x] = list(text)
+    del(self.cells[self.width:])
+    self.writes = self.writes + 1
+
+  def delch(self):
+    del(self.cells[self.x])
+    self.cells.append(' ')
+
+  def deleteln(self):
+    self.cells = [' '] * self.width
+
+  def refresh(self):
+    self.refreshes = self.refreshes + 1
+
+  def text(self):
+    return ''.join(self.cells).rstrip()
@@ -0,0 +1,78 @@
+import unittest
+
+import sys
+sys.path.append('../src')
+
+import os
+import shutil
+import tempfile
+
+from goldfinchlib.friendstore import FriendStore
+
+class FriendStoreTestCase(unittest.TestCase):
+  def setUp(self):
+    self.dir = tempfile.mkdtemp()
+    self.path = os.path.join(self.dir, 'friends')
+    self.store = FriendStore(self.path, compact_threshold=10)
+
+  def tearDown(self):
+    shutil.rmtree(self.dir)
+
+  def reopen(self):
+    return FriendStore(self.path, compact_threshold=10)
+
+  def test_journal_roundtrip(self):
+    self.store.add({1:'alice', 2:'bob'})
+    self.store.remove([1])
+    assert self.reopen().friends == {2:'bob'}
+
+  def test_complete(self):
+    self.store.add({1:u'alice', 2:u'Alan', 3:u'bob'})
+    assert self.store.complete('al') == [u'Alan', u'alice']
+    self.store.add({2:u'albert'})  # renamed
+    self.store.remove([1])
+    self.store.add({4:u'ALF'})
+    assert self.store.complete('AL') == [u'albert', u'ALF']
+    assert self.store.complete('', limit=2) == [u'albert', u'ALF']
+    assert self.reopen().complete('b') == [u'bob']
+
+  def test_no_change_sync_writes_nothing(self):
+    self.store.add({1:'alice'})
+    size = os.path.getsize(self.store.journal_file)
+    (added, removed) = self.store.diff([1])
+    self.store.add({})
+    self.store.remove(removed)
+    assert (added, removed) == (set(), set())
+    assert os.path.getsize(self.store.journal_file) == size
+
+  def test_compaction(self):
+    for i in range(11):
+      self.store.add({i:'friend%d' % i})
+    assert self.store.journal_entries == 0
+    assert os.path.getsize(self.store.journal_file) == 0
+    store = self.reopen()
+    assert len(store.friends) == 11
+    assert store.generation == 1
+
+  def test_torn_journal_line_is_dropped(self):
+    self.store.add({1:'alice'})
+    with open(self.store.journal_file, 'ab') as f:
+      f.write('0\t+\t2\tbo')
+    store = self.reopen()
+    assert store.friends == {1:'alice'}
+    store.add({3:'carol'})
+    assert self.reopen().friends == {1:'alice', 3:'carol'}
+
+  def test_stale_journal_after_compaction_is_ignored(self):
+    self.store.add({1:'alice'})
+    with open(self.store.journal_file, 'rb') as f:
+      stale = f.read()
+    self.store.remove([1])
+    self.store.compact()
+    # simulate a crash between writing the snapshot and emptying the journal
+    with open(self.store.journal_file, 'wb') as f:
+      f.write(stale)
+    assert self.reopen().friends == {}
+
+if __name__ == '__main__':
+  unittest.main()
@@ -29,8 +29,9 @@ class GoldFinchTestCase(unittest.TestCase):
       assert ''.join(log_file.readlines()).find(log_msg) > -1
 
   def test_init_twitter_api(self):
-    api = self.goldfinch.init_twitter_api()
+    api = self.goldfinch.init_twitter_api(backend='synthetic 1')
     assert api is not None
+    assert api.get_home_timeline(10) is not None
 
   def test_init_config(self):
     self.goldfinch.init_config()
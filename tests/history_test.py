@@ -0,0 +1,50 @@
+import unittest
+
+import sys
+sys.path.append('../src')
+
+import os
+import shutil
+import tempfile
+
+from goldfinchlib.history import History
+
+class HistoryTestCase(unittest.TestCase):
+  def setUp(self):
+    self.dir = tempfile.mkdtemp()
+    self.filename = os.path.join(self.dir, 'history')
+
+  def tearDown(self):
+    shutil.rmtree(self.dir)
+
+  def lines_in_file(self):
+    with open(self.filename) as f:
+      return f.read().splitlines()
+
+  def test_persists(self):
+    history = History(self.filename)
+    for line in [':refresh', ':post hi', ':post hi', '  ', ':list lists']:
+      history.add(line)
+    assert list(history) == [':refresh', ':post hi', ':list lists']
+    assert list(History(self.filename)) == list(history)
+
+  def test_bounded(self):
+    history = History(self.filename, max_entries=5)
+    for i in range(23):
+      history.add(':post %d' % i)
+    assert list(history) == [':post %d' % i for i in range(18, 23)]
+    # the file is rewritten once it holds twice as many as are kept
+    assert len(self.lines_in_file()) <= 10
+    assert list(History(self.filename, max_entries=5)) == list(history)
+
+  def test_search(self):
+    history = History(None)
+    for line in [':post Hello', ':refresh', ':post hello again', ':list']:
+      history.add(line)
+    assert history.search('hello') == 2
+    assert history.search('hello', 2) == 0
+    assert history.search('hello', 0) is None
+    assert history.search('nothing') is None
+
+if __name__ == '__main__':
+  unittest.main()
@@ -0,0 +1,86 @@
+import unittest
+
+import sys
+sys.path.append('../src')
+
+import ConfigParser
+import StringIO
+import curses
+
+from goldfinchlib.keymap import Keymap, KeyReader, parse_keys
+
+class KeymapTestCase(unittest.TestCase):
+  def setUp(self):
+    self.calls = []
+    self.keymap = Keymap()
+    for name in ('down', 'top', 'bottom', 'go', 'quit'):
+      self.keymap.add_action(name, self.recorder(name))
+    self.keymap.bind('command', 'j', 'down')
+    self.keymap.bind('command', 'gg', 'top')
+    self.keymap.bind('command', 'G', 'bottom')
+    self.keymap.bind('edit', '<Esc>', 'quit')
+    self.reader = KeyReader(self.keymap)
+
+  def recorder(self, name):
+    return lambda count: self.calls.append((name, count))
+
+  def feed(self, mode, keys):
+    events = []
+    for key in parse_keys(keys):
+      events.extend(self.reader.feed(mode, key))
+    return events
+
+  def test_parse_keys(self):
+    assert parse_keys('gg') == [ord('g'), ord('g')]
+    assert parse_keys('<Space><PageDown>') == [ord(' '), curses.KEY_NPAGE]
+    assert parse_keys('<C-d>') == [4]
+    self.assertRaises(ValueError, parse_keys, '<Nonsense>')
+
+  def test_lookup(self):
+    assert self.keymap.lookup('command', parse_keys('gg')) == 'top'
+    assert self.keymap.lookup('command', parse_keys('g')) is None
+    assert self.keymap.lookup('edit', parse_keys('j')) is None
+
+  def test_sequences(self):
+    assert self.feed('command', 'j') == [('down', 1, None)]
+    assert self.feed('command', 'g') == []
+    assert self.feed('command', 'g') == [('top', 1, None)]
+    assert self.feed('command', 'G') == [('bottom', 1, None)]
+
+  def test_counts(self):
+    assert self.feed('command', '10j') == [('down', 10, None)]
+    assert self.feed('command', 'j') == [('down', 1, None)]
+    # digits are text in edit mode
+    assert self.feed('edit', '1') == [(None, 1, ord('1'))]
+
+  def test_unbound_keys(self):
+    assert self.feed('edit', 'gx') == [(None, 1, ord('g')),
+        (None, 1, ord('x'))]
+    # a sequence which goes nowhere is handed back, then the key is tried
+    # on its own
+    assert self.feed('command', 'gj') == [(None, 1, ord('g')),
+        ('down', 1, None)]
+    self.keymap.bind('command', 'g', 'go')
+    assert self.feed('command', '3gj') == [('go', 3, None),
+        ('down', 1, None)]
+
+  def test_load(self):
+    config = ConfigParser.SafeConfigParser()
+    config.readfp(StringIO.StringIO('[keys]\n'
+        'down = <Down> <C-n>\n'
+        'nonsense = x\n'
+        'top = <Bad>\n'))
+    problems = self.keymap.load(config, 'keys', 'command')
+    assert len(problems) == 2
+    assert self.keymap.lookup('command', parse_keys('j')) is None
+    assert self.keymap.lookup('command', [curses.KEY_DOWN]) == 'down'
+    assert self.keymap.lookup('command', parse_keys('<C-n>')) == 'down'
+    # a bad binding leaves the default alone
+    assert self.keymap.lookup('command', parse_keys('gg')) == 'top'
+
+  def test_run(self):
+    self.keymap.run('down', 3)
+    assert self.calls == [('down', 3)]
+
+if __name__ == '__main__':
+  unittest.main()
@@ -0,0 +1,40 @@
+import unittest
+
+import sys
+sys.path.append('../src')
+
+from goldfinchlib.controllers.metrics import ApiMetrics, MeteredAPI
+from goldfinchlib.controllers.fakeapi import FakeTwitterAPI
+
+class MetricsTestCase(unittest.TestCase):
+  def setUp(self):
+    self.now = 1000.0
+    self.metrics = ApiMetrics(clock=lambda: self.now)
+
+  def test_window(self):
+    assert self.metrics.latency() is None
+    self.metrics.record(0.1)
+    self.metrics.record(0.3)
+    assert abs(self.metrics.latency() - 0.2) < 1e-9
+    assert self.metrics.requests_per_minute() == 2
+    self.now = self.now + 30
+    self.metrics.record(0.5)
+    assert self.metrics.requests_per_minute() == 3
+    self.now = self.now + 31
+    # only the last call is still in the minute
+    assert self.metrics.requests_per_minute() == 1
+    assert self.metrics.latency() == 0.5
+    assert self.metrics.total == 3
+
+  def test_metered_api(self):
+    api = MeteredAPI(FakeTwitterAPI(), self.metrics)
+    api.api.set_rate_limit(1)
+    api.home_timeline(count=20)
+    assert self.metrics.total == 1
+    # attributes come from the wrapped api
+    assert api.quota_remaining == 0
+    self.assertRaises(Exception, api.home_timeline)
+    assert (self.metrics.total, self.metrics.errors) == (2, 1)
+
+if __name__ == '__main__':
+  unittest.main()
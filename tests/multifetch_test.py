@@ -0,0 +1,55 @@
+import unittest
+
+import sys
+sys.path.append('../src')
+
+import shutil
+import tempfile
+import time
+
+from goldfinchlib.controllers.fakeapi import FakeTwitterAPI
+from goldfinchlib.controllers.multifetch import MultiFetchController
+
+class MultiFetchControllerTestCase(unittest.TestCase):
+  def setUp(self):
+    self.cache_dir = tempfile.mkdtemp()
+    self.api = FakeTwitterAPI(latency=0.2)
+    self.api.add_status('timmy', 'hello')
+    self.api.add_mention('brk3', '@timmy hi')
+    self.api.add_direct_message('brk3', 'psst')
+    self.api.add_list('python')
+    self.controller = MultiFetchController(self.cache_dir, api=self.api)
+
+  def tearDown(self):
+    shutil.rmtree(self.cache_dir)
+
+  def test_endpoints_fetched_concurrently(self):
+    start = time.time()
+    results = self.controller.fetch_all()
+    elapsed = time.time() - start
+    assert elapsed < 0.6, 'took %.2fs, expected ~0.2s' % elapsed
+    results = dict((endpoint, items) for endpoint, items, error in results)
+    assert len(results['home_timeline']) == 2
+    assert results['mentions'][0][1] == '@timmy hi'
+    assert results['direct_messages'][0][:2] == ('brk3', 'psst')
+    assert results['lists'] == ['python']
+
+  def test_since_id_per_endpoint(self):
+    self.controller.fetch_all(['mentions'])
+    self.api.add_mention('brk3', '@timmy again')
+    results = self.controller.fetch_all(['mentions'])
+    assert [item[1] for item in results[0][1]] == ['@timmy again']
+
+  def test_timeout(self):
+    self.api.latencies['direct_messages'] = 1.0
+    pending = self.controller.poll(['home_timeline', 'direct_messages'])
+    results = self.controller.collect(pending, timeout=0.5)
+    assert [endpoint for endpoint, items, error in results] == \
+        ['home_timeline']
+    # the slow request isn't started twice while still in flight
+    assert self.controller.poll(['direct_messages']) == 0
+    late = self.controller.collect(1, timeout=1.0)
+    assert late[0][0] == 'direct_messages'
+
+if __name__ == '__main__':
+  unittest.main()
@@ -0,0 +1,133 @@
+import unittest
+
+import sys
+sys.path.append('../src')
+
+import os
+import shutil
+import sqlite3
+import tempfile
+import time
+
+from goldfinchlib.controllers.fakeapi import FakeTwitterAPI
+from goldfinchlib.controllers.twitter import TwitterController
+from goldfinchlib.outbox import Outbox, split_thread
+
+class FakeClock(object):
+  def __init__(self):
+    self.now = 1000.0
+
+  def __call__(self):
+    return self.now
+
+class FlakySender(object):
+  '''Fails the first failures calls, then posts through controller.'''
+
+  def __init__(self, controller, failures):
+    self.controller = controller
+    self.failures = failures
+
+  def __call__(self, text, in_reply_to):
+    if self.failures:
+      self.failures = self.failures - 1
+      raise IOError('connection reset')
+    return self.controller.post_status(text, in_reply_to)
+
+class OutboxTestCase(unittest.TestCase):
+  def setUp(self):
+    self.dir = tempfile.mkdtemp()
+    self.filename = os.path.join(self.dir, 'outbox')
+    self.api = FakeTwitterAPI()
+    self.controller = TwitterController(self.dir, api=self.api)
+    self.clock = FakeClock()
+    self.messages = []
+
+  def tearDown(self):
+    shutil.rmtree(self.dir)
+
+  def outbox(self, send):
+    return Outbox(self.filename, send, self.messages.append, self.clock)
+
+  def test_split_thread(self):
+    assert split_thread('short', 140) == ['short']
+    text = ' '.join(['word%d' % i for i in range(100)])
+    parts = split_thread(text, 140)
+    for part in parts:
+      assert len(part) <= 140
+    assert parts[0].endswith(' 1/%d' % len(parts))
+    assert ' '.join([part.rsplit(' ', 1)[0] for part in parts]) == text
+    assert split_thread('x' * 30, 10) == \
+        ['xxxxxx %d/5' % i for i in range(1, 6)]
+    assert split_thread('x' * 70, 10)[-1] == 'xx 18/18'
+
+  def test_thread_is_reply_chained(self):
+    outbox = self.outbox(self.controller.post_status)
+    outbox.post(['one 1/3', 'two 2/3', 'three 3/3'])
+    while outbox.pending():
+      assert outbox.send_next(outbox.queue[0])
+    (three, two, one) = self.api.statuses[:3]
+    assert [one.text, two.text, three.text] == \
+        ['one 1/3', 'two 2/3', 'three 3/3']
+    assert one.in_reply_to_status_id is None
+    assert two.in_reply_to_status_id == one.id
+    assert three.in_reply_to_status_id == two.id
+    assert self.messages[-1] == 'Posted thread of 3'
+
+  def test_retry_with_backoff(self):
+    outbox = self.outbox(FlakySender(self.controller, 2))
+    outbox.post(['hello'])
+    assert not outbox.send_next(outbox.queue[0])
+    assert outbox.queue[0]['next_try'] == self.clock.now + 2
+    assert not outbox.send_next(outbox.queue[0])
+    assert outbox.queue[0]['next_try'] == self.clock.now + 4
+    assert self.messages[-1] == 'Post failed, retrying in 4s (1 queued)'
+    assert outbox.send_next(outbox.queue[0])
+    assert outbox.pending() == 0
+    assert self.api.statuses[0].text == 'hello'
+
+  def test_gives_up(self):
+    outbox = self.outbox(FlakySender(self.controller, 100))
+    outbox.post(['hello'])
+    for i in range(Outbox.max_attempts):
+      outbox.send_next(outbox.queue[0])
+    assert outbox.pending() == 0
+    assert outbox.failed[0]['parts'] == ['hello']
+    assert self.outbox(None).failed[0]['parts'] == ['hello']
+
+  def test_survives_restart(self):
+    outbox = self.outbox(self.controller.post_status)
+    outbox.post(['one 1/2', 'two 2/2'])
+    outbox.send_next(outbox.queue[0])
+    restarted = self.outbox(self.controller.post_status)
+    assert restarted.pending() == 1
+    restarted.send_next(restarted.queue[0])
+    assert self.api.statuses[0].in_reply_to_status_id == \
+        self.api.statuses[1].id
+
+  def test_store_failure_is_not_resent(self):
+    def locked(statuses):
+      raise sqlite3.OperationalError('database is locked')
+    self.controller.tweet_store.add = locked
+    outbox = self.outbox(self.controller.post_status)
+    outbox.post(['hello'])
+    assert outbox.send_next(outbox.queue[0])
+    assert outbox.pending() == 0
+    assert [s.text for s in self.api.statuses] == ['hello']
+
+  def test_sender_thread(self):
+    outbox = Outbox(self.filename, self.controller.post_status,
+        self.messages.append)
+    outbox.min_interval = 0.01
+    outbox.start()
+    outbox.post(['first'])
+    outbox.post(['second'])
+    for i in range(100):
+      if not outbox.pending():
+        break
+      time.sleep(0.01)
+    outbox.stop()
+    assert [status.text for status in self.api.statuses[:2]] == \
+        ['second', 'first']
+
+if __name__ == '__main__':
+  unittest.main()
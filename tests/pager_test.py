@@ -3,14 +3,13 @@ import unittest
 import sys
 sys.path.append('../src')
 
-import Queue
-
 from goldfinchlib.pager import Pager
-from dummy_stdscr import Dummy_stdscr
+from goldfinchlib.status import Status, format_status
+from dummy_stdscr import Dummy_stdscr, Dummy_window
 
 class PagerTestCase(unittest.TestCase):
   def setUp(self):
-    self.scrollback = 200
+    self.scrollback = 1000
     self.stdscr = Dummy_stdscr()
     self.pager = Pager(self.scrollback, self.stdscr)
     assert self.pager is not None
@@ -19,13 +18,194 @@ class PagerTestCase(unittest.TestCase):
     assert self.pager.text_ypos == 0
     assert (self.pager.term_height, self.pager.term_width) \
         == self.stdscr.getmaxyx()
+    self.window = Dummy_window(self.pager.view_height, self.pager.term_width)
+    self.pager.window = self.window
+
+  def lines(self, count, prefix='line'):
+    return ['%s %d' % (prefix, i) for i in range(count)]
   
   def test_add_text(self):
     text = 'hello world'
-    #TODO: make a dummy textpad
-    #self.pager.pager_pad = None
-    #self.pager.add_text(text)
-    #assert self.pager.content_queue.get() == text
+    self.pager.add_text(text)
+    assert self.window.rows[0] == text
+    assert self.pager.text_ypos == 1
+
+  def test_scroll(self):
+    height = self.pager.view_height
+    self.pager.add_text(self.lines(height * 2))
+    self.pager.scroll(-5)
+    assert self.pager.scroll_pos == 0
+    self.pager.scroll(3)
+    assert self.window.rows[0] == 'line 3'
+    self.pager.scroll(height * 5)
+    assert self.pager.scroll_pos == height
+    assert self.window.rows[-1] == 'line %d' % (height * 2 - 1)
+
+  def test_prepend_keeps_scrolled_view(self):
+    self.pager.add_text(self.lines(200))
+    self.pager.scroll(10)
+    self.pager.prepend_text(self.lines(3, 'new'))
+    assert self.pager.scroll_pos == 13
+    self.pager.scroll(-13)
+    assert self.window.rows[:4] == ['new 0', 'new 1', 'new 2', 'line 0']
+
+  def test_prepend_redraws_when_full(self):
+    scrollback = self.pager.view_height * 2
+    self.pager.set_scrollback(scrollback)
+    self.pager.add_text(self.lines(scrollback, 'item'))
+    self.pager.scroll_end()
+    self.pager.prepend_text(self.lines(3, 'new'))
+    # the last items fell off so the view moved up
+    assert self.pager.top == self.pager._max_top()
+    assert self.window.rows[:self.pager.view_height] == \
+        self.pager.visible_lines()
+    assert self.window.rows[0] == 'item %d' % (self.pager.view_height - 3)
+
+  def test_scrollback_limit(self):
+    self.pager.add_text(self.lines(self.scrollback + 50))
+    assert self.pager.text_ypos == self.scrollback
+    assert self.window.rows[0] == 'line 50'  # the first ones fell off
+    self.pager.prepend_text(['newest'])
+    assert self.pager.items[0] == 'newest'
+    assert self.pager.items[-1] == 'line %d' % (self.scrollback + 48)
+
+  def test_render_cost(self):
+    '''Drawing touches only the rows in view, however long the buffer.'''
+    pager = Pager(50000, self.stdscr)
+    pager.window = self.window
+    pager.add_text(self.lines(50000))
+    self.window.writes = 0
+    pager.scroll(25000)
+    assert self.window.writes == pager.view_height
+    assert self.window.rows[0] == 'line 25000'
+
+  def test_statuses_are_formatted_when_drawn(self):
+    long_text = 'x' * (self.pager.term_width * 2)
+    statuses = [Status(i, 'timmy', long_text, 0) for i in range(100)]
+    self.pager.add_text(statuses)
+    lines_each = len(format_status('timmy', long_text,
+        self.pager.term_width))
+    assert self.window.rows[0].startswith('timmy')
+    assert self.window.rows[lines_each].startswith('timmy')
+    self.pager.scroll(lines_each + 1)
+    assert self.pager.top == (1, 1)
+    assert self.pager.scroll_pos == lines_each + 1
+    self.pager.scroll(-2)
+    assert self.pager.top == (0, lines_each - 1)
+    self.pager.scroll(10000)
+    assert self.pager.scroll_pos == 100 * lines_each - self.pager.view_height
+
+  def test_long_lines_are_clipped(self):
+    self.pager.add_text('x' * 100)
+    assert self.window.rows[0] == 'x' * self.pager.term_width
+
+  def test_erase(self):
+    self.pager.add_text(self.lines(10))
+    self.pager.erase()
+    assert self.pager.text_ypos == 0
+    assert self.window.rows[0] == ''
+
+  def test_resize_keeps_top_status(self):
+    text = 'x' * 100
+    statuses = [Status(i, 'timmy', text, 0) for i in range(500)]
+    self.pager.add_text(statuses)
+    self.pager.scroll(50 * len(format_status('timmy', text,
+        self.pager.term_width)) + 1)
+    assert self.pager.top == (50, 1)
+    misses = self.pager.layout.misses
+    # twice as wide, each status now fits on fewer lines
+    self.pager.term_width = 64
+    self.pager._reflow()
+    self.pager.invalidate()
+    assert self.pager.top == (50, 1)
+    assert self.window.rows[0].strip() == text[44:88]
+    # only what's in view was wrapped again
+    assert self.pager.layout.misses - misses < self.pager.view_height
+    # and going back is already laid out
+    misses = self.pager.layout.misses
+    self.pager.term_width = 32
+    self.pager._reflow()
+    self.pager.invalidate()
+    assert self.pager.layout.misses == misses
+
+  def test_position(self):
+    text = 'x' * 100
+    statuses = [Status(1000 + i, 'timmy', text, 0) for i in range(500)]
+    self.pager.add_text(statuses)
+    self.pager.scroll(50 * len(format_status('timmy', text,
+        self.pager.term_width)) + 1)
+    assert self.pager.position() == (1050, 1)
+    # as the next launch would, at another width
+    self.pager.erase()
+    self.pager.term_width = 64
+    self.pager.add_text(statuses)
+    assert self.pager.scroll_to(1050, 1)
+    assert self.pager.top == (50, 1)
+    assert self.pager.scroll_to(1050, 10)  # only 4 lines at this width
+    assert self.pager.top == (50, 3)
+    assert not self.pager.scroll_to(1)
+    assert self.pager.top == (50, 3)
+    self.pager.erase()
+    self.pager.add_text(self.lines(10))
+    assert self.pager.position() == (None, 0)
+
+  def test_search(self):
+    lines = self.lines(500)
+    for i in (10, 200, 450):
+      lines[i] = 'needle in line %d' % i
+    self.pager.add_text(lines)
+    assert self.pager.search('NEEDLE') == (1, 3)
+    assert self.pager.top == (10, 0)
+    assert self.window.highlighted == [(0, 'needle')]
+    assert self.pager.next_match(1) == (2, 3)
+    assert self.pager.top == (200, 0)
+    assert self.pager.next_match(1) == (3, 3)
+    # the last page can't scroll any further
+    assert self.pager.top == self.pager._max_top()
+    assert self.pager.next_match(1) == (1, 3)  # wraps around
+    assert self.pager.next_match(-1) == (3, 3)
+    # a search starts from the top of the view
+    self.pager.scroll_home()
+    self.pager.scroll(100)
+    assert self.pager.search('needle') == (2, 3)
+    assert self.pager.top == (200, 0)
+    assert self.pager.search('no such thing') is None
+    assert self.pager.next_match(1) is None
+
+  def test_search_index_follows_buffer(self):
+    self.pager.add_text(self.lines(self.scrollback))
+    self.pager.add_text(['needle 1', 'needle 2'])
+    # the first two lines fell off, and out of the index
+    assert self.pager.search('0') is None
+    assert self.pager.search('needle') == (1, 2)
+    self.pager.prepend_text(['needle 0'])
+    # the first search left the view on the last page
+    self.pager.scroll_home()
+    assert self.pager.search('needle') == (1, 2)  # 'needle 2' fell off
+    assert self.pager.top == (0, 0)
+    assert self.pager.next_match(1) == (2, 2)
+    # 'needle 1' is on the last page
+    assert self.pager.top == self.pager._max_top()
+    self.pager.erase()
+    assert self.pager.search('needle') is None
+
+  def test_search_statuses(self):
+    statuses = [Status(i, 'user%d' % i, 'status %d' % i, 0)
+        for i in range(200)]
+    self.pager.add_text(statuses)
+    assert self.pager.search('user7') == (1, 1)
+    assert self.pager.top == (7, 0)
+
+  def test_set_scrollback(self):
+    self.pager.add_text(self.lines(100))
+    self.pager.scroll(90)
+    self.pager.set_scrollback(50)
+    assert self.pager.text_ypos == 50
+    assert self.pager.top == self.pager._max_top()
+    assert self.pager.search('line 70') is None  # dropped from the index
+    assert self.pager.search('line 49') == (1, 1)
+    self.pager.add_text('line 100')
+    assert self.pager.items[0] == 'line 1'
 
 if __name__ == '__main__':
   unittest.main()
@@ -0,0 +1,45 @@
+import unittest
+
+import sys
+sys.path.append('../src')
+
+import time
+
+from goldfinchlib.prefixindex import PrefixIndex, common_prefix
+
+class PrefixIndexTestCase(unittest.TestCase):
+  def test_complete(self):
+    index = PrefixIndex(['bob', 'Alice', 'alan', 'albert'])
+    assert index.complete('al') == ['alan', 'albert', 'Alice']
+    assert index.complete('AL', limit=2) == ['alan', 'albert']
+    assert index.complete('c') == []
+    assert index.complete('') == ['alan', 'albert', 'Alice', 'bob']
+
+  def test_add_remove(self):
+    index = PrefixIndex()
+    index.add('carol')
+    index.add('carol')
+    index.add('Carl')
+    assert len(index) == 2
+    index.remove('carol')
+    index.remove('nobody')
+    assert index.complete('car') == ['Carl']
+
+  def test_common_prefix(self):
+    assert common_prefix([]) == ''
+    assert common_prefix(['@Alan', '@albert']) == '@Al'
+    assert common_prefix([':list', ':lists']) == ':list'
+    assert common_prefix(['bob']) == 'bob'
+
+  def test_many_names(self):
+    '''Completing against thousands of names needn't look at them all.'''
+    index = PrefixIndex(['user%05d' % i for i in range(20000)])
+    start = time.time()
+    for i in range(100):
+      names = index.complete('user1', 50)
+    assert len(names) == 50
+    assert names[0] == 'user10000'
+    assert (time.time() - start) / 100 < 0.001
+
+if __name__ == '__main__':
+  unittest.main()
@@ -0,0 +1,169 @@
+import unittest
+
+import sys
+sys.path.append('../src')
+
+import os
+import select
+import threading
+import time
+
+from goldfinchlib.reactor import Reactor, TimerWheel
+
+class FakeClock(object):
+  def __init__(self, now=1000.0):
+    self.now = now
+
+  def __call__(self):
+    return self.now
+
+class TimerWheelTestCase(unittest.TestCase):
+  def setUp(self):
+    self.clock = FakeClock()
+    self.wheel = TimerWheel(resolution=0.1, slots=8, clock=self.clock)
+    self.fired = []
+
+  def fire(self):
+    for timer in self.wheel.advance():
+      timer.func(*timer.args)
+
+  def test_order(self):
+    self.wheel.call_later(0.35, self.fired.append, 'c')
+    self.wheel.call_later(0.1, self.fired.append, 'a')
+    self.wheel.call_later(0.2, self.fired.append, 'b')
+    assert len(self.wheel) == 3
+    self.clock.now = self.clock.now + 0.15
+    self.fire()
+    assert self.fired == ['a']
+    self.clock.now = self.clock.now + 1
+    self.fire()
+    assert self.fired == ['a', 'b', 'c']
+    assert len(self.wheel) == 0
+    assert self.wheel.next_tick() is None
+
+  def test_cancel(self):
+    timer = self.wheel.call_later(0.1, self.fired.append, 'a')
+    self.wheel.call_later(0.2, self.fired.append, 'b')
+    timer.cancel()
+    self.clock.now = self.clock.now + 1
+    self.fire()
+    assert self.fired == ['b']
+    assert len(self.wheel) == 0
+
+  def test_rounds(self):
+    '''Timers further away than a turn of the wheel wait their turn.'''
+    self.wheel.call_later(2.0, self.fired.append, 'far')
+    self.wheel.call_later(0.2, self.fired.append, 'near')
+    for i in range(19):
+      self.clock.now = self.clock.now + 0.1
+      self.fire()
+    assert self.fired == ['near']
+    self.clock.now = self.clock.now + 0.1
+    self.fire()
+    assert self.fired == ['near', 'far']
+
+  def test_long_gap(self):
+    '''Nothing is lost or run early when advance isn't called for several
+    turns.
+
+    '''
+    self.wheel.call_later(0.5, self.fired.append, 'a')
+    self.wheel.call_later(5.0, self.fired.append, 'b')
+    self.wheel.call_later(50.0, self.fired.append, 'c')
+    self.clock.now = self.clock.now + 10
+    self.fire()
+    assert self.fired == ['a', 'b']
+    self.clock.now = self.clock.now + 39.8
+    self.fire()
+    assert self.fired == ['a', 'b']
+    self.clock.now = self.clock.now + 0.3
+    self.fire()
+    assert self.fired == ['a', 'b', 'c']
+
+  def test_next_tick(self):
+    self.wheel.call_later(0.3, self.fired.append, 'a')
+    assert abs(self.wheel.next_tick() - (self.clock.now + 0.3)) < 1e-6
+
+class ReactorTestCase(unittest.TestCase):
+  def setUp(self):
+    self.reactor = Reactor(resolution=0.01)
+    self.calls = []
+
+  def tearDown(self):
+    self.reactor.close()
+
+  def test_call_from_thread(self):
+    def call():
+      self.calls.append(threading.currentThread())
+      self.reactor.stop()
+    thread = threading.Thread(target=self.reactor.call_from_thread,
+        args=(call,))
+    thread.start()
+    self.reactor.run()
+    thread.join()
+    assert self.calls == [threading.currentThread()]
+
+  def test_wake_while_draining(self):
+    '''A wake() from another thread while the pipe is being drained
+    mustn't stop later ones waking the loop.
+
+    '''
+    real_read = os.read
+    def read(fd, n):
+      data = real_read(fd, n)
+      if data and not self.calls:
+        self.calls.append('woken')
+        self.reactor.wake()
+      return data
+    self.reactor.wake()
+    os.read = read
+    try:
+      self.reactor._woken()
+    finally:
+      os.read = real_read
+    assert self.calls == ['woken']
+    self.reactor.wake()
+    (readable, _, _) = select.select([self.reactor.wake_fd], [], [], 0)
+    assert readable  # a lost wake would leave the pipe empty
+
+  def test_call_later(self):
+    start = time.time()
+    self.reactor.call_later(0.05, self.calls.append, 'a')
+    self.reactor.call_later(0.1, self.reactor.stop)
+    self.reactor.run()
+    assert self.calls == ['a']
+    assert time.time() - start >= 0.1
+
+  def test_reader(self):
+    (read_fd, write_fd) = os.pipe()
+    def read():
+      self.calls.append(os.read(read_fd, 100))
+      self.reactor.stop()
+    self.reactor.add_reader(read_fd, read)
+    os.write(write_fd, 'keys')
+    self.reactor.run()
+    assert self.calls == ['keys']
+    self.reactor.remove_reader(read_fd)
+    os.close(read_fd)
+    os.close(write_fd)
+
+  def test_hook_wait(self):
+    '''A hook's wait stops select() blocking forever.'''
+    def hook():
+      self.calls.append('hook')
+      if len(self.calls) == 3:
+        self.reactor.stop()
+      return 0.01
+    self.reactor.add_hook(hook)
+    self.reactor.run()
+    assert self.calls == ['hook'] * 3
+
+  def test_failing_callback(self):
+    def fail():
+      raise ValueError('bad')
+    self.reactor.call_later(0, fail)
+    self.reactor.call_later(0.02, self.reactor.stop)
+    self.reactor.run()
+
+if __name__ == '__main__':
+  unittest.main()
@@ -0,0 +1,92 @@
+import unittest
+
+import sys
+sys.path.append('../src')
+
+import cPickle
+import os
+import shutil
+import tempfile
+
+from goldfinchlib.controllers.fakeapi import FakeTwitterAPI
+from goldfinchlib.controllers.replay import RecordingAPI, ReplayAPI, \
+    ReplayError, SyntheticAPI
+from goldfinchlib.controllers.twitter import TwitterController
+
+class FakeClock(object):
+  def __init__(self):
+    self.now = 1000.0
+
+  def __call__(self):
+    return self.now
+
+class ReplayTestCase(unittest.TestCase):
+  def setUp(self):
+    self.dir = tempfile.mkdtemp()
+    self.recording = os.path.join(self.dir, 'session.rec')
+    api = FakeTwitterAPI(num_friends=3, latency=0.01)
+    api.add_status('timmy', 'recorded status')
+    recorder = RecordingAPI(api, self.recording)
+    controller = TwitterController(self.dir, api=recorder)
+    controller.get_home_timeline_updates(30)
+    controller.get_friends()
+    recorder.update_status('posted')
+    self.sleeps = []
+
+  def tearDown(self):
+    shutil.rmtree(self.dir)
+
+  def replay_api(self, speedup):
+    return ReplayAPI(self.recording, speedup, sleep=self.sleeps.append)
+
+  def test_replay_drives_controller(self):
+    api = self.replay_api(0)
+    replay_dir = os.path.join(self.dir, 'replay')
+    os.mkdir(replay_dir)
+    controller = TwitterController(replay_dir, api=api)
+    timeline = controller.get_home_timeline_updates(30)
+    assert timeline[0][:2] == ('timmy', 'recorded status')
+    assert sorted(controller.get_friends()) == \
+        ['friend1', 'friend2', 'friend3']
+    assert api.update_status('posted').text == 'posted'
+    assert api.remaining() == 0
+    self.assertRaises(ReplayError, api.update_status, 'again')
+    assert self.sleeps == []
+
+  def test_replay_timing(self):
+    api = self.replay_api(10)
+    api.home_timeline(count=30)
+    assert len(self.sleeps) == 1
+    assert 0.0005 < self.sleeps[0] < 0.01
+
+  def test_replay_keeps_gaps(self):
+    recording = os.path.join(self.dir, 'gaps.rec')
+    with open(recording, 'wb') as f:
+      for (method, start, elapsed) in [('home_timeline', 100, 1),
+          ('mentions', 110, 2), ('home_timeline', 130, 0.5)]:
+        cPickle.dump({'method': method, 'args': [], 'kwargs': {},
+            'start': start, 'elapsed': elapsed, 'result': [],
+            'error': None}, f)
+    clock = FakeClock()
+    def sleep(seconds):
+      self.sleeps.append(seconds)
+      clock.now = clock.now + seconds
+    api = ReplayAPI(recording, 2, sleep=sleep, clock=clock)
+    api.home_timeline()
+    api.mentions()  # 10s after the first call, so at 1005, plus 1s
+    clock.now = 1020
+    api.home_timeline()  # late already, so only its own 0.25s
+    assert self.sleeps == [0.5, 5.5, 0.25]
+
+class SyntheticAPITestCase(unittest.TestCase):
+  def test_rate(self):
+    clock = FakeClock()
+    api = SyntheticAPI(5, clock=clock)
+    assert api.home_timeline() == []
+    clock.now = clock.now + 2
+    assert len(api.home_timeline(count=100)) == 10
+    clock.now = clock.now + 1
+    assert len(api.home_timeline(count=100, since_id=10)) == 5
+
+if __name__ == '__main__':
+  unittest.main()
@@ -0,0 +1,38 @@
+'''Compares resolving friend ids one get_user() call at a time against
+FriendResolver's batched, pooled lookups, using FakeTwitterAPI to simulate
+network latency.
+
+usage: python resolver_bench.py [num_friends] [latency_ms]
+'''
+
+import sys
+sys.path.append('../src')
+
+import time
+
+from goldfinchlib.controllers.fakeapi import FakeTwitterAPI
+from goldfinchlib.controllers.resolver import FriendResolver
+
+def serial(api, ids):
+  return dict((f_id, api.get_user(f_id).screen_name) for f_id in ids)
+
+def batched(api, ids):
+  return dict(FriendResolver(api).resolve(ids))
+
+def main():
+  num_friends = len(sys.argv) > 1 and int(sys.argv[1]) or 2000
+  latency = (len(sys.argv) > 2 and float(sys.argv[2]) or 5) / 1000.0
+  results = {}
+  for name, func in (('serial get_user', serial), ('batched lookup', batched)):
+    api = FakeTwitterAPI(num_friends, latency)
+    start = time.time()
+    resolved = func(api, api.friends_ids())
+    elapsed = time.time() - start
+    assert len(resolved) == num_friends
+    results[name] = elapsed
+    print('%-16s %4d calls %8.3fs' % (name, api.call_count() - 1, elapsed))
+  print('speedup: %.1fx' % (results['serial get_user'] /
+      results['batched lookup']))
+
+if __name__ == '__main__':
+  main()
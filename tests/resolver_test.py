@@ -0,0 +1,86 @@
+import unittest
+
+import sys
+sys.path.append('../src')
+
+import Queue
+import cPickle
+import os
+import shutil
+import tempfile
+
+from goldfinchlib.controllers.fakeapi import FakeTwitterAPI
+from goldfinchlib.controllers.resolver import FriendResolver
+from goldfinchlib.controllers.twitter import TwitterController
+from goldfinchlib.workerpool import WorkerPool
+
+class FriendResolverTestCase(unittest.TestCase):
+  def setUp(self):
+    self.api = FakeTwitterAPI(num_friends=250)
+    self.resolver = FriendResolver(self.api)
+
+  def test_batches(self):
+    batches = self.resolver.batches(range(250))
+    assert [len(b) for b in batches] == [100, 100, 50]
+
+  def test_resolve(self):
+    resolved = dict(self.resolver.resolve(self.api.friends_ids()))
+    assert len(resolved) == 250
+    assert resolved[42] == 'friend42'
+    assert self.api.call_count('lookup_users') == 3
+    assert self.api.call_count('get_user') == 0
+
+class GetFriendsTestCase(unittest.TestCase):
+  def setUp(self):
+    self.cache_dir = tempfile.mkdtemp()
+    self.api = FakeTwitterAPI(num_friends=150)
+    self.controller = TwitterController(self.cache_dir, api=self.api)
+
+  def tearDown(self):
+    shutil.rmtree(self.cache_dir)
+
+  def test_get_friends_streams_names(self):
+    ret_queue = Queue.Queue()
+    friends = self.controller.get_friends(ret_queue)
+    assert len(friends) == 150
+    assert ret_queue.qsize() == 150
+
+  def test_get_friends_only_resolves_new_ids(self):
+    self.controller.get_friends()
+    self.api.add_friend(1000, 'newcomer')
+    self.api.remove_friend(1)
+    lookups = self.api.call_count('lookup_users')
+    friends = self.controller.get_friends()
+    assert 'newcomer' in friends
+    assert 'friend1' not in friends
+    assert self.api.call_count('lookup_users') == lookups + 1
+
+  def test_resolver_shares_pool(self):
+    pool = WorkerPool(1)
+    try:
+      controller = TwitterController(self.cache_dir, api=self.api,
+          pool=pool)
+      resolver = controller._get_resolver()
+      assert resolver.pool is pool
+      controller.meter_api()
+      assert controller._get_resolver() is resolver
+      assert resolver.api is controller.api
+      # a job on the pool can wait on lookups queued behind it
+      ret_queue = Queue.Queue()
+      pool.submit(controller.get_friends, (), ret_queue)
+      (args, friends, exc) = ret_queue.get(True, 5)
+      assert exc is None
+      assert len(friends) == 150
+    finally:
+      pool.shutdown()
+
+  def test_get_friends_imports_legacy_cache(self):
+    legacy = dict((i, 'friend%d' % i) for i in range(1, 151))
+    with open(os.path.join(self.cache_dir, 'twitter.cache'), 'w') as f:
+      cPickle.dump(legacy, f)
+    friends = self.controller.get_friends()
+    assert len(friends) == 150
+    assert self.api.call_count('lookup_users') == 0
+
+if __name__ == '__main__':
+  unittest.main()
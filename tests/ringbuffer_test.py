@@ -0,0 +1,48 @@
+import unittest
+
+import sys
+sys.path.append('../src')
+
+from goldfinchlib.ringbuffer import RingBuffer
+
+class RingBufferTestCase(unittest.TestCase):
+  def setUp(self):
+    self.ring = RingBuffer(4)
+
+  def test_append(self):
+    self.ring.extend(range(6))
+    assert list(self.ring) == [2, 3, 4, 5]
+    assert self.ring[0] == 2
+    assert self.ring[-1] == 5
+    self.assertRaises(IndexError, self.ring.__getitem__, 4)
+
+  def test_appendleft(self):
+    self.ring.extend([1, 2])
+    self.ring.extendleft(['a', 'b', 'c'])
+    assert list(self.ring) == ['a', 'b', 'c', 1]
+    self.ring.extendleft(range(10))
+    assert list(self.ring) == [0, 1, 2, 3]
+
+  def test_slice(self):
+    self.ring.extend(range(6))
+    assert self.ring.slice(1, 3) == [3, 4]
+    assert self.ring.slice(-2, 10) == [2, 3, 4, 5]
+
+  def test_clear(self):
+    self.ring.extend(range(3))
+    self.ring.clear()
+    assert len(self.ring) == 0
+    assert list(self.ring) == []
+
+  def test_resize(self):
+    self.ring.extend(range(6))
+    self.ring.resize(6)
+    self.ring.append(6)
+    assert list(self.ring) == [2, 3, 4, 5, 6]
+    self.ring.resize(2)
+    assert list(self.ring) == [2, 3]
+    self.ring.appendleft(1)
+    assert list(self.ring) == [1, 2]
+
+if __name__ == '__main__':
+  unittest.main()
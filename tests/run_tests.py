@@ -4,12 +4,73 @@ from goldfinch_test import GoldFinchTestCase
 from statusbar_test import StatusBarTest
 from twitter_test import TwitterControllerTestCase
 from pager_test import PagerTestCase 
+from resolver_test import FriendResolverTestCase, GetFriendsTestCase
+from friendstore_test import FriendStoreTestCase
+from timeline_test import TimelineUpdatesTestCase
+from tweetstore_test import TweetStoreTestCase
+from multifetch_test import MultiFetchControllerTestCase
+from scheduler_test import RefreshSchedulerTestCase, RateLimitTestCase
+from connpool_test import ConnectionPoolTestCase
+from stream_test import PipelineTestCase, TimelineStreamTestCase, \
+    StreamingControllerTestCase
+from session_test import SessionManagerTestCase
+from snapshot_test import SnapshotTestCase
+from replay_test import ReplayTestCase, SyntheticAPITestCase
+from outbox_test import OutboxTestCase
+from ringbuffer_test import RingBufferTestCase
+from compositor_test import CompositorTestCase
+from uichannel_test import UIChannelTestCase
+from status_test import StatusTestCase
+from wrapcache_test import WrapCacheTestCase
+from textwidth_test import TextWidthTestCase
+from searchindex_test import SearchIndexTestCase
+from metrics_test import MetricsTestCase
+from keymap_test import KeymapTestCase
+from reactor_test import TimerWheelTestCase, ReactorTestCase
+from commands_test import CommandRegistryTestCase
+from history_test import HistoryTestCase
+from prefixindex_test import PrefixIndexTestCase
+from customtextbox_test import CustomTextboxTestCase
+from config_test import ConfigTestCase
 
 suite = unittest.TestSuite()
 suite.addTests([unittest.makeSuite(GoldFinchTestCase)])
 suite.addTests([unittest.makeSuite(StatusBarTest)])
 suite.addTests([unittest.makeSuite(TwitterControllerTestCase)])
 suite.addTests([unittest.makeSuite(PagerTestCase)])
+suite.addTests([unittest.makeSuite(FriendResolverTestCase)])
+suite.addTests([unittest.makeSuite(GetFriendsTestCase)])
+suite.addTests([unittest.makeSuite(FriendStoreTestCase)])
+suite.addTests([unittest.makeSuite(TimelineUpdatesTestCase)])
+suite.addTests([unittest.makeSuite(TweetStoreTestCase)])
+suite.addTests([unittest.makeSuite(MultiFetchControllerTestCase)])
+suite.addTests([unittest.makeSuite(RefreshSchedulerTestCase)])
+suite.addTests([unittest.makeSuite(RateLimitTestCase)])
+suite.addTests([unittest.makeSuite(ConnectionPoolTestCase)])
+suite.addTests([unittest.makeSuite(PipelineTestCase)])
+suite.addTests([unittest.makeSuite(TimelineStreamTestCase)])
+suite.addTests([unittest.makeSuite(StreamingControllerTestCase)])
+suite.addTests([unittest.makeSuite(SessionManagerTestCase)])
+suite.addTests([unittest.makeSuite(SnapshotTestCase)])
+suite.addTests([unittest.makeSuite(ReplayTestCase)])
+suite.addTests([unittest.makeSuite(SyntheticAPITestCase)])
+suite.addTests([unittest.makeSuite(OutboxTestCase)])
+suite.addTests([unittest.makeSuite(RingBufferTestCase)])
+suite.addTests([unittest.makeSuite(CompositorTestCase)])
+suite.addTests([unittest.makeSuite(UIChannelTestCase)])
+suite.addTests([unittest.makeSuite(StatusTestCase)])
+suite.addTests([unittest.makeSuite(WrapCacheTestCase)])
+suite.addTests([unittest.makeSuite(TextWidthTestCase)])
+suite.addTests([unittest.makeSuite(SearchIndexTestCase)])
+suite.addTests([unittest.makeSuite(MetricsTestCase)])
+suite.addTests([unittest.makeSuite(KeymapTestCase)])
+suite.addTests([unittest.makeSuite(TimerWheelTestCase)])
+suite.addTests([unittest.makeSuite(ReactorTestCase)])
+suite.addTests([unittest.makeSuite(CommandRegistryTestCase)])
+suite.addTests([unittest.makeSuite(HistoryTestCase)])
+suite.addTests([unittest.makeSuite(PrefixIndexTestCase)])
+suite.addTests([unittest.makeSuite(CustomTextboxTestCase)])
+suite.addTests([unittest.makeSuite(ConfigTestCase)])
 
 if __name__ == '__main__':
   unittest.TextTestRunner(verbosity=2).run(suite)
@@ -0,0 +1,119 @@
+import unittest
+
+import sys
+sys.path.append('../src')
+
+import shutil
+import tempfile
+import threading
+
+from goldfinchlib.scheduler import TokenBucket, RefreshScheduler
+from goldfinchlib.controllers.fakeapi import FakeTwitterAPI
+from goldfinchlib.controllers.twitter import TwitterController
+
+class FakeClock(object):
+  def __init__(self):
+    self.now = 1000.0
+
+  def __call__(self):
+    return self.now
+
+class RefreshSchedulerTestCase(unittest.TestCase):
+  def setUp(self):
+    self.clock = FakeClock()
+    self.scheduler = RefreshScheduler(120, requests_per_refresh=3,
+        clock=self.clock)
+
+  def test_set_base_interval(self):
+    for i in range(10):
+      self.scheduler.record_activity(0)
+    self.scheduler.set_base_interval(60)
+    assert self.scheduler.next_interval() == 60
+    assert self.scheduler.min_interval == 15
+    assert self.scheduler.max_interval == 300
+
+  def test_token_bucket(self):
+    bucket = TokenBucket(2, 1, self.clock)
+    assert bucket.consume(2)
+    assert not bucket.consume(1)
+    assert bucket.time_until(1) == 1.0
+    self.clock.now = self.clock.now + 1
+    assert bucket.consume(1)
+
+  def test_set_requests_per_refresh(self):
+    # streaming takes the timeline off each refresh
+    self.scheduler.set_requests_per_refresh(2)
+    assert self.scheduler.bucket.capacity == 2 * RefreshScheduler.burst
+    for i in range(RefreshScheduler.burst):
+      assert self.scheduler.start_refresh()
+    assert not self.scheduler.start_refresh()
+
+  def test_busy_timeline_polls_faster(self):
+    for i in range(10):
+      self.scheduler.record_activity(20)
+    assert self.scheduler.next_interval() == self.scheduler.min_interval
+
+  def test_quiet_timeline_backs_off(self):
+    for i in range(10):
+      self.scheduler.record_activity(0)
+    assert self.scheduler.next_interval() == self.scheduler.max_interval
+
+  def test_low_quota_backs_off(self):
+    for i in range(10):
+      self.scheduler.record_activity(20)
+    # 6 requests left for the next 15 minutes: 2 refreshes, 450s apart
+    self.scheduler.update_quota(6, self.clock.now + 900)
+    assert self.scheduler.start_refresh()
+    assert self.scheduler.start_refresh()
+    assert not self.scheduler.start_refresh()
+    self.assertAlmostEqual(self.scheduler.next_interval(), 450)
+
+  def test_exhausted_quota_waits_for_reset(self):
+    self.scheduler.update_quota(0, self.clock.now + 300)
+    assert self.scheduler.next_interval() == 300
+
+  def test_scarcest_endpoint_sets_the_pace(self):
+    self.scheduler.update_quotas({
+        'home_timeline': (6, self.clock.now + 900),
+        'mentions': (1, self.clock.now + 900),
+        'direct_messages': (0, self.clock.now - 10)})  # already reset
+    assert self.scheduler.start_refresh()
+    assert not self.scheduler.start_refresh()
+    self.assertAlmostEqual(self.scheduler.next_interval(), 900)
+
+class RateLimitTestCase(unittest.TestCase):
+  def setUp(self):
+    self.cache_dir = tempfile.mkdtemp()
+    self.api = FakeTwitterAPI()
+    self.api.set_rate_limit(10)
+    self.controller = TwitterController(self.cache_dir, api=self.api)
+
+  def tearDown(self):
+    shutil.rmtree(self.cache_dir)
+
+  def test_rate_limit_headers(self):
+    self.controller.get_home_timeline(30)
+    assert self.controller.quotas == {
+        'home_timeline': (9, self.api.quota_reset)}
+
+  def test_other_threads_responses_ignored(self):
+    self.controller.get_home_timeline(30)
+    thread = threading.Thread(target=self.api.mentions)
+    thread.start()
+    thread.join()
+    assert self.api.quota_remaining == 8
+    self.controller.note_rate_limit('home_timeline')
+    assert self.controller.quotas['home_timeline'][0] == 9
+
+  def test_no_request_no_quota(self):
+    class Stale(object):
+      headers = {'x-rate-limit-remaining': '0',
+          'x-rate-limit-reset': '1000'}
+    # left on this thread by a call for another account, say
+    self.controller.connection_pool.local.response = Stale()
+    self.api.quota_limit = None  # answers without rate limit headers
+    self.controller.get_home_timeline_updates(30)
+    assert self.controller.quotas == {}
+
+if __name__ == '__main__':
+  unittest.main()
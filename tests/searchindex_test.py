@@ -0,0 +1,39 @@
+import unittest
+
+import sys
+sys.path.append('../src')
+
+from goldfinchlib.searchindex import SearchIndex, tokens
+
+class SearchIndexTestCase(unittest.TestCase):
+  def setUp(self):
+    self.index = SearchIndex()
+    self.index.add(1, 'The quick brown fox')
+    self.index.add(2, 'the lazy dog')
+    self.index.add(3, u'Quick, the DOG!')
+
+  def test_tokens(self):
+    assert tokens('Hello, @World hello') == set(['hello', 'world'])
+    assert tokens(u'caf\xe9 au lait') == set([u'caf\xe9', u'au', u'lait'])
+
+  def test_lookup(self):
+    assert self.index.lookup(tokens('the')) == [1, 2, 3]
+    assert self.index.lookup(tokens('quick dog')) == [3]
+    assert self.index.lookup(tokens('cat')) == []
+    assert self.index.lookup(set()) == []
+
+  def test_remove(self):
+    self.index.remove(3, u'Quick, the DOG!')
+    assert self.index.lookup(tokens('dog')) == [2]
+    assert 'quick' in self.index.postings
+    self.index.remove(1, 'The quick brown fox')
+    assert 'quick' not in self.index.postings
+
+  def test_lookup_cached_until_changed(self):
+    first = self.index.lookup(tokens('the'))
+    assert self.index.lookup(tokens('the')) is first
+    self.index.add(4, 'the end')
+    assert self.index.lookup(tokens('the')) == [1, 2, 3, 4]
+
+if __name__ == '__main__':
+  unittest.main()
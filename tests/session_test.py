@@ -0,0 +1,66 @@
+import unittest
+
+import sys
+sys.path.append('../src')
+
+import shutil
+import tempfile
+import ConfigParser
+import StringIO
+
+from goldfinchlib.controllers.fakeapi import FakeTwitterAPI
+from goldfinchlib.controllers.multifetch import MultiFetchController
+from goldfinchlib.scheduler import RefreshScheduler
+from goldfinchlib.session import Session, SessionManager, account_sections
+from goldfinchlib.status import Status
+
+class SessionManagerTestCase(unittest.TestCase):
+  def setUp(self):
+    self.cache_dir = tempfile.mkdtemp()
+    self.manager = SessionManager(pool_size=2)
+    for name in ('Personal', 'Work'):
+      api = FakeTwitterAPI()
+      api.add_status(name.lower(), 'hello from ' + name)
+      controller = MultiFetchController(self.cache_dir, api=api,
+          pool=self.manager.pool,
+          connection_pool=self.manager.connection_pool)
+      self.manager.add(Session(name, controller, RefreshScheduler(120),
+          scrollback=3))
+
+  def tearDown(self):
+    shutil.rmtree(self.cache_dir)
+
+  def test_sessions_share_pools(self):
+    (personal, work) = self.manager.sessions
+    assert personal.controller.pool is work.controller.pool
+    assert personal.controller.connection_pool is \
+        work.controller.connection_pool
+    assert personal.scheduler is not work.scheduler
+    results = work.controller.fetch_all(['home_timeline'])
+    assert results[0][1][0][1] == 'hello from Work'
+
+  def test_switch(self):
+    assert self.manager.current.name == 'Personal'
+    assert self.manager.switch('work').name == 'Work'
+    assert self.manager.current.name == 'Work'
+    assert self.manager.switch('nobody') is None
+    assert self.manager.current.name == 'Work'
+
+  def test_view_is_bounded(self):
+    session = self.manager.get('work')
+    statuses = [Status(i, 'timmy', 'status %d' % i, 0) for i in range(5)]
+    session.add_statuses([statuses[1], statuses[0]])
+    session.new_statuses = 2
+    assert session.add_statuses([statuses[3], statuses[2], statuses[1]]) \
+        == [statuses[3], statuses[2]]
+    assert session.view() == [statuses[3], statuses[2], statuses[1]]
+    assert session.new_statuses == 0
+
+  def test_account_sections(self):
+    config = ConfigParser.SafeConfigParser()
+    config.readfp(StringIO.StringIO('[account Work]\naccountname = Work\n'
+        '[preferences]\nrefresh = 120\n[account]\naccountname = Personal\n'))
+    assert account_sections(config) == ['account', 'account Work']
+
+if __name__ == '__main__':
+  unittest.main()
@@ -0,0 +1,63 @@
+import unittest
+
+import sys
+sys.path.append('../src')
+
+import datetime
+import os
+import shutil
+import tempfile
+
+from goldfinchlib.controllers.fakeapi import FakeTwitterAPI
+from goldfinchlib.controllers.multifetch import MultiFetchController
+from goldfinchlib.controllers.twitter import TwitterController
+from goldfinchlib.scheduler import RefreshScheduler
+from goldfinchlib.session import Session, SessionManager
+from goldfinchlib.snapshot import save_snapshot, load_snapshot
+from goldfinchlib.status import Status
+
+class SnapshotTestCase(unittest.TestCase):
+  def setUp(self):
+    self.dir = tempfile.mkdtemp()
+    self.filename = os.path.join(self.dir, 'timeline.snapshot')
+    self.sessions = SessionManager(pool_size=1)
+    controller = TwitterController(self.dir, api=FakeTwitterAPI())
+    controller.newest_id = 42
+    self.session = Session('Personal', controller, RefreshScheduler(120))
+    self.sessions.add(self.session)
+
+  def tearDown(self):
+    shutil.rmtree(self.dir)
+
+  def test_roundtrip(self):
+    status = Status(42, 'timmy', u'hello', datetime.datetime(2010, 8, 1))
+    self.session.add_statuses([status])
+    save_snapshot(self.filename, self.sessions, (42, 1))
+    snapshot = load_snapshot(self.filename)
+    assert snapshot['current'] == 'Personal'
+    assert snapshot['position'] == (42, 1)
+    account = snapshot['accounts']['Personal']
+    assert account['newest_id'] == 42
+    assert [tuple(status) for status in account['statuses']] == \
+        [('timmy', u'hello', datetime.datetime(2010, 8, 1))]
+    assert account['statuses'][0].id == 42
+
+  def test_newest_ids(self):
+    controller = MultiFetchController(self.dir, api=FakeTwitterAPI())
+    controller.newest_ids.update({'mentions': 7, 'direct_messages': 9})
+    self.sessions.add(Session('Work', controller, RefreshScheduler(120)))
+    save_snapshot(self.filename, self.sessions)
+    controller.pool.shutdown()
+    accounts = load_snapshot(self.filename)['accounts']
+    assert accounts['Work']['newest_ids'] == {'mentions': 7,
+        'direct_messages': 9}
+    assert accounts['Personal']['newest_ids'] == {}
+
+  def test_missing_or_corrupt(self):
+    assert load_snapshot(self.filename) is None
+    with open(self.filename, 'wb') as f:
+      f.write('not a pickle')
+    assert load_snapshot(self.filename) is None
+
+if __name__ == '__main__':
+  unittest.main()
@@ -0,0 +1,41 @@
+'''Compares the memory held per buffered status as pre-formatted pager
+lines (how the pager used to store the timeline) and as Status records.
+
+usage: python status_bench.py [statuses]
+'''
+
+import sys
+sys.path.append('../src')
+
+import datetime
+
+from goldfinchlib.status import Status, format_status
+
+def size_of_lines(lines):
+  return sys.getsizeof(lines) + sum([sys.getsizeof(line) for line in lines])
+
+def size_of_status(status):
+  # screen names are shared, so they aren't counted per status
+  return sys.getsizeof(status) + sys.getsizeof(status._text)
+
+def main():
+  count = 10000
+  if len(sys.argv) > 1:
+    count = int(sys.argv[1])
+  created_at = datetime.datetime(2010, 8, 1)
+  text = u'a fairly typical status, with a link http://bit.ly/abcdef and ' +\
+      u'a mention of @someone to pad it out to about 110 chars'
+  formatted = 0
+  records = 0
+  for i in range(count):
+    status = Status(i, u'user%d' % (i % 200), text, created_at)
+    formatted = formatted + size_of_lines(
+        format_status(status.screen_name, status.text, 80))
+    records = records + size_of_status(status)
+  print('%d statuses' % count)
+  print('formatted lines: %6d bytes/status' % (formatted / count))
+  print('Status records:  %6d bytes/status' % (records / count))
+  print('%.1fx smaller' % (float(formatted) / records))
+
+if __name__ == '__main__':
+  main()
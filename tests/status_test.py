@@ -0,0 +1,56 @@
+import unittest
+
+import sys
+sys.path.append('../src')
+
+import cPickle
+import datetime
+
+from goldfinchlib.status import Status, Timeline, format_status
+
+class StatusTestCase(unittest.TestCase):
+  def test_record(self):
+    created_at = datetime.datetime(2010, 8, 1, 12)
+    status = Status(1, u'timmy', u'caf\xe9', created_at)
+    assert status.text == u'caf\xe9'
+    assert status.created_at == created_at
+    (screen_name, text, when) = status
+    assert (screen_name, text, when) == (u'timmy', u'caf\xe9', created_at)
+    assert status[:2] == (u'timmy', u'caf\xe9')
+    assert not hasattr(status, '__dict__')
+    copy = cPickle.loads(cPickle.dumps(status, cPickle.HIGHEST_PROTOCOL))
+    assert tuple(copy) == tuple(status) and copy.id == 1
+
+  def test_screen_names_are_shared(self):
+    a = Status(1, ''.join(['tim', 'my']), 'a', 0)
+    b = Status(2, ''.join(['ti', 'mmy']), 'b', 0)
+    assert a.screen_name is b.screen_name
+
+  def test_timeline_dedup(self):
+    timeline = Timeline(3)
+    statuses = [Status(i, 'timmy', 'status %d' % i, i) for i in range(5)]
+    assert timeline.prepend([statuses[1], statuses[0]]) == \
+        [statuses[1], statuses[0]]
+    assert timeline.prepend([statuses[2], statuses[1], statuses[2]]) == \
+        [statuses[2]]
+    assert timeline.prepend([statuses[4], statuses[3]]) == \
+        [statuses[4], statuses[3]]
+    assert list(timeline) == [statuses[4], statuses[3], statuses[2]]
+    assert timeline.get(4) is statuses[4]
+    assert timeline.get(1) is None  # fell off the end
+
+  def test_timeline_capacity(self):
+    timeline = Timeline(3)
+    statuses = [Status(i, 'timmy', 'status %d' % i, i) for i in range(3)]
+    timeline.prepend(statuses)
+    timeline.set_capacity(2)
+    assert list(timeline) == statuses[:2]
+    assert timeline.get(2) is None
+    assert timeline.prepend([statuses[2]]) == [statuses[2]]
+
+  def test_format_status(self):
+    lines = format_status('timmy', 'x' * 30, 40)
+    assert lines == ['timmy'.ljust(20) + 'x' * 20, ' ' * 20 + 'x' * 10, '']
+
+if __name__ == '__main__':
+  unittest.main()
@@ -16,5 +16,37 @@ class StatusBarTest(unittest.TestCase):
     self.statusbar.add_text(text, 'left')
     assert self.statusbar.text_left == text
 
+  def test_single_write(self):
+    self.statusbar.add_text('left', 'left')
+    self.statusbar.add_text('[edit]', 'right')
+    self.stdscr.clear()
+    self.statusbar.render()
+    assert len(self.stdscr.content) == 1
+    line = self.stdscr.content[0]
+    assert len(line) == self.statusbar.term_width
+    assert line.startswith(' left ')
+    assert line.endswith(' [edit] ')
+
+  def test_unchanged_text_not_redrawn(self):
+    self.statusbar.add_text('same', 'left')
+    self.stdscr.clear()
+    self.statusbar.add_text('same', 'left')
+    assert self.stdscr.content == []
+
+  def test_metrics(self):
+    self.statusbar.add_text('[edit]', 'right')
+    self.statusbar.set_metrics('api:120ms')
+    line = self.statusbar.line()
+    assert line.endswith(' api:120ms  [edit] ')
+    # with no room the metrics go before the message is cut
+    self.statusbar.add_text('x' * 20, 'left')
+    line = self.statusbar.line()
+    assert 'api' not in line
+    assert line.startswith(' ' + 'x' * 20)
+    self.statusbar.add_text('x' * 40, 'left')
+    line = self.statusbar.line()
+    assert len(line) == self.statusbar.term_width
+    assert line.endswith(' [edit] ')
+
 if __name__ == '__main__':
   unittest.main()
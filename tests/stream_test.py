@@ -0,0 +1,80 @@
+import unittest
+
+import sys
+sys.path.append('../src')
+
+import shutil
+import tempfile
+import time
+import Queue
+
+from goldfinchlib.controllers import stream
+from goldfinchlib.controllers.fakeapi import FakeTwitterAPI
+from goldfinchlib.controllers.twitter import TwitterController
+
+class PipelineTestCase(unittest.TestCase):
+  def test_split_lines(self):
+    pieces = ['{"a":', ' 1}\r\n\r\n{"b"', ': 2}\r\n']
+    assert list(stream.decode(stream.split_lines(pieces))) == \
+        [{'a': 1}, {'b': 2}]
+
+  def test_statuses_filters_events(self):
+    messages = [{'delete': {'status': {'id': 1}}}, {'friends': [1, 2]},
+        {'id': 2, 'text': 'hi', 'user': {'screen_name': 'timmy'},
+            'created_at': 'Wed Aug 27 13:08:45 +0000 2008'}]
+    result = [stream.to_status(m) for m in stream.statuses(messages)]
+    assert len(result) == 1
+    assert result[0][:3] == (2, 'timmy', 'hi')
+    assert result[0][3].year == 2008
+
+class TimelineStreamTestCase(unittest.TestCase):
+  def setUp(self):
+    self.server = stream.FakeStreamServer()
+    self.server.start()
+    self.received = Queue.Queue()
+    self.stream = stream.TimelineStream(self.server.host, '/2/user.json',
+        self.received.put, secure=False, timeout=5)
+    self.stream.min_backoff = 0.01
+    self.stream.start()
+
+  def tearDown(self):
+    self.stream.stop()
+    self.server.stop()
+
+  def test_statuses_arrive_promptly(self):
+    self.server.push({'friends': [1, 2, 3]})
+    start = time.time()
+    self.server.push_status('timmy', 'hello')
+    status = self.received.get(True, 2)
+    assert status[1:3] == ('timmy', 'hello')
+    assert time.time() - start < 0.5
+
+  def test_reconnects(self):
+    self.server.push_status('timmy', 'before')
+    self.received.get(True, 2)
+    self.server.disconnect()
+    self.server.push_status('timmy', 'after')
+    assert self.received.get(True, 2)[2] == 'after'
+    assert self.stream.connections == 2
+
+class StreamingControllerTestCase(unittest.TestCase):
+  def test_streamed_statuses_are_stored(self):
+    cache_dir = tempfile.mkdtemp()
+    server = stream.FakeStreamServer()
+    server.start()
+    controller = TwitterController(cache_dir, api=FakeTwitterAPI())
+    received = Queue.Queue()
+    try:
+      controller.start_stream(received.put,
+          host=server.host, secure=False)
+      server.push_status('timmy', 'streamed goldfinch')
+      assert received.get(True, 2)[:2] == ('timmy', 'streamed goldfinch')
+      assert controller.search('goldfinch')[0][1] == 'streamed goldfinch'
+      assert controller.newest_id == 1
+    finally:
+      controller.stop_stream()
+      server.stop()
+      shutil.rmtree(cache_dir)
+
+if __name__ == '__main__':
+  unittest.main()
@@ -0,0 +1,57 @@
+# -*- coding: utf-8 -*-
+'''Times format_status, which wraps by display width, against the old
+loop which sliced by code point, for plain ASCII and for CJK text.
+
+usage: python textwidth_bench.py [statuses]
+'''
+
+import sys
+sys.path.append('../src')
+
+import time
+
+from goldfinchlib import textwidth
+from goldfinchlib.status import format_status
+
+def old_format_status(screen_name, message, width):
+  # format_status before it knew about display width
+  screen_name_padding = 20
+  the_content = []
+  max_chunk_size = width - screen_name_padding
+  the_content.append(''.join([screen_name.ljust(screen_name_padding),
+      message[0:max_chunk_size]]))
+  if max_chunk_size < len(message):
+    for i in range(max_chunk_size*2, len(message)+max_chunk_size,
+        max_chunk_size):
+      this_chunk_size = len(message[i-max_chunk_size:i])
+      the_content.append(message[i-max_chunk_size:i]\
+          .rjust(screen_name_padding+this_chunk_size))
+  the_content.append('')
+  return the_content
+
+def run(func, messages):
+  start = time.time()
+  for (i, message) in enumerate(messages):
+    func(u'user%d' % (i % 200), message, 80)
+  return len(messages) / (time.time() - start)
+
+def main():
+  count = 5000
+  if len(sys.argv) > 1:
+    count = int(sys.argv[1])
+  samples = {
+    'ascii': u'a fairly typical status, with a link http://bit.ly/abcdef ' +
+        u'and a mention of @someone to pad it out to about 110 chars',
+    'cjk': u'今日はいい天気ですね' * 6,
+  }
+  for (name, text) in sorted(samples.items()):
+    messages = [u'%s %d' % (text, i) for i in range(count)]
+    old = run(old_format_status, messages)
+    textwidth._wrapped.clear()
+    cold = run(format_status, messages)
+    warm = run(format_status, messages)
+    print('%-6s old %8d/s  new %8d/s (%.2fx)  memoized %8d/s (%.2fx)' % (
+        name, old, cold, cold / old, warm, warm / old))
+
+if __name__ == '__main__':
+  main()
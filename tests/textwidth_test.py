@@ -0,0 +1,58 @@
+# -*- coding: utf-8 -*-
+import unittest
+
+import sys
+sys.path.append('../src')
+
+from goldfinchlib import textwidth
+from goldfinchlib.textwidth import display_width, wrap_columns, \
+    truncate_columns, ljust_columns
+from goldfinchlib.status import format_status
+
+class TextWidthTestCase(unittest.TestCase):
+  def test_display_width(self):
+    assert display_width('hello') == 5
+    assert display_width(u'日本語') == 6
+    assert display_width(u'café') == 4  # combining acute
+    assert display_width(u'\U0001f600') == 2
+    assert display_width('\xe6\x97\xa5') == 2  # utf-8 bytes
+
+  def test_wrap_ascii(self):
+    assert wrap_columns('abcdefg', 3) == ['abc', 'def', 'g']
+    assert wrap_columns('', 3) == ['']
+
+  def test_wrap_wide(self):
+    chunks = wrap_columns(u'日本語のテキスト', 5)
+    assert chunks == [u'日本', u'語の', u'テキ', u'スト']
+    for chunk in chunks:
+      assert display_width(chunk) <= 5
+
+  def test_wrap_keeps_marks(self):
+    chunks = wrap_columns(u'aéio', 2)
+    assert chunks == [u'aé', u'io']
+    # an emoji sequence joined with ZWJ stays in one piece
+    family = u'\U0001f468\u200d\U0001f469\u200d\U0001f467'
+    assert len(wrap_columns(u'ab' + family, 3)) == 2
+
+  def test_too_narrow(self):
+    assert wrap_columns(u'日本', 1) == [u'日', u'本']
+    assert truncate_columns(u'日本', 3) == u'日'
+    assert truncate_columns(u'日本', 1) == u''
+
+  def test_memoized(self):
+    text = u'日本語' * 10
+    first = wrap_columns(text, 7)
+    assert wrap_columns(text, 7) is first
+    textwidth._wrapped.clear()
+    assert wrap_columns(text, 7) is not first
+
+  def test_format_status_wide(self):
+    lines = format_status(u'名前', u'日本語' * 10, 40)
+    assert lines[0].startswith(ljust_columns(u'名前', 20))
+    for line in lines:
+      assert display_width(line) <= 40
+    assert u''.join([line.strip() for line in lines]).endswith(
+        u'日本語' * 10)
+
+if __name__ == '__main__':
+  unittest.main()
@@ -0,0 +1,49 @@
+import unittest
+
+import sys
+sys.path.append('../src')
+
+import shutil
+import tempfile
+
+from goldfinchlib.controllers.fakeapi import FakeTwitterAPI
+from goldfinchlib.controllers.twitter import TwitterController
+
+class TimelineUpdatesTestCase(unittest.TestCase):
+  def setUp(self):
+    self.cache_dir = tempfile.mkdtemp()
+    self.api = FakeTwitterAPI()
+    self.controller = TwitterController(self.cache_dir, api=self.api)
+    for i in range(40):
+      self.api.add_status('timmy', 'status %d' % i)
+
+  def tearDown(self):
+    shutil.rmtree(self.cache_dir)
+
+  def test_first_call_fetches_one_page(self):
+    timeline = self.controller.get_home_timeline_updates(30)
+    assert len(timeline) == 30
+    assert timeline[0][1] == 'status 39'
+    assert self.api.call_count('home_timeline') == 1
+
+  def test_only_new_statuses_returned(self):
+    self.controller.get_home_timeline_updates(30)
+    assert self.controller.get_home_timeline_updates(30) == []
+    self.api.add_status('timmy', 'brand new')
+    timeline = self.controller.get_home_timeline_updates(30)
+    assert [status for (name, status, created_at) in timeline] == \
+        ['brand new']
+
+  def test_gap_is_backfilled(self):
+    self.controller.get_home_timeline_updates(30)
+    for i in range(45):
+      self.api.add_status('timmy', 'burst %d' % i)
+    calls = self.api.call_count('home_timeline')
+    timeline = self.controller.get_home_timeline_updates(30)
+    assert len(timeline) == 45
+    assert timeline[0][1] == 'burst 44'
+    assert timeline[-1][1] == 'burst 0'
+    assert self.api.call_count('home_timeline') == calls + 2
+
+if __name__ == '__main__':
+  unittest.main()
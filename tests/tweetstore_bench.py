@@ -0,0 +1,42 @@
+'''Fills a TweetStore with synthetic statuses and times a few searches.
+
+usage: python tweetstore_bench.py [num_statuses]
+'''
+
+import sys
+sys.path.append('../src')
+
+import datetime
+import random
+import time
+
+from goldfinchlib.tweetstore import TweetStore, parse_query
+
+WORDS = ('python curses twitter pager goldfinch timeline status friend '
+    'search index sqlite terminal keyboard refresh scroll tweet').split()
+
+def main():
+  num_statuses = len(sys.argv) > 1 and int(sys.argv[1]) or 200000
+  store = TweetStore(':memory:')
+  start_time = datetime.datetime(2010, 1, 1)
+  rand = random.Random(0)
+  start = time.time()
+  batch = []
+  for i in range(num_statuses):
+    text = ' '.join([rand.choice(WORDS) for j in range(12)])
+    batch.append((i, 'user%d' % rand.randint(0, 500), text,
+        start_time + datetime.timedelta(seconds=i*60)))
+    if len(batch) == 10000:
+      store.add(batch)
+      batch = []
+  store.add(batch)
+  print('inserted %d statuses in %.2fs' % (num_statuses, time.time() - start))
+  for query in ('goldfinch', 'goldfinch sqlite', 'from:user42',
+      'curses from:user7 since:2010-02-01 until:2010-03-01', 'term*'):
+    start = time.time()
+    results = store.search(**parse_query(query))
+    print('%-52s %3d results %7.2fms' % (query, len(results),
+        (time.time() - start) * 1000))
+
+if __name__ == '__main__':
+  main()
@@ -0,0 +1,51 @@
+import unittest
+
+import sys
+sys.path.append('../src')
+
+import datetime
+
+from goldfinchlib.tweetstore import TweetStore, parse_query
+
+class TweetStoreTestCase(unittest.TestCase):
+  def setUp(self):
+    self.store = TweetStore(':memory:')
+    self.store.add([
+        (1, 'timmy', u'goldfinch is a twitter client',
+            datetime.datetime(2010, 8, 1, 12)),
+        (2, 'brk3', u'writing a curses pager',
+            datetime.datetime(2010, 8, 2, 12)),
+        (3, 'timmy', u'the pager scrolls now',
+            datetime.datetime(2010, 8, 3, 12))])
+
+  def tearDown(self):
+    self.store.close()
+
+  def search(self, query):
+    return [text for (name, text, created_at)
+        in self.store.search(**parse_query(query))]
+
+  def test_duplicates_ignored(self):
+    self.store.add([(1, 'timmy', u'goldfinch is a twitter client',
+        datetime.datetime(2010, 8, 1, 12))])
+    assert self.store.count() == 3
+
+  def test_keyword(self):
+    assert self.search('pager') == [u'the pager scrolls now',
+        u'writing a curses pager']
+    assert self.search('twit*') == [u'goldfinch is a twitter client']
+
+  def test_user_and_dates(self):
+    assert self.search('pager from:@timmy') == [u'the pager scrolls now']
+    assert self.search('since:2010-08-02 until:2010-08-02') == \
+        [u'writing a curses pager']
+
+  def test_created_at_roundtrip(self):
+    (name, text, created_at) = self.store.search(screen_name='brk3')[0]
+    assert created_at == datetime.datetime(2010, 8, 2, 12)
+
+  def test_bad_date(self):
+    self.assertRaises(ValueError, parse_query, 'since:yesterday')
+
+if __name__ == '__main__':
+  unittest.main()
@@ -3,21 +3,28 @@ import unittest
 import sys
 sys.path.append('../src')
 
-import os
+import shutil
+import tempfile
 
 from goldfinchlib.controllers import twitter
-from goldfinch import GoldFinch
+from goldfinchlib.controllers.replay import SyntheticAPI
 
 class TwitterControllerTestCase(unittest.TestCase):
   def setUp(self):
-    self.controller = twitter.TwitterController(GoldFinch.config_dir)
-    self.controller.perform_auth(os.path.join(GoldFinch.config_dir, 'access_token')) 
+    self.cache_dir = tempfile.mkdtemp()
+    self.now = 0.0
+    api = SyntheticAPI(1, num_friends=20, clock=lambda: self.now)
+    self.controller = twitter.TwitterController(self.cache_dir, api=api)
+
+  def tearDown(self):
+    shutil.rmtree(self.cache_dir)
 
   def test_get_friends(self):
     friend_list = self.controller.get_friends()
     assert friend_list is not None, 'this may be OK if you have no friends ;)'
 
   def test_get_home_timeline(self):
+    self.now = 30.0
     timeline = self.controller.get_home_timeline(10)
     assert len(timeline) == 10
     
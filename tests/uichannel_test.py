@@ -0,0 +1,66 @@
+import unittest
+
+import sys
+sys.path.append('../src')
+
+import threading
+
+from goldfinchlib.uichannel import UIChannel
+
+class UIChannelTestCase(unittest.TestCase):
+  def setUp(self):
+    self.channel = UIChannel()
+    self.applied = []
+    self.channel.register('statuses', self.apply_statuses, batch=True)
+    self.channel.register('message', self.applied.append)
+
+  def apply_statuses(self, batch):
+    self.applied.append(batch)
+
+  def test_batches_runs(self):
+    self.channel.put('statuses', 'a')
+    self.channel.put('statuses', 'b')
+    self.channel.put('message', 'hello')
+    self.channel.put('statuses', 'c')
+    assert self.channel.drain() == 4
+    assert self.applied == [[('a',), ('b',)], 'hello', [('c',)]]
+    assert self.channel.drain() == 0
+
+  def test_many_producers(self):
+    '''Several fetcher threads at once, applied only by the draining
+    thread and nothing lost.
+
+    '''
+    consumer = threading.currentThread()
+    seen = []
+    def apply_statuses(batch):
+      assert threading.currentThread() is consumer
+      seen.extend(batch)
+    self.channel.register('statuses', apply_statuses, batch=True)
+    def produce(n):
+      for i in range(200):
+        self.channel.put('statuses', n, i)
+    producers = [threading.Thread(target=produce, args=(n,))
+        for n in range(4)]
+    for producer in producers:
+      producer.start()
+    while [p for p in producers if p.isAlive()]:
+      self.channel.drain()
+    # a drain takes at most 500, there may be more left than that
+    while self.channel.drain():
+      pass
+    assert len(seen) == 800
+    for n in range(4):
+      assert [i for (m, i) in seen if m == n] == range(200)
+
+  def test_bad_record_doesnt_stop_drain(self):
+    def fail(batch):
+      raise ValueError('bad')
+    self.channel.register('statuses', fail, batch=True)
+    self.channel.put('statuses', 'a')
+    self.channel.put('message', 'hello')
+    self.channel.drain()
+    assert self.applied == ['hello']
+
+if __name__ == '__main__':
+  unittest.main()
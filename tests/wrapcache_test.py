@@ -0,0 +1,57 @@
+import unittest
+
+import sys
+sys.path.append('../src')
+
+from goldfinchlib.wrapcache import WrapCache
+from goldfinchlib.status import Status
+
+class WrapCacheTestCase(unittest.TestCase):
+  def setUp(self):
+    self.calls = []
+    self.cache = WrapCache(self.formatter, max_entries=4, widths=2)
+
+  def formatter(self, item, width):
+    self.calls.append((item, width))
+    return ['%s@%d' % (item, width)]
+
+  def status(self, status_id):
+    return Status(status_id, 'timmy', 'hello', 0)
+
+  def test_hit(self):
+    status = self.status(1)
+    first = self.cache.lines(status, 80)
+    assert self.cache.lines(status, 80) is first
+    assert len(self.calls) == 1
+    assert (self.cache.hits, self.cache.misses) == (1, 1)
+
+  def test_plain_text_not_cached(self):
+    self.cache.lines('hello', 80)
+    self.cache.lines('hello', 80)
+    assert len(self.calls) == 2
+    assert self.cache.entries == 0
+
+  def test_widths(self):
+    status = self.status(1)
+    self.cache.lines(status, 80)
+    self.cache.lines(status, 40)
+    self.cache.lines(status, 80)
+    assert len(self.calls) == 2
+    # a third width pushes out the least recently used, 40
+    self.cache.lines(status, 60)
+    assert sorted(self.cache.layouts.keys()) == [60, 80]
+    assert self.cache.entries == 2
+    self.cache.lines(status, 40)
+    assert len(self.calls) == 4
+
+  def test_max_entries(self):
+    for i in range(4):
+      self.cache.lines(self.status(i), 80)
+    assert self.cache.entries == 4
+    self.cache.lines(self.status(4), 80)
+    assert self.cache.entries == 1
+    self.cache.lines(self.status(0), 80)
+    assert len(self.calls) == 6
+
+if __name__ == '__main__':
+  unittest.main()